@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Shared helpers for the native host benchmarks.
+
+Benchmarks are plain scripts: run them with the Python that the wrappers use,
+from any directory. They exit with status 1 when a budget is exceeded so they
+can gate a build.
+"""
+
+import json
+import os
+import stat
+import struct
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+HOST_DIR = os.path.dirname(BENCH_DIR)
+
+# Make ``realvnc_host`` importable when a benchmark is run as a script
+if HOST_DIR not in sys.path:
+    sys.path.insert(0, HOST_DIR)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """min/median/p95/max summary of latency samples (same unit as the input)."""
+    return {
+        "runs": len(samples),
+        "min": min(samples) if samples else 0.0,
+        "median": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "max": max(samples) if samples else 0.0,
+    }
+
+
+def encode_frame(message):
+    """Encode a message with the native messaging length prefix."""
+    body = json.dumps(message).encode('utf-8')
+    return struct.pack('=I', len(body)) + body
+
+
+def read_frame(stream):
+    """Read one length-prefixed JSON frame from a binary stream, or None at EOF."""
+    header = stream.read(4)
+    if len(header) < 4:
+        return None
+    length = struct.unpack('=I', header)[0]
+    body = stream.read(length)
+    return json.loads(body.decode('utf-8'))
+
+
+def stub_viewer(directory):
+    """Write a ``vncviewer`` that exits straight away, so only spawn cost is measured."""
+    path = os.path.join(directory, "vncviewer")
+    with open(path, 'w') as f:
+        f.write("#!/bin/sh\nexit 0\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
+
+
+def print_table(title, rows, unit="ms"):
+    """Print ``{name: summary}`` rows as an aligned table."""
+    print(title)
+    print(f"  {'case':<28} {'runs':>6} {'min':>10} {'median':>10} {'p95':>10} {'max':>10}  ({unit})")
+    for name, stats in rows.items():
+        print(
+            f"  {name:<28} {stats['runs']:>6} {stats['min']:>10.3f} {stats['median']:>10.3f}"
+            f" {stats['p95']:>10.3f} {stats['max']:>10.3f}"
+        )
+
+
+def write_json(path, data):
+    """Write benchmark results as JSON."""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, sort_keys=True)
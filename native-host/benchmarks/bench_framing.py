@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Frame codec micro-benchmark: messages per second at several payload sizes.
+
+Compares the ``FrameReader``/``FrameWriter`` codec with the original
+``read(n)`` + ``decode`` + ``json.loads`` path, over in-memory streams so only
+codec cost is measured. Each case is timed in batches, ``--repeat`` times
+over, and its fastest batch is reported so a noisy machine does not decide
+the result. Exits with status 1 when the codec decodes more than
+``--max-slowdown`` percent slower than the original path at any size.
+
+    python benchmarks/bench_framing.py --sizes 64 1024 16384 262144
+"""
+
+import argparse
+import io
+import json
+import struct
+import sys
+import time
+
+from _common import write_json
+
+from realvnc_host.framing import FrameReader, FrameWriter
+
+
+def make_message(size):
+    """A launch-like message whose JSON encoding is about ``size`` bytes."""
+    base = {"action": "launch", "requestId": "1", "connectionFile": "temp/x.svn", "svnContent": ""}
+    overhead = len(json.dumps(base))
+    base["svnContent"] = "x" * max(0, size - overhead)
+    return base
+
+
+def legacy_read(stream):
+    """The original single ``read(n)`` decoder."""
+    raw_length = stream.read(4)
+    if not raw_length:
+        return None
+    message_length = struct.unpack('=I', raw_length)[0]
+    return json.loads(stream.read(message_length).decode('utf-8'))
+
+
+def legacy_write(stream, message):
+    """The original encoder."""
+    encoded_message = json.dumps(message).encode('utf-8')
+    stream.write(struct.pack('=I', len(encoded_message)))
+    stream.write(encoded_message)
+    stream.flush()
+
+
+def rate(func, count, batch=500):
+    """Calls per second of ``func`` run ``count`` times, from its fastest batch of calls."""
+    best = None
+    done = 0
+    while done < count:
+        calls = min(batch, count - done)
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        per_call = (time.perf_counter() - start) / calls
+        best = per_call if best is None else min(best, per_call)
+        done += calls
+    return 1.0 / best
+
+
+def bench_size(size, count, repeat):
+    """Encode and decode throughput for one payload size, best of ``repeat`` runs."""
+    message = make_message(size)
+
+    writer_stream = io.BytesIO()
+    codec_writer = FrameWriter(writer_stream, max_size=size * 2 + 1024)
+
+    def codec_encode():
+        writer_stream.seek(0)
+        codec_writer.write(message)
+
+    def legacy_encode():
+        writer_stream.seek(0)
+        legacy_write(writer_stream, message)
+
+    frames = io.BytesIO()
+    writer = FrameWriter(frames, max_size=size * 2 + 1024)
+    for _ in range(count):
+        writer.write(message)
+    data = frames.getvalue()
+
+    def codec_decode():
+        reader = FrameReader(io.BytesIO(data), max_size=size * 2 + 1024)
+        return rate(reader.read, count)
+
+    def legacy_decode():
+        legacy_stream = io.BytesIO(data)
+        return rate(lambda: legacy_read(legacy_stream), count)
+
+    stats = dict.fromkeys(("encode_codec_msgs_per_s", "encode_legacy_msgs_per_s",
+                           "decode_codec_msgs_per_s", "decode_legacy_msgs_per_s"), 0.0)
+    # Cases alternate so a noisy stretch does not hit only one of them
+    for _ in range(repeat):
+        for name, value in (("encode_codec_msgs_per_s", rate(codec_encode, count)),
+                            ("encode_legacy_msgs_per_s", rate(legacy_encode, count)),
+                            ("decode_codec_msgs_per_s", codec_decode()),
+                            ("decode_legacy_msgs_per_s", legacy_decode())):
+            stats[name] = max(stats[name], value)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 1024, 16384, 262144])
+    parser.add_argument("--messages", type=int, default=20000, help="messages per size (scaled down for large sizes)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case, the best one counts")
+    parser.add_argument("--max-slowdown", type=float, default=10.0,
+                        help="fail when codec decoding is this many percent slower than the original")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    status = 0
+    print(f"  {'size':>8} {'enc codec':>12} {'enc legacy':>12} {'dec codec':>12} {'dec legacy':>12}  (msgs/s)")
+    for size in args.sizes:
+        count = max(200, min(args.messages, args.messages * 1024 // max(size, 1)))
+        stats = bench_size(size, count, max(1, args.repeat))
+        results[str(size)] = stats
+        print(
+            f"  {size:>8} {stats['encode_codec_msgs_per_s']:>12.0f} {stats['encode_legacy_msgs_per_s']:>12.0f}"
+            f" {stats['decode_codec_msgs_per_s']:>12.0f} {stats['decode_legacy_msgs_per_s']:>12.0f}"
+        )
+        slowdown = (1.0 - stats['decode_codec_msgs_per_s'] / stats['decode_legacy_msgs_per_s']) * 100.0
+        if slowdown > args.max_slowdown:
+            print(f"FAIL: codec decodes {size}-byte frames {slowdown:.1f}% slower than the original path")
+            status = 1
+
+    if args.json_path:
+        write_json(args.json_path, {"framing": results})
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Per-request logging cost: synchronous FileHandler vs the queue-backed setup.
+
+Each iteration logs what one ``launch`` request logs (the received message,
+the connection file write and the launch command) and the time spent in the
+calling thread is reported in microseconds per request. For the queue setup
+the background listener is drained afterwards and the drain time reported.
+
+Two patterns are measured: a tight burst, where the listener thread competes
+with the caller for the GIL, and paced requests with an idle gap between
+them, which is how the browser actually drives the host.
+
+    python benchmarks/bench_logging.py --requests 20000
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from _common import write_json
+
+from realvnc_host.config import Settings
+from realvnc_host.logsetup import configure_logging, shutdown_logging
+
+MESSAGE = {
+    "action": "launch",
+    "requestId": "42",
+    "connectionFile": "temp\\vnc_connection_1700000000000_1234.svn",
+    "svnContent": "[connection]\nhost=10.0.0.1\nport=5900\npassword=secret\n" * 4,
+}
+
+
+def log_legacy_request(logger):
+    """The original eager f-string logging of one launch."""
+    logger.info(f"Received message: {MESSAGE}")
+    logger.info(f"SVN file created: {MESSAGE['connectionFile']}")
+    logger.info(f"RealVNC launched with command: /usr/bin/vncviewer {MESSAGE['connectionFile']}")
+
+
+def log_request(logger):
+    """The same launch logged the way the host logs it now."""
+    logger.info("Received message: %s", MESSAGE)
+    logger.info(f"SVN file created: {MESSAGE['connectionFile']}")
+    logger.info(f"RealVNC launched with command: /usr/bin/vncviewer {MESSAGE['connectionFile']}")
+
+
+def reset_root():
+    """Remove and close every root handler."""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+
+
+def time_requests(func, logger, count):
+    """Microseconds per request spent in the calling thread, back to back."""
+    start = time.perf_counter()
+    for _ in range(count):
+        func(logger)
+    return (time.perf_counter() - start) * 1e6 / count
+
+
+def time_paced_requests(func, logger, count, pace):
+    """Microseconds per request spent in the calling thread, with ``pace`` seconds between requests."""
+    total = 0.0
+    for _ in range(count):
+        start = time.perf_counter()
+        func(logger)
+        total += time.perf_counter() - start
+        time.sleep(pace)
+    return total * 1e6 / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000, help="requests in the burst runs")
+    parser.add_argument("--paced-requests", type=int, default=2000, help="requests in the paced runs")
+    parser.add_argument("--pace-ms", type=float, default=0.5, help="idle gap between paced requests")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench")
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="realvnc-log-bench-") as tmp:
+        # Original setup: DEBUG level, synchronous FileHandler
+        reset_root()
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[logging.FileHandler(os.path.join(tmp, "legacy.log"))]
+        )
+        results["sync_file_handler_burst_us"] = time_requests(log_legacy_request, logger, args.requests)
+        results["sync_file_handler_paced_us"] = time_paced_requests(
+            log_legacy_request, logger, args.paced_requests, args.pace_ms / 1000.0)
+        reset_root()
+
+        # Queue handler + background listener with a rotating file
+        os.environ["REALVNC_HOST_LOG_FILE"] = os.path.join(tmp, "queued.log")
+        os.environ["REALVNC_HOST_LOG_STDERR"] = "0"
+        os.environ["REALVNC_HOST_LOG_MAX_BYTES"] = str(512 * 1024 * 1024)
+        configure_logging(Settings())
+        results["queue_handler_burst_us"] = time_requests(log_request, logger, args.requests)
+        results["queue_handler_paced_us"] = time_paced_requests(
+            log_request, logger, args.paced_requests, args.pace_ms / 1000.0)
+        start = time.perf_counter()
+        shutdown_logging()
+        results["queue_drain_ms"] = (time.perf_counter() - start) * 1000.0
+        reset_root()
+
+        # Levels above INFO: lazy arguments are never formatted
+        os.environ["REALVNC_HOST_LOG_LEVEL"] = "WARNING"
+        configure_logging(Settings())
+        results["queue_handler_level_warning_burst_us"] = time_requests(log_request, logger, args.requests)
+        shutdown_logging()
+        reset_root()
+
+    for name, value in results.items():
+        print(f"  {name:<38} {value:>10.2f}")
+
+    if args.json_path:
+        write_json(args.json_path, {"logging": results})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
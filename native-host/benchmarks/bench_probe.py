@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+probe_hosts benchmark against local fake RFB servers.
+
+Starts fake servers on 127.0.0.1 in a background event loop: RFB servers
+that send ``RFB 003.008\\n`` after a configurable delay, a server that
+accepts and stays silent, one that sends a non-RFB banner, and a port
+nobody listens on. Each run probes all of them and checks every result,
+then reports the total probe time. The silent server must be reported
+within the deadline, so the total stays close to ``--timeout``.
+
+    python benchmarks/bench_probe.py --hosts 64 --delay-ms 20 --timeout 0.5
+"""
+
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+
+from _common import print_table, summarize, write_json
+
+from realvnc_host.probe import probe_hosts
+
+# Slack on top of the deadline before a run counts as overrunning it
+DEADLINE_SLACK_MS = 250
+
+
+class FakeServers:
+    """Fake RFB, silent and non-RFB servers served by one event loop in a thread."""
+
+    def __init__(self, rfb_count, delay):
+        self.rfb_count = rfb_count
+        self.delay = delay
+        self.rfb_ports = []
+        self.silent_port = None
+        self.other_port = None
+        self._servers = []
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    async def _serve_rfb(self, reader, writer):
+        await asyncio.sleep(self.delay)
+        writer.write(b"RFB 003.008\n")
+        await writer.drain()
+        # The probe hangs up after the banner
+        await reader.read()
+        writer.close()
+
+    async def _serve_silent(self, reader, writer):
+        await reader.read()
+        writer.close()
+
+    async def _serve_other(self, reader, writer):
+        writer.write(b"SSH-2.0-OpenSSH_9.6\r\n")
+        await writer.drain()
+        await reader.read()
+        writer.close()
+
+    async def _start(self):
+        servers = []
+        for _ in range(self.rfb_count):
+            servers.append(await asyncio.start_server(self._serve_rfb, "127.0.0.1", 0))
+        self.rfb_ports = [server.sockets[0].getsockname()[1] for server in servers]
+        silent = await asyncio.start_server(self._serve_silent, "127.0.0.1", 0)
+        other = await asyncio.start_server(self._serve_other, "127.0.0.1", 0)
+        self.silent_port = silent.sockets[0].getsockname()[1]
+        self.other_port = other.sockets[0].getsockname()[1]
+        self._servers = servers + [silent, other]
+
+    async def _shutdown(self):
+        for server in self._servers:
+            server.close()
+        # Connection handlers still waiting on a client, the silent server's above all
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_until_complete(self._start())
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.run_until_complete(self._shutdown())
+        self._loop.close()
+
+    def start(self):
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def closed_port():
+    """A local port with nothing listening on it."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def check(results, servers, closed):
+    """Assert that every result matches what its fake server does."""
+    by_port = {result["port"]: result for result in results}
+    assert len(by_port) == len(servers.rfb_ports) + 3, f"{len(results)} results for {len(by_port)} ports"
+    for port in servers.rfb_ports:
+        result = by_port[port]
+        assert result["reachable"] and result["rfb"] == "3.8", f"RFB server on {port}: {result}"
+    silent = by_port[servers.silent_port]
+    assert silent["reachable"] and silent["rfb"] is None, f"silent server: {silent}"
+    other = by_port[servers.other_port]
+    assert other["reachable"] and other["rfb"] is None, f"non-RFB server: {other}"
+    assert other.get("error") == "Not an RFB server", f"non-RFB server: {other}"
+    assert not by_port[closed]["reachable"] and by_port[closed]["rfb"] is None, f"closed port: {by_port[closed]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--hosts", type=int, default=64, help="fake RFB servers to probe")
+    parser.add_argument("--delay-ms", type=float, default=20.0, help="delay before each RFB banner")
+    parser.add_argument("--timeout", type=float, default=0.5, help="probe deadline in seconds")
+    parser.add_argument("--concurrency", type=int, default=64, help="connections open at once")
+    parser.add_argument("--runs", type=int, default=10, help="probe runs")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    servers = FakeServers(args.hosts, args.delay_ms / 1000.0)
+    servers.start()
+    closed = closed_port()
+    targets = [("127.0.0.1", port) for port in servers.rfb_ports]
+    targets += [("127.0.0.1", servers.silent_port), ("127.0.0.1", servers.other_port), ("127.0.0.1", closed)]
+
+    samples = []
+    banner_samples = []
+    failures = []
+    try:
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            results = probe_hosts(targets, args.timeout, args.concurrency)
+            samples.append((time.perf_counter() - started) * 1000.0)
+            banner_samples.extend(result["bannerMs"] for result in results if result["rfb"])
+            try:
+                check(results, servers, closed)
+            except AssertionError as e:
+                failures.append(str(e))
+    finally:
+        servers.stop()
+
+    rows = {
+        f"probe_{len(targets)}_hosts": summarize(samples),
+        "rfb_banner": summarize(banner_samples),
+    }
+    print_table(f"probe_hosts ({args.hosts} RFB servers, banner after {args.delay_ms:g} ms,"
+                f" deadline {args.timeout:g} s, concurrency {args.concurrency})", rows)
+
+    budget = args.timeout * 1000.0 + DEADLINE_SLACK_MS
+    status = 0
+    if failures:
+        print(f"FAIL: {len(failures)} wrong results, first: {failures[0]}")
+        status = 1
+    if max(samples) > budget:
+        print(f"FAIL: slowest probe took {max(samples):.1f} ms, deadline plus slack is {budget:.0f} ms")
+        status = 1
+
+    if args.json_path:
+        write_json(args.json_path, {"probe": rows})
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
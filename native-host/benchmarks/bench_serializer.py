@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON backend benchmark: stdlib ``json`` vs ``orjson`` on large batched responses.
+
+Builds the responses the host sends in bulk -- a ``sessions`` table with
+many rows, a ``stats`` dump with every histogram populated and a
+``launch_many`` summary -- and measures frame encode (``FrameWriter``) and
+decode (``FrameReader``) with each available backend.
+
+    python benchmarks/bench_serializer.py --sessions 50 200
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+
+from _common import write_json
+
+from realvnc_host.framing import FrameReader, FrameWriter
+from realvnc_host.launcher import HANDLERS
+from realvnc_host.metrics import Metrics
+from realvnc_host.serializer import load_backend, select_backend
+from realvnc_host.supervisor import Session
+
+
+def sessions_response(count):
+    """A ``sessions`` response with ``count`` rows, half of them exited."""
+    rows = []
+    for index in range(count):
+        session = Session(10000 + index, f"10.0.{index // 250}.{index % 250}:5900",
+                          f"/usr/bin/vncviewer /tmp/spool/{index:032x}.svn")
+        if index % 2:
+            session.ended_at = session.started_at + random.random() * 3600
+            session.returncode = 0
+        rows.append(session.to_dict())
+    return {"success": True, "sessions": rows, "supervisor": {"active": count // 2, "reaper": "pidfd"},
+            "requestId": "1"}
+
+
+def stats_response():
+    """A ``stats`` response with every action and launch phase populated."""
+    metrics = Metrics()
+    for action in HANDLERS.names():
+        for _ in range(500):
+            metrics.record(action, random.expovariate(200.0), random.random() > 0.05)
+            metrics.observe_phase(action, 'decode', random.expovariate(20000.0))
+    for phase in ('write', 'resolve', 'spawn'):
+        for _ in range(500):
+            metrics.observe_phase('launch', phase, random.expovariate(1000.0))
+    return dict(metrics.snapshot(), success=True, requestId="2")
+
+
+def batch_summary(count):
+    """A ``launch_many`` summary for ``count`` hosts."""
+    return {"success": True, "total": count, "launched": count, "failed": 0,
+            "pids": list(range(20000, 20000 + count)), "requestId": "3"}
+
+
+def rate(func, seconds=0.5):
+    """Calls per second of ``func`` over roughly ``seconds``."""
+    count = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while True:
+        for _ in range(20):
+            func()
+        count += 20
+        now = time.perf_counter()
+        if now >= deadline:
+            return count / (now - start)
+
+
+def bench_backend(name, message):
+    """(encoded size, encodes/s, decodes/s) for one message with one backend."""
+    backend, loads, dumps = load_backend(name)
+    sink = io.BytesIO()
+    writer = FrameWriter(sink, dumps=dumps)
+
+    def encode():
+        sink.seek(0)
+        writer.write(message)
+
+    encode()
+    frame = sink.getvalue()[:sink.tell()]
+    source = io.BytesIO(frame)
+    reader = FrameReader(source, loads=loads)
+
+    def decode():
+        source.seek(0)
+        reader.read()
+
+    return backend, len(frame) - 4, rate(encode), rate(decode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[50, 200], help="session table sizes")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    random.seed(1)
+    cases = {f"sessions_{count}": sessions_response(count) for count in args.sessions}
+    cases["stats"] = stats_response()
+    cases["launch_many_summary_32"] = batch_summary(32)
+
+    backends = ["json"]
+    if select_backend("orjson") == "orjson":
+        backends.append("orjson")
+    else:
+        print("orjson is not installed, only the stdlib backend is measured")
+
+    results = {}
+    print(f"  {'case':<24} {'backend':<8} {'bytes':>8} {'encode/s':>12} {'decode/s':>12}")
+    for case, message in cases.items():
+        for name in backends:
+            backend, size, encodes, decodes = bench_backend(name, message)
+            results.setdefault(case, {})[backend] = {
+                "bytes": size, "encode_per_s": encodes, "decode_per_s": decodes}
+            print(f"  {case:<24} {backend:<8} {size:>8} {encodes:>12.0f} {decodes:>12.0f}")
+
+    if args.json_path:
+        write_json(args.json_path, {"serializer": results})
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
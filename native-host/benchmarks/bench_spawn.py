@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Viewer spawn latency: ``Popen`` as launches used it vs the spawn backends.
+
+Starts a stub viewer (``exit 0``) over and over and times the spawn call
+only; each child is reaped outside the measurement. Cases:
+
+* ``popen_default``: ``Popen(cmd, stdout=DEVNULL, stderr=DEVNULL)``, the
+  path launches took before the spawn backends;
+* ``popen``: ``Spawner("popen")``, detached with null stdio;
+* ``posix_spawn``: ``Spawner("auto")`` where ``os.posix_spawnp`` exists.
+
+``--open-fds`` and ``--heap-mb`` make the process look like a host that has
+been running for a while (many descriptors, a bigger heap). POSIX only.
+
+    python benchmarks/bench_spawn.py --runs 200 --open-fds 0 1000 --heap-mb 0 200
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import print_table, stub_viewer, summarize, write_json
+
+from realvnc_host.spawn import Spawner, posix_spawn_supported
+
+
+def popen_default(cmd):
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return process.pid, process
+
+
+def time_spawns(spawn, cmd, runs):
+    """Milliseconds per spawn call, the child reaped after each sample."""
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        pid, process = spawn(cmd)
+        samples.append((time.perf_counter() - started) * 1000.0)
+        # A Popen must reap its own child, subprocess would otherwise collect it behind our back
+        if process is not None:
+            process.wait()
+        else:
+            os.waitpid(pid, 0)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=200, help="spawns per case")
+    parser.add_argument("--open-fds", type=int, nargs="+", default=[0, 1000],
+                        help="extra descriptors held open by the spawning process")
+    parser.add_argument("--heap-mb", type=int, nargs="+", default=[0], help="extra heap of the spawning process")
+    parser.add_argument("--max-ratio", type=float, default=1.1,
+                        help="fail when posix_spawn's median exceeds popen_default's times this")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    if os.name != "posix":
+        print("bench_spawn measures POSIX spawn paths only")
+        return 0
+
+    workdir = tempfile.mkdtemp(prefix="realvnc-bench-spawn-")
+    cmd = [stub_viewer(workdir)]
+    cases = {
+        "popen_default": popen_default,
+        "popen": Spawner("popen").spawn,
+    }
+    if posix_spawn_supported():
+        cases["posix_spawn"] = Spawner("auto").spawn
+    else:
+        print("os.posix_spawnp is not available, only Popen is measured")
+
+    results = {}
+    status = 0
+    for heap_mb in args.heap_mb:
+        # Touched so the pages are really mapped
+        heap = bytearray(heap_mb * 1024 * 1024)
+        heap[::4096] = b"\x01" * len(heap[::4096])
+        for open_fds in args.open_fds:
+            held = [os.open(os.devnull, os.O_RDONLY) for _ in range(open_fds)]
+            try:
+                rows = {name: summarize(time_spawns(spawn, cmd, args.runs)) for name, spawn in cases.items()}
+            finally:
+                for fd in held:
+                    os.close(fd)
+            label = f"fds_{open_fds}_heap_{heap_mb}mb"
+            results[label] = rows
+            print_table(f"spawn latency, {open_fds} extra descriptors, {heap_mb} MB heap", rows)
+            if "posix_spawn" in rows:
+                ratio = rows["posix_spawn"]["median"] / rows["popen_default"]["median"]
+                print(f"  posix_spawn / popen_default median: {ratio:.2f}")
+                if ratio > args.max_ratio:
+                    print(f"FAIL: posix_spawn is slower than allowed ({ratio:.2f} > {args.max_ratio:.2f})")
+                    status = 1
+        del heap
+
+    if args.json_path:
+        write_json(args.json_path, {"spawn": results})
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
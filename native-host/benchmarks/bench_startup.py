@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Native host cold start benchmark: time from process spawn to the first response.
+
+The host is started the way the browser starts it (through
+``realvnc_launcher.sh`` on macOS/Linux, ``realvnc_launcher.bat`` on Windows),
+a single frame is written, and the clock stops when the complete response
+frame has been read. Two first requests are timed, with the daemon off as
+on Windows:
+
+* a plain ``ping``, answered by the fast path before the host is imported;
+* a ``launch`` of a stub viewer (POSIX only), which is what the extension
+  really sends first (its own first ping asks for a warm-up) and goes
+  through the whole launcher.
+
+Exits with status 1 when either median exceeds its budget.
+
+With ``--bundle`` the wrapper is timed twice from scratch copies of the host:
+once launching the ``.py`` sources as today, once launching the precompiled
+zipapp from ``build_zipapp.py`` with ``-I -S``. Both copies share one state
+directory, so the cached interpreter path is in use for every measured run.
+The budgets apply to the bundle.
+
+With ``--daemon`` (POSIX) the same wrapper is also timed in the default
+POSIX mode, as a relay to the shared daemon on a private socket, next to
+the in-process rows the budgets apply to:
+
+* ``daemon cold``: no daemon is running, the relay spawns one, waits for
+  it and gets the pong through it (a fresh socket every run);
+* ``daemon warm``: first pong and first launch relayed to a running daemon;
+* ``connect + handshake``: connecting to that daemon's socket and
+  exchanging builds, measured in process.
+
+    python benchmarks/bench_startup.py --runs 30 --budget-ms 50 --launch-budget-ms 100
+    python benchmarks/bench_startup.py --bundle
+    python benchmarks/bench_startup.py --daemon
+    python benchmarks/bench_startup.py --command python3 realvnc_launcher.py
+"""
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from _common import HOST_DIR, encode_frame, print_table, read_frame, stub_viewer, summarize, write_json
+
+
+def default_command():
+    """The browser-facing wrapper for this platform."""
+    if os.name == "nt":
+        return [os.path.join(HOST_DIR, "realvnc_launcher.bat")]
+    return ["/bin/bash", os.path.join(HOST_DIR, "realvnc_launcher.sh")]
+
+
+def staged_hosts(workdir):
+    """Wrapper commands for a source copy and a bundle copy of the host under ``workdir``."""
+    from build_zipapp import build
+
+    wrapper = "realvnc_launcher.bat" if os.name == "nt" else "realvnc_launcher.sh"
+    commands = {}
+    for layout in ("source", "bundle"):
+        target = os.path.join(workdir, layout)
+        os.makedirs(target)
+        shutil.copy2(os.path.join(HOST_DIR, wrapper), target)
+        if layout == "source":
+            shutil.copy2(os.path.join(HOST_DIR, "realvnc_launcher.py"), target)
+            shutil.copytree(os.path.join(HOST_DIR, "realvnc_host"), os.path.join(target, "realvnc_host"),
+                            ignore=shutil.ignore_patterns("__pycache__"))
+        else:
+            build(os.path.join(target, "realvnc_host.pyz"))
+        path = os.path.join(target, wrapper)
+        commands[f"{wrapper} ({layout})"] = [path] if os.name == "nt" else ["/bin/bash", path]
+    return commands
+
+
+def time_first_response(command, env, message):
+    """Spawn the host once, send ``message`` and return ``(milliseconds, response)``."""
+    frame = encode_frame(message)
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        env=env
+    )
+    try:
+        process.stdin.write(frame)
+        process.stdin.flush()
+        response = read_frame(process.stdout)
+        elapsed = (time.perf_counter() - start) * 1000.0
+    finally:
+        process.stdin.close()
+        process.wait(timeout=30)
+        process.stdout.close()
+    return elapsed, response
+
+
+def time_first_pong(command, env):
+    """Spawn the host once and return milliseconds until the pong frame is read."""
+    elapsed, response = time_first_response(command, env, {"action": "ping", "requestId": "bench"})
+    if not response or response.get("message") != "pong":
+        raise RuntimeError(f"Unexpected response from host: {response!r}")
+    return elapsed
+
+
+def time_first_launch(command, env, viewer, index=0):
+    """Spawn the host once and return milliseconds until its first launch is answered."""
+    elapsed, response = time_first_response(command, env, {
+        "action": "launch",
+        "requestId": "bench",
+        "vncPath": viewer,
+        "connectionFile": "temp\\vnc_connection_bench.svn",
+        # A new profile each run, so every launch writes one
+        "svnContent": f"[connection]\nhost=10.1.{index // 250 % 250}.{index % 250}\nport=5900\n",
+    })
+    if not response or not response.get("success"):
+        raise RuntimeError(f"Unexpected response from host: {response!r}")
+    return elapsed
+
+
+def daemon_env(env, socket_path):
+    """``env`` with the host relaying to a private daemon on ``socket_path``."""
+    return dict(env, REALVNC_HOST_DAEMON="on", REALVNC_HOST_DAEMON_SOCKET=socket_path,
+                REALVNC_HOST_DAEMON_IDLE_TIMEOUT="5")
+
+
+def daemon_build():
+    """Build fingerprint of the daemon the wrapper starts (it runs ``realvnc_launcher.py``)."""
+    from realvnc_host.relay import build_fingerprint
+
+    return build_fingerprint(os.path.join(HOST_DIR, "realvnc_launcher.py"))
+
+
+def daemon_connection(socket_path, build):
+    """A socket to the daemon on ``socket_path`` past the handshake."""
+    from realvnc_host.relay import HANDSHAKE_OK, connect, handshake
+
+    sock = connect(socket_path)
+    if sock is None:
+        raise RuntimeError(f"No daemon listening on {socket_path}")
+    answer = handshake(sock, build, 5.0)
+    if answer != HANDSHAKE_OK:
+        sock.close()
+        raise RuntimeError(f"Daemon handshake failed: {answer!r}")
+    return sock
+
+
+def time_daemon_handshake(socket_path, build):
+    """Milliseconds to connect to a running daemon and exchange builds."""
+    start = time.perf_counter()
+    sock = daemon_connection(socket_path, build)
+    elapsed = (time.perf_counter() - start) * 1000.0
+    sock.close()
+    return elapsed
+
+
+def stop_daemon(socket_path, build):
+    """Ask the daemon on ``socket_path`` for its pid and terminate it."""
+    sock = daemon_connection(socket_path, build)
+    try:
+        sock.sendall(encode_frame({"action": "stats"}))
+        with sock.makefile("rb") as stream:
+            response = read_frame(stream)
+    finally:
+        sock.close()
+    os.kill(response["daemon"]["pid"], signal.SIGTERM)
+    # Wait for it to release the socket, so it takes no CPU from the next measurement
+    deadline = time.monotonic() + 5.0
+    while os.path.exists(socket_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def daemon_cases(command, env, viewer, workdir, runs, warmup, launches):
+    """``(pong rows, launch rows, handshake row)`` of the wrapper relaying to a private daemon."""
+    build = daemon_build()
+    cold = []
+    for index in range(warmup + runs):
+        socket_path = os.path.join(workdir, f"cold{index}.sock")
+        elapsed = time_first_pong(command, daemon_env(env, socket_path))
+        stop_daemon(socket_path, build)
+        if index >= warmup:
+            cold.append(elapsed)
+
+    socket_path = os.path.join(workdir, "warm.sock")
+    warm_env = daemon_env(env, socket_path)
+    try:
+        for _ in range(warmup):
+            time_first_pong(command, warm_env)
+        warm = [time_first_pong(command, warm_env) for _ in range(runs)]
+        launch = []
+        if viewer is not None:
+            for _ in range(warmup):
+                time_first_launch(command, warm_env, viewer, next(launches))
+            launch = [time_first_launch(command, warm_env, viewer, next(launches)) for _ in range(runs)]
+        handshake = [time_daemon_handshake(socket_path, build) for _ in range(runs)]
+    finally:
+        stop_daemon(socket_path, build)
+
+    pong_rows = {"daemon cold": summarize(cold), "daemon warm": summarize(warm)}
+    launch_rows = {"daemon warm": summarize(launch)} if launch else {}
+    return pong_rows, launch_rows, summarize(handshake)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20, help="measured runs")
+    parser.add_argument("--warmup", type=int, default=3, help="unmeasured runs (fills OS caches)")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="fail when the first pong's median exceeds this")
+    parser.add_argument("--launch-budget-ms", type=float, default=100.0,
+                        help="fail when the first launch's median exceeds this")
+    parser.add_argument("--bundle", action="store_true", help="compare the source layout with the zipapp bundle")
+    parser.add_argument("--daemon", action="store_true", help="also time the wrapper relaying to a shared daemon")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--command", nargs=argparse.REMAINDER, help="host command instead of the wrapper")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="realvnc-bench-") as home:
+        # Keep the benchmark's log, cache and spool files out of the real home directory,
+        # and time the host itself rather than a relay to the user's daemon
+        env = dict(os.environ, HOME=home, USERPROFILE=home, REALVNC_HOST_STATE_DIR=os.path.join(home, "state"),
+                   REALVNC_HOST_SPOOL_DIR=os.path.join(home, "spool"), LOCALAPPDATA=home,
+                   REALVNC_HOST_DAEMON="off")
+        # A stub viewer started through cmd /c start would open a console window on Windows
+        viewer = stub_viewer(home) if os.name == "posix" else None
+
+        if args.bundle:
+            commands = staged_hosts(os.path.join(home, "hosts"))
+        else:
+            command = args.command or default_command()
+            commands = {" ".join(os.path.basename(c) for c in command): command}
+
+        pong_rows = {}
+        launch_rows = {}
+        launches = iter(range(10 ** 9))
+        for name, command in commands.items():
+            for _ in range(args.warmup):
+                time_first_pong(command, env)
+            pong_rows[name] = summarize([time_first_pong(command, env) for _ in range(args.runs)])
+            if viewer is not None:
+                for _ in range(args.warmup):
+                    time_first_launch(command, env, viewer, next(launches))
+                launch_rows[name] = summarize([time_first_launch(command, env, viewer, next(launches))
+                                               for _ in range(args.runs)])
+        # The layout the budgets apply to, the last one timed in process
+        budgeted = name
+
+        handshake = None
+        if args.daemon and os.name == "posix":
+            daemon_pongs, daemon_launches, handshake = daemon_cases(
+                command, env, viewer, home, args.runs, args.warmup, launches)
+            pong_rows.update(daemon_pongs)
+            launch_rows.update(daemon_launches)
+        elif args.daemon:
+            print("The daemon is POSIX only, not measured on this platform")
+
+    print_table("Time to first pong", pong_rows)
+    if launch_rows:
+        print_table("Time to first launch", launch_rows)
+    else:
+        print("First launch not measured on this platform")
+    if handshake is not None:
+        print_table("Daemon connect + handshake", {"connect + handshake": handshake})
+    checks = [("first pong", pong_rows[budgeted], args.budget_ms)]
+    if launch_rows:
+        checks.append(("first launch", launch_rows[budgeted], args.launch_budget_ms))
+
+    if args.json_path:
+        result = {"startup_first_pong_ms": pong_rows[budgeted], "budget_ms": args.budget_ms}
+        if launch_rows:
+            result["startup_first_launch_ms"] = launch_rows[budgeted]
+            result["launch_budget_ms"] = args.launch_budget_ms
+        if args.bundle or args.daemon:
+            result["layouts_ms"] = pong_rows
+            if launch_rows:
+                result["launch_layouts_ms"] = launch_rows
+        if handshake is not None:
+            result["daemon_handshake_ms"] = handshake
+        write_json(args.json_path, result)
+
+    status = 0
+    for label, stats, budget in checks:
+        if stats["median"] > budget:
+            print(f"FAIL: {label} median {stats['median']:.1f} ms exceeds budget {budget:.1f} ms")
+            status = 1
+        else:
+            print(f"OK: {label} median {stats['median']:.1f} ms within budget {budget:.1f} ms")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Native host hot-path benchmark suite with JSON baselines.
+
+Covers frame encode/decode, ``get_default_vnc_path`` (warm cache and cold
+probe), connection-file writes (new and content-addressed reuse), a full
+``launch`` request against a stub viewer executable, with and without a
+prepared plan (POSIX only), and host cold start through the browser-facing
+wrapper, to the first pong and to the first launch (POSIX only). The
+``daemon`` group (POSIX) times the same wrapper in its default POSIX mode,
+relaying to a private shared daemon: a cold daemon spawn, the first pong and
+launch through a warm one, and the relay's connect + handshake. Each case
+runs several rounds and reports per-operation microseconds.
+
+``--save`` writes the results as a baseline; ``--compare`` checks a run
+against a baseline and exits with status 1 when any case's median is slower
+by more than ``--threshold`` percent.
+
+    python benchmarks/bench_suite.py --save baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json --threshold 15
+    python benchmarks/bench_suite.py --groups framing host
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from _common import HOST_DIR, stub_viewer, summarize, write_json
+
+from bench_startup import daemon_cases, default_command, time_first_launch, time_first_pong
+
+GROUPS = ("framing", "host", "startup", "daemon")
+
+
+def measure(func, rounds, inner):
+    """Per-call microseconds of ``func``, one sample per round of ``inner`` calls."""
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(inner):
+            func()
+        samples.append((time.perf_counter() - start) * 1e6 / inner)
+    return summarize(samples)
+
+
+def launch_message(index):
+    return {
+        "action": "launch",
+        "requestId": str(index),
+        "connectionFile": "temp\\vnc_connection_bench.svn",
+        "svnContent": f"[connection]\nhost=10.0.{index // 250 % 250}.{index % 250}\nport=5900\npassword=secret\n",
+    }
+
+
+def framing_cases(rounds, inner):
+    from realvnc_host.framing import FrameReader, FrameWriter
+
+    results = {}
+    for label, size in (("1k", 1024), ("64k", 64 * 1024)):
+        message = launch_message(0)
+        message["svnContent"] += "x" * size
+        sink = io.BytesIO()
+        writer = FrameWriter(sink, max_size=size * 2)
+
+        def encode():
+            sink.seek(0)
+            writer.write(message)
+
+        results[f"frame_encode_{label}"] = measure(encode, rounds, inner)
+
+        stream = io.BytesIO(sink.getvalue() * inner)
+        reader = FrameReader(stream, max_size=size * 2)
+
+        def decode():
+            if reader.read() is None:
+                stream.seek(0)
+                reader.read()
+
+        results[f"frame_decode_{label}"] = measure(decode, rounds, inner)
+    return results
+
+
+def host_cases(rounds, inner, workdir):
+    from realvnc_host.launcher import RealVNCLauncher
+    from realvnc_host.framing import FrameReader, FrameWriter
+    from realvnc_host.plans import PlanCache
+
+    results = {}
+    launcher = RealVNCLauncher(reader=FrameReader(io.BytesIO()), writer=FrameWriter(io.BytesIO()))
+
+    results["vnc_path_warm"] = measure(launcher.get_default_vnc_path, rounds, inner)
+
+    def cold_resolve():
+        launcher.resolver.invalidate()
+        launcher.get_default_vnc_path()
+
+    results["vnc_path_cold"] = measure(cold_resolve, rounds, max(1, inner // 10))
+
+    counter = iter(range(10 ** 9))
+    results["spool_store_new"] = measure(
+        lambda: launcher.spool.store(launch_message(next(counter))["svnContent"]), rounds, max(1, inner // 10))
+    same = launch_message(0)["svnContent"]
+    results["spool_store_reuse"] = measure(lambda: launcher.spool.store(same), rounds, inner)
+
+    absolute = os.path.join(workdir, "absolute", "vnc_connection.svn")
+    results["write_connection_file_abs"] = measure(
+        lambda: launcher.write_connection_file(absolute, same), rounds, max(1, inner // 10))
+
+    # Validation of a good launch, and rejection of an oversized one before any I/O
+    handler, validate = launcher.handlers["launch"]
+    valid = launch_message(0)
+    results["validate_launch"] = measure(lambda: validate(valid), rounds, inner)
+    oversized = dict(valid, svnContent="x" * (128 * 1024))
+    # No handler is configured here; keep the rejection warnings off stderr
+    logging.disable(logging.WARNING)
+    try:
+        results["reject_oversized_launch"] = measure(lambda: launcher.handle_message(oversized), rounds, inner)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    if os.name == "posix":
+        launcher.supervisor.start()
+        try:
+            results["launch_full"] = measure(
+                lambda: launcher.process_message(launch_message(next(counter))), rounds, max(1, inner // 20))
+            # The same launch prepared beforehand, one plan per launch so none is coalesced
+            launches = rounds * max(1, inner // 20)
+            launcher.plans = PlanCache(ttl=3600.0, max_plans=launches)
+            plan_ids = iter([launcher.prepare_plan(launch_message(next(counter)))["planId"]
+                             for _ in range(launches)])
+            results["launch_prepared"] = measure(
+                lambda: launcher.process_message({"action": "launch", "planId": next(plan_ids)}),
+                rounds, max(1, inner // 20))
+        finally:
+            launcher.supervisor.stop()
+    return results
+
+
+def cold_start_case(rounds, env, viewer=None):
+    command = default_command()
+    time_first_pong(command, env)
+    samples = [time_first_pong(command, env) * 1000.0 for _ in range(rounds)]
+    results = {"cold_start_first_pong": summarize(samples)}
+    if viewer is not None:
+        time_first_launch(command, env, viewer)
+        samples = [time_first_launch(command, env, viewer, index) * 1000.0 for index in range(1, rounds + 1)]
+        results["cold_start_first_launch"] = summarize(samples)
+    return results
+
+
+def daemon_case(rounds, env, viewer, workdir):
+    """The host as a relay to a shared daemon, next to the in-process cold start cases."""
+    pongs, launches, handshake = daemon_cases(default_command(), env, viewer, workdir, rounds, 1, iter(range(10 ** 9)))
+    results = {f"{name.replace(' ', '_')}_first_pong": stats for name, stats in pongs.items()}
+    results.update((f"{name.replace(' ', '_')}_first_launch", stats) for name, stats in launches.items())
+    results["daemon_connect_handshake"] = handshake
+    # Milliseconds to microseconds, like every other case
+    return {name: {key: value * 1000.0 if key != "runs" else value for key, value in stats.items()}
+            for name, stats in results.items()}
+
+
+def compare(results, baseline, threshold):
+    """Print median deltas against a baseline; return the names of regressed cases."""
+    regressions = []
+    print(f"  {'case':<28} {'baseline':>12} {'current':>12} {'delta':>9}")
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if old is None:
+            print(f"  {name:<28} {'-':>12} {stats['median']:>12.2f} {'new':>9}")
+            continue
+        delta = (stats["median"] - old["median"]) / old["median"] * 100.0 if old["median"] else 0.0
+        flag = ""
+        if delta > threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"  {name:<28} {old['median']:>12.2f} {stats['median']:>12.2f} {delta:>+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=15, help="samples per case")
+    parser.add_argument("--inner", type=int, default=200, help="calls per sample (fewer for slow cases)")
+    parser.add_argument("--startup-runs", type=int, default=10, help="host cold starts to measure")
+    parser.add_argument("--groups", nargs="+", choices=GROUPS, default=list(GROUPS), help="case groups to run")
+    parser.add_argument("--save", help="write results to this baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=15.0, help="allowed median slowdown in percent")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="realvnc-suite-") as workdir:
+        # Isolate caches, spool and logs; the stub viewer is found on PATH
+        bin_dir = os.path.join(workdir, "bin")
+        os.makedirs(bin_dir)
+        if os.name == "posix":
+            stub_viewer(bin_dir)
+        env = dict(
+            os.environ,
+            HOME=workdir,
+            USERPROFILE=workdir,
+            PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""),
+            REALVNC_HOST_STATE_DIR=os.path.join(workdir, "state"),
+            REALVNC_HOST_SPOOL_DIR=os.path.join(workdir, "spool"),
+            REALVNC_HOST_SPOOL_SWEEP_INTERVAL="0",
+            REALVNC_HOST_LOG_STDERR="0",
+            REALVNC_HOST_DAEMON="off",
+        )
+        os.environ.update(env)
+
+        results = {}
+        if "framing" in args.groups:
+            results.update(framing_cases(args.rounds, args.inner))
+        if "host" in args.groups:
+            results.update(host_cases(args.rounds, args.inner, workdir))
+        if "startup" in args.groups:
+            viewer = os.path.join(bin_dir, "vncviewer") if os.name == "posix" else None
+            results.update(cold_start_case(args.startup_runs, env, viewer))
+        if "daemon" in args.groups and os.name == "posix":
+            viewer = os.path.join(bin_dir, "vncviewer")
+            results.update(daemon_case(args.startup_runs, env, viewer, workdir))
+
+    print(f"  {'case':<28} {'runs':>6} {'min':>10} {'median':>10} {'p95':>10} {'max':>10}  (us/op)")
+    for name, stats in results.items():
+        print(
+            f"  {name:<28} {stats['runs']:>6} {stats['min']:>10.2f} {stats['median']:>10.2f}"
+            f" {stats['p95']:>10.2f} {stats['max']:>10.2f}"
+        )
+
+    if args.save:
+        write_json(args.save, {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "host_dir": HOST_DIR,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "results": results,
+        })
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)["results"]
+        print(f"Against {args.compare} (threshold {args.threshold:.0f}%)")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} case(s) regressed: {', '.join(regressions)}")
+            return 1
+        print("OK: no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
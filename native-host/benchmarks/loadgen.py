@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load generator that drives the native host the way a browser does.
+
+Requests are length-prefixed JSON frames over the host's stdin/stdout, with a
+configurable mix of ``ping``, ``check_vnc`` and ``launch`` (against a stub
+``vncviewer`` on ``PATH``). The offered rate ramps up linearly to ``--rate``
+over ``--ramp`` seconds while at most ``--concurrency`` requests are in
+flight, like many tabs clicking at once.
+
+Two host models can be driven:
+
+* ``oneshot``: every request starts a new host process, as
+  ``runtime.sendNativeMessage`` does.
+* ``persistent``: one host serves every request over a single port with
+  ``requestId`` matching, as ``connectNative`` does.
+
+With ``--daemon`` every host is a relay to a shared daemon started on a
+private socket in the work directory, so ``oneshot`` measures what a browser
+pays per message when the daemon keeps the host warm.
+
+Reported: throughput, p50/p95/p99 latency overall and per action, errors,
+and memory (host RSS growth for the persistent model, peak child RSS for
+one-shot).
+
+    python benchmarks/loadgen.py --model both --rate 200 --concurrency 16 --duration 10
+    python benchmarks/loadgen.py --mix ping=1 --model persistent --rate 2000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import encode_frame, percentile, read_frame, stub_viewer, write_json
+
+from bench_startup import default_command
+
+MODELS = ("oneshot", "persistent")
+
+
+def parse_mix(text):
+    """``ping=5,check_vnc=3,launch=2`` to a list of (action, weight)."""
+    mix = []
+    for part in text.split(","):
+        action, _, weight = part.partition("=")
+        mix.append((action.strip(), float(weight or 1)))
+    return mix
+
+
+def request_for(action, index):
+    """A request body for ``action``; launches get a distinct profile each time."""
+    message = {"action": action}
+    if action == "launch":
+        message["connectionFile"] = f"temp\\vnc_connection_load_{index}.svn"
+        message["svnContent"] = f"[connection]\nhost=10.{index // 65025 % 255}.{index // 255 % 255}.{index % 255}\nport=5900\n"
+    return message
+
+
+def schedule(mix, rate, ramp, duration):
+    """Yield (send time offset, action) for an open-loop schedule with a linear rate ramp."""
+    total_weight = sum(weight for _, weight in mix)
+    credit = {action: 0.0 for action, _ in mix}
+    offset = 0.0
+    while offset < duration:
+        current = rate * min(1.0, (offset + 1e-9) / ramp) if ramp > 0 else rate
+        current = max(current, rate * 0.05)
+        # Smooth weighted round robin keeps the mix exact over short runs
+        for action, weight in mix:
+            credit[action] += weight
+        action = max(credit, key=credit.get)
+        credit[action] -= total_weight
+        yield offset, action
+        offset += 1.0 / current
+
+
+def rss_kib(pid):
+    """Resident set size of a process in KiB, or None where it cannot be read."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    try:
+        output = subprocess.run(["ps", "-o", "rss=", "-p", str(pid)], capture_output=True, text=True).stdout
+        return int(output.strip()) if output.strip() else None
+    except (OSError, ValueError):
+        return None
+
+
+class Recorder:
+    """Thread-safe latency samples per action."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.errors = {}
+
+    def add(self, action, latency_ms, success):
+        with self.lock:
+            self.samples.setdefault(action, []).append(latency_ms)
+            if not success:
+                self.errors[action] = self.errors.get(action, 0) + 1
+
+    def report(self, elapsed):
+        rows = {}
+        everything = []
+        for action, samples in sorted(self.samples.items()):
+            everything.extend(samples)
+            rows[action] = self._row(samples, self.errors.get(action, 0), elapsed)
+        rows["all"] = self._row(everything, sum(self.errors.values()), elapsed)
+        return rows
+
+    @staticmethod
+    def _row(samples, errors, elapsed):
+        return {
+            "requests": len(samples),
+            "errors": errors,
+            "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(samples, 50),
+            "p95_ms": percentile(samples, 95),
+            "p99_ms": percentile(samples, 99),
+            "max_ms": max(samples) if samples else 0.0,
+        }
+
+
+def drive(plan, concurrency, send):
+    """Issue ``plan`` on its schedule with at most ``concurrency`` requests in flight.
+
+    ``send(index, action)`` performs one request and blocks until it is answered.
+    """
+    slots = threading.BoundedSemaphore(concurrency)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load")
+    start = time.perf_counter()
+
+    def run(index, action):
+        try:
+            send(index, action)
+        finally:
+            slots.release()
+
+    for index, (offset, action) in enumerate(plan):
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # Closed loop once every slot is busy: the host is saturated
+        slots.acquire()
+        pool.submit(run, index, action)
+    pool.shutdown(wait=True)
+    return time.perf_counter() - start
+
+
+def run_oneshot(command, env, plan, concurrency):
+    """One host process per request."""
+    recorder = Recorder()
+
+    def send(index, action):
+        started = time.perf_counter()
+        success = False
+        latency = None
+        try:
+            process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=subprocess.DEVNULL, env=env)
+            try:
+                process.stdin.write(encode_frame(dict(request_for(action, index), requestId=str(index))))
+                process.stdin.close()
+                response = read_frame(process.stdout)
+                # The browser has its answer here; host shutdown only holds a slot
+                latency = (time.perf_counter() - started) * 1000.0
+                success = bool(response and response.get("success"))
+            finally:
+                process.wait(timeout=60)
+                process.stdout.close()
+        except Exception as e:
+            print(f"  request {index} failed: {e}", file=sys.stderr)
+        if latency is None:
+            latency = (time.perf_counter() - started) * 1000.0
+        recorder.add(action, latency, success)
+
+    elapsed = drive(plan, concurrency, send)
+    memory = {}
+    if hasattr(os, "getuid"):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        # KiB on Linux, bytes on macOS
+        memory["peak_child_rss_kib"] = peak // 1024 if sys.platform == "darwin" else peak
+    return recorder.report(elapsed), memory, elapsed
+
+
+def run_persistent(command, env, plan, concurrency):
+    """One host process, requests multiplexed by requestId."""
+    recorder = Recorder()
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               stderr=subprocess.DEVNULL, env=env)
+    pending = {}
+    pending_lock = threading.Lock()
+    write_lock = threading.Lock()
+
+    def reader():
+        while True:
+            response = read_frame(process.stdout)
+            if response is None:
+                break
+            if response.get("partial"):
+                continue
+            with pending_lock:
+                waiter = pending.pop(response.get("requestId"), None)
+            if waiter is not None:
+                waiter[1].append(response)
+                waiter[0].set()
+        # Host gone: release everyone still waiting
+        with pending_lock:
+            for event, _ in pending.values():
+                event.set()
+            pending.clear()
+
+    reader_thread = threading.Thread(target=reader, daemon=True)
+    reader_thread.start()
+
+    # Warm the host (first request pays the lazy imports) before sampling memory
+    warm = threading.Event()
+    with pending_lock:
+        pending["warm"] = (warm, [])
+    with write_lock:
+        process.stdin.write(encode_frame({"action": "check_vnc", "requestId": "warm"}))
+        process.stdin.flush()
+    warm.wait(30)
+    rss_start = rss_kib(process.pid)
+
+    def send(index, action):
+        event = threading.Event()
+        box = []
+        request_id = str(index)
+        with pending_lock:
+            pending[request_id] = (event, box)
+        started = time.perf_counter()
+        with write_lock:
+            process.stdin.write(encode_frame(dict(request_for(action, index), requestId=request_id)))
+            process.stdin.flush()
+        event.wait(60)
+        success = bool(box and box[0].get("success"))
+        recorder.add(action, (time.perf_counter() - started) * 1000.0, success)
+
+    elapsed = drive(plan, concurrency, send)
+    rss_end = rss_kib(process.pid)
+    process.stdin.close()
+    process.wait(timeout=60)
+    reader_thread.join(timeout=5)
+    process.stdout.close()
+
+    memory = {"rss_start_kib": rss_start, "rss_end_kib": rss_end}
+    if rss_start is not None and rss_end is not None:
+        memory["rss_growth_kib"] = rss_end - rss_start
+    return recorder.report(elapsed), memory, elapsed
+
+
+def print_report(model, rows, memory, elapsed):
+    print(f"{model}: {rows['all']['requests']} requests in {elapsed:.2f} s")
+    print(f"  {'action':<12} {'reqs':>7} {'err':>5} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}  (ms)")
+    for action, row in rows.items():
+        print(
+            f"  {action:<12} {row['requests']:>7} {row['errors']:>5} {row['throughput_rps']:>9.1f}"
+            f" {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} {row['p99_ms']:>9.2f} {row['max_ms']:>9.2f}"
+        )
+    if memory:
+        print("  memory: " + ", ".join(f"{key}={value}" for key, value in memory.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--model", choices=MODELS + ("both",), default="both")
+    parser.add_argument("--mix", default="ping=5,check_vnc=3,launch=2", help="action=weight list")
+    parser.add_argument("--rate", type=float, default=100.0, help="target requests per second")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds to ramp up to the target rate")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=8, help="maximum requests in flight")
+    parser.add_argument("--daemon", action="store_true", help="relay every host to a shared daemon")
+    parser.add_argument("--json", dest="json_path", help="write results to this JSON file")
+    parser.add_argument("--command", nargs=argparse.REMAINDER, help="host command instead of the wrapper")
+    args = parser.parse_args()
+
+    command = args.command or default_command()
+    mix = parse_mix(args.mix)
+    models = MODELS if args.model == "both" else (args.model,)
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix="realvnc-load-") as workdir:
+        bin_dir = os.path.join(workdir, "bin")
+        os.makedirs(bin_dir)
+        if os.name == "posix":
+            stub_viewer(bin_dir)
+        env = dict(
+            os.environ,
+            HOME=workdir,
+            USERPROFILE=workdir,
+            PATH=bin_dir + os.pathsep + os.environ.get("PATH", ""),
+            REALVNC_HOST_STATE_DIR=os.path.join(workdir, "state"),
+            REALVNC_HOST_SPOOL_DIR=os.path.join(workdir, "spool"),
+            REALVNC_HOST_LOG_STDERR="0",
+            REALVNC_HOST_DAEMON="on" if args.daemon else "off",
+            # Private daemon that goes away shortly after the run
+            REALVNC_HOST_DAEMON_SOCKET=os.path.join(workdir, "host.sock"),
+            REALVNC_HOST_DAEMON_IDLE_TIMEOUT="2",
+        )
+
+        for model in models:
+            plan = list(schedule(mix, args.rate, args.ramp, args.duration))
+            runner = run_oneshot if model == "oneshot" else run_persistent
+            rows, memory, elapsed = runner(command, env, plan, args.concurrency)
+            print_report(model, rows, memory, elapsed)
+            results[model] = {"latency": rows, "memory": memory, "elapsed_s": elapsed}
+
+    if args.json_path:
+        write_json(args.json_path, {
+            "loadgen": results,
+            "config": {"mix": args.mix, "rate": args.rate, "ramp": args.ramp, "daemon": args.daemon,
+                       "duration": args.duration, "concurrency": args.concurrency},
+        })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build the native host as a single precompiled zipapp bundle.
+
+The bundle holds ``realvnc_launcher.py`` as ``__main__`` and the
+``realvnc_host`` package, each module with its bytecode next to the source.
+``zipimport`` loads the ``.pyc`` straight from the archive, so the host never
+compiles anything at startup, and the wrappers run it with ``-I -S``
+(isolated, no ``site``) to skip ``site`` processing and ``sys.path`` setup.
+
+Bytecode is only valid for the Python version that built it. Run this script
+with the interpreter the wrappers use; under any other version ``zipimport``
+rejects the ``.pyc`` files and falls back to the bundled sources.
+
+``__main__`` is a short stub around ``realvnc_launcher``. It runs the
+sources next to the bundle instead when any of them is newer than the
+bundle, so a bundle left over from before an update never runs old code.
+``-S`` keeps site-packages off ``sys.path``, and ``orjson`` is a compiled
+extension that cannot be loaded from a zip, so when the building
+interpreter has ``orjson`` the stub puts its directory back on the path.
+
+    python3 build_zipapp.py
+    python3 build_zipapp.py --output /opt/realvnc/realvnc_host.pyz
+"""
+
+import argparse
+import importlib.util
+import marshal
+import os
+import sys
+import time
+import zipfile
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(HOST_DIR, "realvnc_host.pyz")
+
+
+MAIN_TEMPLATE = """\
+# Generated by build_zipapp.py
+import os
+import sys
+
+# Where the building interpreter found orjson, site-packages are not on sys.path under -S
+BACKEND_DIRS = {backend_dirs!r}
+
+
+def stale_sources(bundle):
+    \"\"\"The first source next to ``bundle`` that is newer than it, or None.\"\"\"
+    host_dir = os.path.dirname(bundle)
+    package_dir = os.path.join(host_dir, "realvnc_host")
+    try:
+        built = os.stat(bundle).st_mtime
+        names = [os.path.join(package_dir, name) for name in os.listdir(package_dir) if name.endswith(".py")]
+    except OSError:
+        # No sources shipped next to the bundle
+        return None
+    for path in [os.path.join(host_dir, "realvnc_launcher.py")] + names:
+        try:
+            if os.stat(path).st_mtime > built:
+                return path
+        except OSError:
+            continue
+    return None
+
+
+bundle = os.path.dirname(os.path.abspath(__file__))
+source = stale_sources(bundle)
+if source is not None:
+    sys.stderr.write(f"Warning: {{bundle}} is older than {{source}}, running the sources"
+                     f" (rebuild it with build_zipapp.py)\\n")
+    sys.path.insert(0, os.path.dirname(bundle))
+sys.path.extend(path for path in BACKEND_DIRS if os.path.isdir(path))
+
+import realvnc_launcher
+
+realvnc_launcher.main()
+"""
+
+
+def backend_dirs():
+    """Directories holding the optional JSON backend for this interpreter, without importing it."""
+    from importlib.util import find_spec
+
+    spec = find_spec("orjson")
+    if spec is None or not spec.submodule_search_locations:
+        return []
+    return [os.path.dirname(next(iter(spec.submodule_search_locations)))]
+
+
+def sources():
+    """(archive name, path on disk) of every module that goes into the bundle."""
+    yield "realvnc_launcher.py", os.path.join(HOST_DIR, "realvnc_launcher.py")
+    package_dir = os.path.join(HOST_DIR, "realvnc_host")
+    for name in sorted(os.listdir(package_dir)):
+        if name.endswith(".py"):
+            yield f"realvnc_host/{name}", os.path.join(package_dir, name)
+
+
+def bytecode(source, archive_name, mtime):
+    """Timestamp-based ``.pyc`` contents for ``source`` as ``zipimport`` validates them."""
+    code = compile(source, archive_name, "exec", dont_inherit=True)
+    header = importlib.util.MAGIC_NUMBER + (0).to_bytes(4, "little")
+    header += (mtime & 0xFFFFFFFF).to_bytes(4, "little") + (len(source) & 0xFFFFFFFF).to_bytes(4, "little")
+    return header + marshal.dumps(code)
+
+
+def build(output):
+    """Write the bundle to ``output`` and return the number of modules in it."""
+    # zipimport checks a .pyc against the source entry's DOS timestamp (2 s resolution)
+    date_time = time.localtime(time.time() // 2 * 2)[:6]
+    mtime = int(time.mktime(date_time + (0, 0, -1)))
+
+    temp_path = f"{output}.{os.getpid()}.tmp"
+    count = 0
+    main_source = MAIN_TEMPLATE.format(backend_dirs=backend_dirs()).encode("utf-8")
+    try:
+        with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as bundle:
+            modules = [("__main__.py", main_source)]
+            for archive_name, path in sources():
+                with open(path, "rb") as f:
+                    modules.append((archive_name, f.read()))
+            for archive_name, source in modules:
+                for name, data in ((archive_name, source),
+                                   (archive_name + "c", bytecode(source, archive_name, mtime))):
+                    info = zipfile.ZipInfo(name, date_time)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    info.external_attr = 0o644 << 16
+                    bundle.writestr(info, data)
+                count += 1
+        os.replace(temp_path, output)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="bundle path (default: next to the wrappers)")
+    args = parser.parse_args()
+
+    count = build(args.output)
+    version = ".".join(str(part) for part in sys.version_info[:2])
+    print(f"Built {args.output}: {count} modules, bytecode for Python {version} ({sys.executable})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Support package for the RealVNC Launcher native messaging host.
+
+The entry point stays in ``realvnc_launcher.py``; the modules here hold the
+pieces it is built from so each can be reused and benchmarked on its own.
+"""
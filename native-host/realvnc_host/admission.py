@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Admission control for viewer launches.
+
+Sits in front of the profile write and the viewer spawn:
+
+* Identical launches (same profile, viewer and target file) arriving within
+  ``REALVNC_HOST_LAUNCH_COALESCE_WINDOW`` seconds of each other, or while
+  the first one is still running, are merged into one spawn and every
+  caller gets the same result, marked ``coalesced``. A double-click or a
+  script clicking through the host list starts one viewer per host.
+* At most ``REALVNC_HOST_LAUNCH_MAX_IN_FLIGHT`` launches run at once and at
+  most ``REALVNC_HOST_LAUNCH_MAX_QUEUED`` wait for a slot. Beyond that a
+  launch is refused straight away with ``busy`` and a ``retryAfterMs`` hint
+  derived from recent launch times, instead of piling up processes.
+
+A failed launch is shared with the callers that joined it, but not reused
+afterwards, so retrying a failure spawns again.
+"""
+
+import threading
+import time
+
+# Smoothing of the launch time estimate behind retryAfterMs
+_AVERAGE_WEIGHT = 0.2
+
+# Lower bound of the retry hint
+MIN_RETRY_AFTER_MS = 50
+
+
+class _Launch:
+    __slots__ = ("started_at", "done", "result")
+
+    def __init__(self, started_at):
+        self.started_at = started_at
+        self.done = threading.Event()
+        self.result = None
+
+
+class AdmissionControl:
+    """Coalesce identical launches and bound how many run or wait at once."""
+
+    def __init__(self, window=1.0, max_in_flight=4, max_queued=8):
+        self.window = window
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queued = max(0, max_queued)
+        self._cond = threading.Condition()
+        self._recent = {}
+        self._in_flight = 0
+        self._queued = 0
+        # Seconds per launch, seeded with a typical viewer spawn
+        self._average = 0.2
+        self._admitted = 0
+        self._coalesced = 0
+        self._rejected = 0
+
+    def _expire(self, now):
+        stale = [key for key, entry in self._recent.items()
+                 if entry.done.is_set() and now - entry.started_at >= self.window]
+        for key in stale:
+            del self._recent[key]
+
+    def retry_after_ms(self):
+        """How long a refused caller should wait, from the backlog and recent launch times."""
+        backlog = (self._queued + 1) / self.max_in_flight
+        return max(MIN_RETRY_AFTER_MS, int(self._average * backlog * 1000))
+
+    def run(self, key, launch, bounded=True):
+        """Run ``launch()`` for ``key`` unless an identical launch can be shared; returns its result.
+
+        ``key`` None never coalesces. With ``bounded`` False the caller
+        waits for a slot even when the queue is full (``launch_many``
+        bounds its own batch).
+        """
+        coalesce = key is not None and self.window > 0
+        with self._cond:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._recent.get(key) if coalesce else None
+            owner = entry is None
+            if not owner:
+                self._coalesced += 1
+            else:
+                if bounded and self._in_flight >= self.max_in_flight and self._queued >= self.max_queued:
+                    self._rejected += 1
+                    retry_after = self.retry_after_ms()
+                    return {
+                        "success": False,
+                        "busy": True,
+                        "retryAfterMs": retry_after,
+                        "error": f"Too many launches in progress, retry after {retry_after} ms"
+                    }
+                entry = _Launch(now)
+                if coalesce:
+                    # Registered before waiting for a slot, duplicates join the queued launch
+                    self._recent[key] = entry
+                self._queued += 1
+                while self._in_flight >= self.max_in_flight:
+                    self._cond.wait()
+                self._queued -= 1
+                self._in_flight += 1
+                self._admitted += 1
+
+        if not owner:
+            entry.done.wait()
+            return dict(entry.result, coalesced=True)
+
+        started = time.monotonic()
+        result = {"success": False, "error": "Launch failed"}
+        try:
+            result = launch()
+            return result
+        finally:
+            # Snapshot: the owner's response is tagged with its requestId afterwards
+            entry.result = dict(result)
+            with self._cond:
+                self._in_flight -= 1
+                self._average += (time.monotonic() - started - self._average) * _AVERAGE_WEIGHT
+                if not result.get("success") and self._recent.get(key) is entry:
+                    del self._recent[key]
+                self._cond.notify()
+            entry.done.set()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "admitted": self._admitted,
+                "coalesced": self._coalesced,
+                "rejected": self._rejected,
+                "average_launch_ms": round(self._average * 1000.0, 3),
+            }
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Runtime settings for the native messaging host.
+
+The browser starts the host without arguments, so every tunable is read from
+``REALVNC_HOST_*`` environment variables with a safe default.
+"""
+
+import os
+import time
+
+ENV_PREFIX = "REALVNC_HOST_"
+
+
+def _host_dir():
+    parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # In the zipapp bundle the package's parent is the .pyz file next to the wrappers
+    if os.path.isfile(parent):
+        return os.path.dirname(parent)
+    return parent
+
+
+# The native-host directory, relative connection files are resolved against it
+HOST_DIR = _host_dir()
+
+
+def env_str(name, default=""):
+    """Read a string setting."""
+    value = os.environ.get(ENV_PREFIX + name)
+    return value if value not in (None, "") else default
+
+
+def env_int(name, default, minimum=None):
+    """Read an integer setting, falling back to the default on bad input."""
+    try:
+        value = int(os.environ.get(ENV_PREFIX + name, default))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None and value < minimum:
+        value = minimum
+    return value
+
+
+def env_float(name, default, minimum=None):
+    """Read a float setting, falling back to the default on bad input."""
+    try:
+        value = float(os.environ.get(ENV_PREFIX + name, default))
+    except (TypeError, ValueError):
+        value = default
+    if minimum is not None and value < minimum:
+        value = minimum
+    return value
+
+
+def env_bool(name, default=False):
+    """Read a boolean setting (1/true/yes/on)."""
+    value = os.environ.get(ENV_PREFIX + name)
+    if value in (None, ""):
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def default_state_dir():
+    """Per-user directory for caches and other host state."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+        return os.path.join(base, "realvnc_launcher")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "realvnc_launcher")
+
+
+def runtime_dir():
+    """Per-user runtime directory (tmpfs on systemd systems), or None."""
+    candidates = [os.environ.get("XDG_RUNTIME_DIR")]
+    if hasattr(os, "getuid"):
+        candidates.append(f"/run/user/{os.getuid()}")
+    for directory in candidates:
+        if directory and os.path.isdir(directory) and os.access(directory, os.W_OK):
+            return directory
+    return None
+
+
+def default_daemon_socket(state_dir):
+    """Per-user socket of the shared host daemon: the runtime directory, else the state directory."""
+    return os.path.join(runtime_dir() or state_dir, "realvnc-host.sock")
+
+
+class Settings:
+    """Snapshot of the host settings taken at startup."""
+
+    def __init__(self):
+        # Wall-clock time the host started, traced responses report their age against it
+        self.started_at = time.time()
+        # "async" dispatches requests concurrently, "sync" keeps the blocking loop
+        self.engine = env_str("ENGINE", "async").lower()
+        # Upper bound on requests handled at the same time by the async engine
+        self.max_concurrency = env_int("MAX_CONCURRENCY", 4, minimum=1)
+        # Incoming frames above this size are rejected before parsing
+        self.max_frame_size = env_int("MAX_FRAME_BYTES", 1024 * 1024, minimum=1024)
+        # JSON backend for frames: "auto" (orjson when installed), "orjson" or "json"
+        self.json_backend = env_str("JSON", "auto").lower()
+        # Answer a leading ping before importing the rest of the host
+        self.fast_start = env_bool("FAST_START", True)
+        # Logging: level name, file, rotation ("size" or "time") and extra fields to mask
+        self.log_level = env_str("LOG_LEVEL", "INFO")
+        self.log_file = env_str("LOG_FILE", "~/realvnc_launcher.log")
+        self.log_rotate = env_str("LOG_ROTATE", "size").lower()
+        self.log_rotate_when = env_str("LOG_ROTATE_WHEN", "midnight")
+        self.log_max_bytes = env_int("LOG_MAX_BYTES", 5 * 1024 * 1024, minimum=1024)
+        self.log_backups = env_int("LOG_BACKUPS", 3, minimum=0)
+        self.log_stderr = env_bool("LOG_STDERR", True)
+        self.log_redact = [field.strip() for field in env_str("LOG_REDACT", "").split(",") if field.strip()]
+        # Spool for generated connection files: location, TTL (s), count/size caps, sweep period (s)
+        self.spool_dir = env_str("SPOOL_DIR", os.path.join(HOST_DIR, "temp"))
+        self.spool_max_age = env_float("SPOOL_MAX_AGE", 86400.0, minimum=0.0)
+        self.spool_max_files = env_int("SPOOL_MAX_FILES", 200, minimum=0)
+        self.spool_max_bytes = env_int("SPOOL_MAX_BYTES", 10 * 1024 * 1024, minimum=0)
+        self.spool_sweep_interval = env_float("SPOOL_SWEEP_INTERVAL", 300.0, minimum=0.0)
+        # Recent content hashes kept in memory with their last use, which the sweeper respects
+        self.spool_index_size = env_int("SPOOL_INDEX_SIZE", 64, minimum=0)
+        # Linux only: hand profiles to the viewer via memfd/FIFO ("off", "memfd", "fifo", "auto")
+        self.diskless_mode = env_str("DISKLESS", "off").lower()
+        self.diskless_fifo_timeout = env_float("DISKLESS_FIFO_TIMEOUT", 30.0, minimum=0.1)
+        # Viewer spawn backend: "auto" (posix_spawn where available), "posix_spawn" or "popen"
+        self.spawn_mode = env_str("SPAWN", "auto").lower()
+        # launch_many: most hosts accepted in one batch, threads spawning them in parallel
+        self.batch_max_hosts = env_int("BATCH_MAX_HOSTS", 32, minimum=1)
+        self.batch_workers = env_int("BATCH_WORKERS", 8, minimum=1)
+        # Launch admission: identical launches within this many seconds share one spawn (0 disables),
+        # launches running at once, launches waiting for a slot before new ones are refused as busy
+        self.launch_coalesce_window = env_float("LAUNCH_COALESCE_WINDOW", 1.0, minimum=0.0)
+        self.launch_max_in_flight = env_int("LAUNCH_MAX_IN_FLIGHT", 4, minimum=1)
+        self.launch_max_queued = env_int("LAUNCH_MAX_QUEUED", 8, minimum=0)
+        # Prepared launch plans: seconds a plan stays usable, plans kept at once
+        self.plan_ttl = env_float("PLAN_TTL", 60.0, minimum=1.0)
+        self.plan_max = env_int("PLAN_MAX", 64, minimum=1)
+        # probe_hosts: default total deadline (s), most hosts in one request, connections open at once
+        self.probe_timeout = env_float("PROBE_TIMEOUT", 2.0, minimum=0.05)
+        self.probe_max_hosts = env_int("PROBE_MAX_HOSTS", 256, minimum=1)
+        self.probe_concurrency = env_int("PROBE_CONCURRENCY", 64, minimum=1)
+        # JSON-lines file for trace span events, empty sends them to the main log
+        self.trace_file = env_str("TRACE_FILE", "")
+        # Prometheus textfile for the metrics ("{pid}" is replaced by the host pid), rewrite period (s)
+        self.metrics_textfile = env_str("METRICS_TEXTFILE", "").replace("{pid}", str(os.getpid()))
+        self.metrics_interval = env_float("METRICS_INTERVAL", 60.0, minimum=0.0)
+        # Seconds without requests before a browser connection is closed (0 keeps it open)
+        self.idle_timeout = env_float("IDLE_TIMEOUT", 600.0, minimum=0.0)
+        # Where caches (viewer path, ...) are kept between runs
+        self.state_dir = env_str("STATE_DIR", default_state_dir())
+        # SQLite session history behind recent/reconnect, targets kept (0 disables)
+        self.history_file = env_str("HISTORY_FILE", os.path.join(self.state_dir, "history.sqlite3"))
+        self.history_max = env_int("HISTORY_MAX", 200, minimum=0)
+        # Shared per-user daemon ("auto" on POSIX, "on", "off"): socket, idle exit (s), startup wait (s),
+        # and how long relays serve in process without trying again after the daemon failed to start (s)
+        self.daemon_mode = env_str("DAEMON", "auto").lower()
+        self.daemon_socket = env_str("DAEMON_SOCKET", "") or default_daemon_socket(self.state_dir)
+        self.daemon_idle_timeout = env_float("DAEMON_IDLE_TIMEOUT", 900.0, minimum=0.0)
+        self.daemon_start_timeout = env_float("DAEMON_START_TIMEOUT", 5.0, minimum=0.1)
+        self.daemon_retry = env_float("DAEMON_RETRY", 300.0, minimum=0.0)
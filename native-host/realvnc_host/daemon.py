@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Per-user shared host daemon.
+
+One long-lived process listens on a Unix socket in the user's runtime
+directory and owns the viewer path cache, the connection-file spool, the
+session table and the metrics. Every browser's native host process becomes
+a relay (see ``relay.py``) that forwards frames to it, so Chrome, Edge and
+Firefox share one warm host instead of each keeping their own.
+
+Each client connection is served by the same request engine as a direct
+stdio host, with its own frame reader/writer and shared state behind it. A
+lock file next to the socket makes sure only one daemon runs per socket;
+the daemon exits after ``REALVNC_HOST_DAEMON_IDLE_TIMEOUT`` seconds without
+clients.
+
+Every relay opens with the build it runs. When that is not the daemon's own
+build (the host was updated while the daemon ran), the daemon retires:
+it removes its socket and releases the lock so the relay can start a daemon
+of the new build, keeps serving the relays already connected, and exits
+when the last one leaves.
+"""
+
+import io
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+
+from realvnc_host.engine import run_stdio
+from realvnc_host.framing import FrameReader, FrameWriter
+from realvnc_host.launcher import RealVNCLauncher
+from realvnc_host.protocol import closing_event
+from realvnc_host.relay import HANDSHAKE, HANDSHAKE_MAX, HANDSHAKE_OK, HANDSHAKE_RETIRED, failure_marker
+
+logger = logging.getLogger(__name__)
+
+# How often the accept loop wakes up to check for idle exit and shutdown
+_ACCEPT_TIMEOUT = 1.0
+
+
+def acquire_lock(socket_path):
+    """Take the per-socket daemon lock. Returns the lock fd, or None when another daemon holds it."""
+    fd = os.open(socket_path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): binding the socket is the only guard
+        return fd
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+class HostDaemon:
+    """Serve many browser relays from one launcher."""
+
+    def __init__(self, settings, build):
+        self.settings = settings
+        self.build = build
+        self.socket_path = settings.daemon_socket
+        # The daemon has no browser on stdio, clients bring their own streams
+        self.launcher = RealVNCLauncher(settings, FrameReader(io.BytesIO()), FrameWriter(io.BytesIO()))
+        self._clients = set()
+        self._lock = threading.Lock()
+        self._last_active = time.monotonic()
+        self._stop = threading.Event()
+        self._served = 0
+        self._lock_fd = None
+        # Set once a relay of another build took over the socket
+        self._retired = False
+
+    def _bind(self):
+        # We hold the lock, so a socket file left here belongs to a dead daemon
+        try:
+            os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        server.listen(16)
+        server.settimeout(_ACCEPT_TIMEOUT)
+        return server
+
+    def _handshake(self, conn, stream):
+        """Check the relay's build. Returns True when this daemon serves it."""
+        conn.settimeout(self.settings.daemon_start_timeout)
+        try:
+            # Unbuffered, so nothing past the line is taken from the frames behind it
+            line = stream.readline(HANDSHAKE_MAX)
+            if not line.startswith(HANDSHAKE) or not line.endswith(b"\n"):
+                logger.warning("Daemon client sent no handshake, closing it")
+                return False
+            build = line[len(HANDSHAKE):].strip().decode("ascii", "replace")
+            if build == self.build:
+                conn.sendall(HANDSHAKE_OK + b"\n")
+                conn.settimeout(None)
+                return True
+            self.retire(build)
+            conn.sendall(HANDSHAKE_RETIRED + b"\n")
+        except OSError as e:
+            logger.warning(f"Daemon handshake failed: {e}")
+        return False
+
+    def retire(self, build):
+        """Leave the socket to a daemon of ``build``; the clients already connected are still served."""
+        with self._lock:
+            if self._retired:
+                return
+            self._retired = True
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            os.close(self._lock_fd)
+        logger.info(f"Host daemon {os.getpid()} of build {self.build} retiring for build {build}")
+
+    def _serve_client(self, conn):
+        stream = conn.makefile('rb', buffering=0)
+        if not self._handshake(conn, stream):
+            self._disconnect(conn)
+            return
+        reader = FrameReader(stream, self.settings.max_frame_size)
+        writer = FrameWriter(conn.makefile('wb'))
+        view = self.launcher.for_connection(reader, writer)
+        concurrency = 1 if self.settings.engine == 'sync' else self.settings.max_concurrency
+        view.idle.start(lambda: self._close_idle(view, conn))
+        try:
+            run_stdio(view, concurrency)
+        except Exception as e:
+            logger.error(f"Daemon client failed: {e}")
+        finally:
+            view.idle.stop()
+            self._disconnect(conn)
+            logger.info("Daemon client disconnected")
+
+    def _disconnect(self, conn):
+        try:
+            conn.close()
+        except OSError:
+            pass
+        with self._lock:
+            self._clients.discard(conn)
+            self._last_active = time.monotonic()
+
+    def _close_idle(self, view, conn):
+        """Idle client: tell its browser and end the connection, its relay then exits."""
+        logger.info(f"Daemon client idle for {self.settings.idle_timeout:g} s, closing it")
+        view.send_message(closing_event("idle"))
+        try:
+            conn.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def _done(self):
+        """Idle for too long, or retired and the last client has left."""
+        timeout = self.settings.daemon_idle_timeout
+        with self._lock:
+            if self._clients:
+                return False
+            return self._retired or (bool(timeout) and time.monotonic() - self._last_active > timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "socket": self.socket_path,
+                "clients": len(self._clients),
+                "served": self._served,
+                "build": self.build,
+                "retired": self._retired,
+            }
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def serve(self, lock_fd):
+        """Accept relays until stopped or idle; ``lock_fd`` is released on exit. Returns the exit code."""
+        server = None
+        self._lock_fd = lock_fd
+        try:
+            server = self._bind()
+            # Relays waiting out an earlier failed start may use this daemon again
+            try:
+                os.unlink(failure_marker(self.settings))
+            except OSError:
+                pass
+            for signum in (signal.SIGTERM, getattr(signal, "SIGHUP", None)):
+                if signum is not None:
+                    signal.signal(signum, self.stop)
+            self.launcher.daemon_stats = self.stats
+            self.launcher.start_background()
+            logger.info(f"Host daemon {os.getpid()} (build {self.build}) listening on {self.socket_path}")
+
+            while not self._stop.is_set() and not self._done():
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    if self._stop.is_set():
+                        break
+                    logger.error(f"Daemon accept failed: {e}")
+                    continue
+                conn.settimeout(None)
+                with self._lock:
+                    self._clients.add(conn)
+                    self._served += 1
+                    self._last_active = time.monotonic()
+                threading.Thread(target=self._serve_client, args=(conn,), name="realvnc-client", daemon=True).start()
+                logger.info("Daemon client connected")
+        except KeyboardInterrupt:
+            pass
+        finally:
+            with self._lock:
+                # A retired daemon already handed the socket path and the lock to its successor
+                retired = self._retired
+                self._retired = True
+            if server is not None:
+                server.close()
+                if not retired:
+                    try:
+                        os.unlink(self.socket_path)
+                    except OSError:
+                        pass
+            self.launcher.stop_background()
+            if not retired:
+                os.close(lock_fd)
+            logger.info(f"Host daemon {os.getpid()} stopped")
+        return 0
+
+
+def main(settings, build):
+    """Entry point for ``realvnc_launcher.py --daemon``; ``build`` is the fingerprint of the code it runs."""
+    from realvnc_host.logsetup import configure_logging
+
+    configure_logging(settings)
+    directory = os.path.dirname(settings.daemon_socket)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    lock_fd = acquire_lock(settings.daemon_socket)
+    if lock_fd is None:
+        # Lost the startup race against another relay's daemon
+        logger.info(f"Another host daemon already serves {settings.daemon_socket}")
+        return 0
+    return HostDaemon(settings, build).serve(lock_fd)
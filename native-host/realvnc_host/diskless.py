@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Diskless connection-profile handoff for Linux.
+
+Instead of writing the profile to a regular file, the host can hand it to the
+viewer through
+
+* ``memfd``: an anonymous in-memory file created with ``memfd_create``. The
+  descriptor is inherited by the viewer under the same number and the viewer
+  is given ``/proc/self/fd/N`` as its connection file.
+* ``fifo``: a named pipe in the per-user runtime directory
+  (``/run/user/<uid>``). A background thread writes the profile once the
+  viewer opens the pipe, then removes it.
+
+Either way the credentials never reach persistent storage. When the mode is
+not supported on this system the caller falls back to the spool file, and a
+viewer that never opens its FIFO demotes FIFO handoff to the file path for
+the rest of the session.
+"""
+
+import errno
+import logging
+import os
+import sys
+import threading
+import time
+
+from realvnc_host.config import runtime_dir
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "memfd", "fifo", "auto")
+
+# How long the FIFO writer waits for the viewer to open the pipe
+DEFAULT_FIFO_TIMEOUT = 30.0
+
+_FIFO_POLL_INTERVAL = 0.01
+
+
+class Handoff:
+    """A profile prepared for one launch.
+
+    ``path`` goes on the viewer command line, ``pass_fds`` must be inherited by
+    the viewer, and ``finish`` must be called once the spawn has been attempted.
+    """
+
+    def __init__(self, kind, path, pass_fds=(), on_finish=None):
+        self.kind = kind
+        self.path = path
+        self.pass_fds = tuple(pass_fds)
+        self._on_finish = on_finish
+
+    def finish(self, spawned):
+        """Release the parent's side once the viewer has (or has not) been started."""
+        if self._on_finish is not None:
+            on_finish, self._on_finish = self._on_finish, None
+            on_finish(spawned)
+
+
+def memfd_supported():
+    """memfd_create and /proc/self/fd are both available."""
+    return sys.platform.startswith("linux") and hasattr(os, "memfd_create") and os.path.isdir("/proc/self/fd")
+
+
+def fifo_supported():
+    """Named pipes can be created in a private runtime directory."""
+    return sys.platform.startswith("linux") and hasattr(os, "mkfifo") and runtime_dir() is not None
+
+
+class DisklessHandoff:
+    """Choose and prepare a diskless handoff for each launch."""
+
+    def __init__(self, mode="off", fifo_timeout=DEFAULT_FIFO_TIMEOUT):
+        self.mode = mode if mode in MODES else "off"
+        self.fifo_timeout = fifo_timeout
+        self._fifo_broken = False
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._writers = set()
+
+    def active_kind(self):
+        """The handoff kind that would be used now, or None for the file path."""
+        if self.mode in ("memfd", "auto") and memfd_supported():
+            return "memfd"
+        if self.mode in ("fifo", "auto") and not self._fifo_broken and fifo_supported():
+            return "fifo"
+        return None
+
+    def prepare(self, content):
+        """Prepare a handoff for ``content``, or return None to use a regular file."""
+        kind = self.active_kind()
+        try:
+            if kind == "memfd":
+                return self._prepare_memfd(content)
+            if kind == "fifo":
+                return self._prepare_fifo(content)
+        except OSError as e:
+            logger.warning(f"Diskless {kind} handoff failed, using a file instead: {e}")
+        return None
+
+    def _prepare_memfd(self, content):
+        fd = os.memfd_create("realvnc-profile", getattr(os, "MFD_CLOEXEC", 1))
+        try:
+            data = content.encode('utf-8')
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.lseek(fd, 0, os.SEEK_SET)
+        except BaseException:
+            os.close(fd)
+            raise
+
+        def finish(spawned):
+            # The viewer holds its own copy of the descriptor; the parent's is no longer needed
+            os.close(fd)
+
+        return Handoff("memfd", f"/proc/self/fd/{fd}", pass_fds=(fd,), on_finish=finish)
+
+    def _prepare_fifo(self, content):
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        path = os.path.join(runtime_dir(), f"realvnc-{os.getpid()}-{counter}.vnc")
+        os.mkfifo(path, 0o600)
+
+        def finish(spawned):
+            if not spawned:
+                _unlink(path)
+                return
+            writer = threading.Thread(
+                target=self._feed_fifo,
+                args=(path, content.encode('utf-8')),
+                name="realvnc-fifo-writer",
+                daemon=True
+            )
+            with self._lock:
+                self._writers.add(writer)
+            writer.start()
+
+        return Handoff("fifo", path, on_finish=finish)
+
+    def _feed_fifo(self, path, data):
+        """Wait for the viewer to open the pipe, write the profile, then remove it."""
+        deadline = time.monotonic() + self.fifo_timeout
+        fd = None
+        try:
+            while fd is None:
+                try:
+                    # Non-blocking open fails with ENXIO until a reader has the pipe open
+                    fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+                except OSError as e:
+                    if e.errno != errno.ENXIO or time.monotonic() > deadline:
+                        raise
+                    time.sleep(_FIFO_POLL_INTERVAL)
+            os.set_blocking(fd, True)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+        except OSError as e:
+            # The viewer could not use the pipe: launch with regular files from now on
+            self._fifo_broken = True
+            logger.warning(f"Viewer did not read FIFO profile {path} ({e}); falling back to files")
+        finally:
+            if fd is not None:
+                os.close(fd)
+            _unlink(path)
+            with self._lock:
+                self._writers.discard(threading.current_thread())
+
+    def drain(self, timeout=None):
+        """Wait for pending FIFO writers so a viewer started just before exit still gets its profile."""
+        deadline = time.monotonic() + (self.fifo_timeout if timeout is None else timeout)
+        with self._lock:
+            writers = list(self._writers)
+        for writer in writers:
+            writer.join(max(0.0, deadline - time.monotonic()))
+
+    def stats(self):
+        """Configured mode and what is in effect."""
+        return {
+            "mode": self.mode,
+            "active": self.active_kind() or "file",
+            "fifo_broken": self._fifo_broken,
+        }
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent request engine for the native messaging host.
+
+Frames are still read from and written to the browser one at a time, but the
+requests between them run concurrently: each one is dispatched to a worker
+thread as soon as it is read, and its response is written by a single writer
+task as soon as it finishes. A semaphore caps how many requests run at once,
+so a slow viewer spawn no longer holds up a ``ping`` queued behind it.
+
+Long polls (``wait``) block until a viewer exits, so they run on threads of
+their own and never take one of those slots; a page waiting on a few
+viewers cannot stall the port.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Long polls running at once; more wait for a thread without holding up other requests
+_LONG_POLL_WORKERS = 8
+
+
+class AsyncEngine:
+    """Run a launcher's request handlers concurrently behind serialized I/O."""
+
+    def __init__(self, launcher, max_concurrency=4):
+        self.launcher = launcher
+        self.max_concurrency = max(1, int(max_concurrency))
+
+    async def serve(self, read_message, write_message):
+        """Serve requests until ``read_message`` returns None.
+
+        ``read_message`` and ``write_message`` are coroutines; the engine never
+        calls ``write_message`` from more than one task at a time.
+        """
+        queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_concurrency)
+        workers = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="realvnc-worker"
+        )
+        long_polls = ThreadPoolExecutor(max_workers=_LONG_POLL_WORKERS, thread_name_prefix="realvnc-wait")
+        writer = asyncio.ensure_future(self._write_loop(queue, write_message))
+        pending = set()
+
+        try:
+            while True:
+                message = await read_message()
+                if message is None:
+                    break
+
+                if self.launcher.is_long_poll(message):
+                    task = asyncio.ensure_future(self._dispatch(message, long_polls, queue))
+                else:
+                    # Stop reading while every slot is busy, the browser queues the rest
+                    await slots.acquire()
+                    task = asyncio.ensure_future(self._dispatch(message, workers, queue, slots))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        finally:
+            await queue.put(None)
+            await writer
+            workers.shutdown(wait=False)
+            long_polls.shutdown(wait=False)
+
+    async def _dispatch(self, message, workers, queue, slots=None):
+        """Run one request on ``workers`` and queue its response; ``slots`` is released once it has run."""
+        loop = asyncio.get_event_loop()
+        try:
+            response = await loop.run_in_executor(workers, self.launcher.process_message, message)
+        except Exception as e:
+            logger.error(f"Request dispatch failed: {e}")
+            response = {"success": False, "error": f"Internal error: {e}"}
+        finally:
+            if slots is not None:
+                slots.release()
+        await queue.put(response)
+
+    async def _write_loop(self, queue, write_message):
+        """Single writer: responses go out one frame at a time in completion order."""
+        while True:
+            response = await queue.get()
+            if response is None:
+                break
+            try:
+                await write_message(response)
+            except Exception as e:
+                logger.error(f"Error writing response: {e}")
+
+
+def run_stdio(launcher, max_concurrency=4):
+    """Serve the launcher's frame reader/writer (stdio, or a daemon client socket) with the async engine."""
+    engine = AsyncEngine(launcher, max_concurrency)
+
+    async def main():
+        loop = asyncio.get_event_loop()
+        # Dedicated threads keep blocking pipe I/O off the worker pool
+        reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="realvnc-reader")
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="realvnc-writer")
+
+        async def read_message():
+            return await loop.run_in_executor(reader, launcher.read_message)
+
+        async def write_message(response):
+            await loop.run_in_executor(writer, launcher.send_message, response)
+
+        try:
+            await engine.serve(read_message, write_message)
+        finally:
+            reader.shutdown(wait=False)
+            writer.shutdown(wait=True)
+
+    asyncio.run(main())
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Native messaging frame codec.
+
+Each frame is a 4-byte native-endian length followed by that many bytes of
+UTF-8 JSON. The reader fills one reusable buffer with ``readinto`` and keeps
+reading until the frame is complete, so short reads from a pipe are handled.
+The payload is handed to the JSON backend as a view of that buffer: orjson
+parses it in place, the stdlib decodes it to ``str`` first (``json.loads``
+decodes ``bytes`` the same way, so that copy cannot be avoided). Frames over
+the configured limit are rejected after their payload has been skipped, so
+the stream stays in sync for the next frame.
+
+Like ``protocol``, this module is on the fast-start path: keep its imports to
+``struct`` and ``json``.
+"""
+
+import json
+import struct
+
+HEADER = struct.Struct('=I')
+
+# Incoming frames larger than this are rejected (the extension sends small messages)
+DEFAULT_MAX_FRAME_SIZE = 1024 * 1024
+
+# Browsers refuse messages from a native host larger than 1 MB
+MAX_OUTGOING_FRAME_SIZE = 1024 * 1024
+
+# Chunk size used to skip the payload of a rejected frame
+_DISCARD_CHUNK = 64 * 1024
+
+
+class FrameError(Exception):
+    """The stream ended in the middle of a frame."""
+
+
+class RejectedFrame(FrameError):
+    """A complete frame was read but refused. The stream is still usable."""
+
+
+class FrameTooLarge(RejectedFrame):
+    """A frame exceeded the size limit."""
+
+    def __init__(self, length, limit):
+        super().__init__(f"Frame of {length} bytes exceeds limit of {limit} bytes")
+        self.length = length
+        self.limit = limit
+
+
+# json.loads only dispatches to this decoder after checks a frame does not need
+_decode = json.JSONDecoder().decode
+
+
+def default_loads(view):
+    """Parse a JSON payload held in a buffer."""
+    return _decode(str(view, 'utf-8'))
+
+
+def default_dumps(message):
+    """Serialize a message to UTF-8 JSON bytes."""
+    return json.dumps(message).encode('utf-8')
+
+
+class FrameReader:
+    """Read length-prefixed frames from a binary stream into a reusable buffer."""
+
+    def __init__(self, stream, max_size=DEFAULT_MAX_FRAME_SIZE, loads=default_loads):
+        self.stream = stream
+        self.max_size = max_size
+        self.loads = loads
+        self._header = bytearray(HEADER.size)
+        self._header_view = memoryview(self._header)
+        self._buffer = bytearray(4096)
+        self._view = memoryview(self._buffer)
+
+    def _read_exact(self, view):
+        """Fill ``view`` completely. Returns the number of bytes read before EOF."""
+        total = len(view)
+        # Common case: a pipe or buffered stream hands over the whole frame at once
+        filled = self.stream.readinto(view) or 0
+        if filled == total or filled == 0:
+            return filled
+        readinto = self.stream.readinto
+        while filled < total:
+            count = readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+        return filled
+
+    def _discard(self, length):
+        """Skip ``length`` payload bytes of a rejected frame."""
+        scratch = self._view[:min(len(self._view), _DISCARD_CHUNK)]
+        remaining = length
+        while remaining:
+            chunk = scratch[:min(remaining, len(scratch))]
+            count = self._read_exact(chunk)
+            if count < len(chunk):
+                raise FrameError("Stream ended inside a rejected frame")
+            remaining -= count
+
+    def read_payload(self):
+        """Read the next frame and return a memoryview of its payload, or None at EOF.
+
+        The view aliases the internal buffer and is only valid until the next call.
+        """
+        count = self.stream.readinto(self._header_view)
+        if count != HEADER.size:
+            if not count:
+                return None
+            count += self._read_exact(self._header_view[count:])
+            if count < HEADER.size:
+                raise FrameError("Stream ended inside a frame header")
+
+        length = HEADER.unpack_from(self._header)[0]
+        if length > len(self._buffer):
+            if length > self.max_size:
+                self._discard(length)
+                raise FrameTooLarge(length, self.max_size)
+            self._grow(length)
+
+        payload = self._view[:length]
+        # Common case inline: the whole payload arrives with one readinto
+        filled = self.stream.readinto(payload) or 0
+        if filled < length:
+            if filled:
+                filled += self._read_exact(payload[filled:])
+            if filled < length:
+                raise FrameError(f"Stream ended after a partial frame (expected {length} bytes)")
+        return payload
+
+    def _grow(self, length):
+        """Grow the buffer to the next power of two so similar frames reuse it."""
+        size = len(self._buffer)
+        while size < length:
+            size *= 2
+        self._view.release()
+        self._buffer = bytearray(min(size, max(length, self.max_size)))
+        self._view = memoryview(self._buffer)
+
+    def read(self):
+        """Read and parse the next frame, or return None at EOF.
+
+        Raises ``RejectedFrame`` (or ``FrameTooLarge``) for frames that were
+        skipped but leave the stream usable, and ``FrameError`` when the
+        stream ended in the middle of a frame.
+        """
+        payload = self.read_payload()
+        if payload is None:
+            return None
+        try:
+            return self.loads(payload)
+        except ValueError as e:
+            raise RejectedFrame(f"Invalid JSON in frame: {e}")
+
+    def decode(self, payload):
+        """Parse a payload returned by ``read_payload``."""
+        try:
+            return self.loads(payload)
+        except ValueError as e:
+            raise RejectedFrame(f"Invalid JSON in frame: {e}")
+
+
+class FrameWriter:
+    """Write length-prefixed frames to a binary stream."""
+
+    def __init__(self, stream, max_size=MAX_OUTGOING_FRAME_SIZE, dumps=default_dumps):
+        self.stream = stream
+        self.max_size = max_size
+        self.dumps = dumps
+
+    def write_payload(self, payload):
+        """Write an already-serialized payload as one frame and flush it."""
+        length = len(payload)
+        if length > self.max_size:
+            raise FrameTooLarge(length, self.max_size)
+        self.stream.write(HEADER.pack(length))
+        self.stream.write(payload)
+        self.stream.flush()
+
+    def write(self, message):
+        """Serialize a message and write it as one frame."""
+        self.write_payload(self.dumps(message))
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Session history for one-message reconnects.
+
+Every successful launch records its target (``host:port``), the content
+hash of its profile, where the profile was written and when it was last
+used. The ``recent`` action lists the targets, most recently used first,
+and ``reconnect`` starts a viewer for a target from the stored profile,
+so the extension does not rebuild and resend it.
+
+The history lives in SQLite (``REALVNC_HOST_HISTORY_FILE``), keyed by
+target with an index on the last-used time, and is mirrored in memory:
+lookups never touch the database, and writes are batched by a background
+thread so a launch does not wait for a commit. That thread also imports
+``sqlite3`` and loads the mirror, off the startup path; launches recorded
+before then are applied once it is loaded. Recording a launch only takes a
+short in-memory lock, never one held across database work.
+
+Several hosts may share the file (one per browser when the daemon is off),
+so each write is an upsert of this process's own launch: it adds to the
+stored count and keeps the latest use, instead of replacing the row with
+one process's view of it. Only the hash and the path are
+stored, never the profile itself, so a profile swept from the spool (or
+handed over disklessly) cannot be reconnected without a full launch. At
+most ``REALVNC_HOST_HISTORY_MAX`` targets are kept.
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    " target TEXT PRIMARY KEY, host TEXT, port INTEGER, digest TEXT, profile TEXT, vnc_path TEXT,"
+    " first_used REAL NOT NULL, last_used REAL NOT NULL, launches INTEGER NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS sessions_last_used ON sessions (last_used)",
+)
+
+_COLUMNS = ("target", "host", "port", "digest", "profile", "vnc_path", "first_used", "last_used", "launches")
+
+# Writes batched into one transaction at most, and how long the writer collects them (s)
+_BATCH_SIZE = 64
+_BATCH_DELAY = 1.0
+
+
+# Upsert of one launch: adds to the count and keeps the newest use and its fields (SQLite 3.24+)
+_UPSERT = (
+    f"INSERT INTO sessions ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"
+    " ON CONFLICT(target) DO UPDATE SET "
+    + ", ".join(f"{column} = CASE WHEN excluded.last_used >= sessions.last_used"
+                f" THEN excluded.{column} ELSE sessions.{column} END"
+                for column in ("host", "port", "digest", "profile", "vnc_path"))
+    + ", first_used = min(sessions.first_used, excluded.first_used),"
+    " last_used = max(sessions.last_used, excluded.last_used),"
+    " launches = sessions.launches + excluded.launches"
+)
+
+
+class SessionHistory:
+    """Recently launched targets, in memory and persisted to SQLite."""
+
+    def __init__(self, path, max_entries=200):
+        self.path = path
+        self.max_entries = max_entries
+        # Guards the in-memory state only, never held across database work
+        self._lock = threading.Lock()
+        # Serializes loading the mirror, which reads the database
+        self._load_lock = threading.Lock()
+        # target -> row dict, least recently used first
+        self._entries = OrderedDict()
+        self._loaded = False
+        # Launches recorded before the mirror was loaded, applied by _load
+        self._pending = []
+        self._queue = queue.Queue()
+        self._thread = None
+        self._error = None
+        self._written = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self._error is None
+
+    def _connect(self):
+        import sqlite3
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5.0)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    def _load(self):
+        """Fill the in-memory mirror on first use; the database is read without holding ``_lock``."""
+        with self._load_lock:
+            if self._loaded:
+                return
+            rows = self._read()
+            with self._lock:
+                if rows is not None:
+                    for row in reversed(rows):
+                        entry = dict(zip(_COLUMNS, row))
+                        self._entries[entry["target"]] = entry
+                pending, self._pending = self._pending, []
+                for launch in pending:
+                    self._apply(*launch)
+                self._loaded = True
+
+    def _read(self):
+        """The stored rows, most recently used first, or None when the history is unusable."""
+        try:
+            import sqlite3
+        except ImportError:
+            self._error = "sqlite3 is not available"
+            logger.warning("Session history disabled, this Python has no sqlite3 module")
+            return None
+        try:
+            connection = self._connect()
+            try:
+                return connection.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM sessions ORDER BY last_used DESC LIMIT ?",
+                    (self.max_entries,)).fetchall()
+            finally:
+                connection.close()
+        except (sqlite3.Error, OSError) as e:
+            self._error = str(e)
+            logger.warning(f"Session history disabled, {self.path} is unusable: {e}")
+            return None
+
+    def _apply(self, target, now, fields):
+        """Update the mirror for one launch. Call with the lock held."""
+        entry = self._entries.pop(target, None)
+        if entry is None:
+            entry = {"target": target, "first_used": now, "launches": 0}
+        entry.update(fields, last_used=now, launches=entry["launches"] + 1)
+        self._entries[target] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record(self, target, host=None, port=None, digest=None, profile=None, vnc_path=None):
+        """Remember a launch of ``target`` now."""
+        if not target or not self.enabled:
+            return
+        now = time.time()
+        fields = {"host": host, "port": port, "digest": digest, "profile": profile, "vnc_path": vnc_path}
+        # This launch alone, the writer adds it to whatever other hosts stored
+        row = dict(fields, target=target, first_used=now, last_used=now, launches=1)
+        self._queue.put(tuple(row[column] for column in _COLUMNS))
+        with self._lock:
+            if self._loaded:
+                self._apply(target, now, fields)
+            else:
+                # The first launch of a one-shot host must not wait for sqlite3: the writer loads the mirror
+                self._pending.append((target, now, fields))
+            self._start_writer()
+
+    def get(self, target):
+        """The stored row for ``target``, or None."""
+        if not self.enabled:
+            return None
+        self._load()
+        with self._lock:
+            entry = self._entries.get(target)
+            return dict(entry) if entry is not None else None
+
+    def recent(self, limit=20):
+        """Up to ``limit`` rows, most recently used first."""
+        if not self.enabled:
+            return []
+        self._load()
+        with self._lock:
+            rows = []
+            for entry in reversed(self._entries.values()):
+                if len(rows) >= limit:
+                    break
+                rows.append(dict(entry))
+            return rows
+
+    def start(self):
+        """Load the history and start the writer thread."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._start_writer()
+
+    def _start_writer(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._write_loop, name="realvnc-history", daemon=True)
+            self._thread.start()
+
+    def _write_loop(self):
+        self._load()
+        if self._error is not None:
+            return
+        import sqlite3
+
+        try:
+            connection = self._connect()
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Session history not persisted, {self.path} is unusable: {e}")
+            return
+        try:
+            while True:
+                row = self._queue.get()
+                if row is None:
+                    break
+                batch = [row]
+                stop = False
+                deadline = time.monotonic() + _BATCH_DELAY
+                while len(batch) < _BATCH_SIZE:
+                    try:
+                        row = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if row is None:
+                        stop = True
+                        break
+                    batch.append(row)
+                self._write(connection, batch)
+                if stop:
+                    break
+        finally:
+            connection.close()
+
+    def _write(self, connection, batch):
+        import sqlite3
+
+        try:
+            with connection:
+                if sqlite3.sqlite_version_info >= (3, 24, 0):
+                    connection.executemany(_UPSERT, batch)
+                else:
+                    self._merge(connection, batch)
+                connection.execute(
+                    "DELETE FROM sessions WHERE target NOT IN"
+                    " (SELECT target FROM sessions ORDER BY last_used DESC LIMIT ?)", (self.max_entries,))
+            self._written += len(batch)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write session history: {e}")
+
+    @staticmethod
+    def _merge(connection, batch):
+        """``_UPSERT`` for SQLite older than 3.24, which has no ``ON CONFLICT ... DO UPDATE``."""
+        for row in batch:
+            entry = dict(zip(_COLUMNS, row))
+            connection.execute(
+                f"INSERT OR IGNORE INTO sessions ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                row[:-1] + (0,))
+            connection.execute(
+                "UPDATE sessions SET host = ?, port = ?, digest = ?, profile = ?, vnc_path = ?"
+                " WHERE target = ? AND last_used <= ?",
+                (entry["host"], entry["port"], entry["digest"], entry["profile"], entry["vnc_path"],
+                 entry["target"], entry["last_used"]))
+            connection.execute(
+                "UPDATE sessions SET first_used = min(first_used, ?), last_used = max(last_used, ?),"
+                " launches = launches + ? WHERE target = ?",
+                (entry["first_used"], entry["last_used"], entry["launches"], entry["target"]))
+
+    def stop(self):
+        """Write what is pending and stop the writer thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout=5.0)
+        self._thread = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "written": self._written,
+                "pending": self._queue.qsize(),
+            }
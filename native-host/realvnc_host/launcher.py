@@ -0,0 +1,862 @@
+# -*- coding: utf-8 -*-
+"""
+RealVNC Launcher native host implementation.
+
+It handles launching RealVNC Viewer with specified connection files on Windows and macOS.
+``realvnc_launcher.py`` imports this module only after the first request has
+been answered, so the imports here do not count against host cold start.
+"""
+
+import sys
+import copy
+import subprocess
+import os
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from realvnc_host.admission import AdmissionControl
+from realvnc_host.config import Settings
+from realvnc_host.diskless import DisklessHandoff
+from realvnc_host.framing import FrameReader, FrameWriter, RejectedFrame
+from realvnc_host.history import SessionHistory
+from realvnc_host.lifecycle import IdleMonitor
+from realvnc_host.metrics import Metrics
+from realvnc_host.plans import LaunchPlan, PlanCache
+from realvnc_host.profile import profile_target, target_label
+from realvnc_host.protocol import closing_event, ping_response, rejected_response, system_name
+from realvnc_host.registry import Field, HandlerRegistry
+from realvnc_host.resolver import ViewerResolver
+from realvnc_host.serializer import load_backend, select_backend
+from realvnc_host.spawn import Spawner
+from realvnc_host.spool import Spool, content_hash
+from realvnc_host.supervisor import Supervisor
+from realvnc_host import tracing
+
+logger = logging.getLogger(__name__)
+
+# Upper bound for the wait action, below the extension's 30 s request timeout
+MAX_WAIT_SECONDS = 25
+
+# Longest hold a single keepalive can ask for
+MAX_KEEPALIVE_SECONDS = 3600
+
+# Longest total deadline a probe_hosts request can ask for
+MAX_PROBE_SECONDS = 30
+
+# Longest path and profile accepted in a request, anything bigger is rejected before any I/O
+MAX_PATH_LENGTH = 4096
+MAX_PROFILE_SIZE = 64 * 1024
+
+# Registered actions; each has its own metrics series, anything else is counted as "unknown"
+HANDLERS = HandlerRegistry(common=(
+    Field('requestId', (str, int), max_length=128),
+    Field('traceId', str, max_length=128),
+    Field('clientTs', (int, float)),
+))
+
+# A single launch, also the shape of every launch_many entry
+LAUNCH_FIELDS = (
+    Field('connectionFile', str, max_length=MAX_PATH_LENGTH),
+    Field('svnContent', str, max_length=MAX_PROFILE_SIZE),
+    Field('vncPath', str, max_length=MAX_PATH_LENGTH),
+    Field('host', str, max_length=255),
+    Field('port', (int, str), minimum=0, maximum=65535, max_length=5, digits=True),
+    Field('diskless', bool),
+    Field('planId', str, max_length=64),
+)
+
+# One probe_hosts entry, the port defaults to 5900 (display :0)
+PROBE_FIELDS = (
+    Field('host', str, required=True, max_length=255),
+    Field('port', (int, str), minimum=0, maximum=65535, max_length=5, digits=True),
+)
+
+class RealVNCLauncher:
+    def __init__(self, settings=None, reader=None, writer=None):
+        self.settings = settings or Settings()
+        self.frame_reader = reader or FrameReader(sys.stdin.buffer, self.settings.max_frame_size)
+        self.frame_writer = writer or FrameWriter(sys.stdout.buffer)
+        # JSON backend chosen once for the life of the host. Importing it is left to start_background,
+        # a one-shot host answers its first request with the stdlib codec
+        self.serializer = select_backend(self.settings.json_backend)
+        # Responses may come from worker threads, one frame must not split another
+        self._write_lock = threading.Lock()
+        self.system = system_name()
+        self.resolver = ViewerResolver(self.system, self.settings.state_dir)
+        self.spool = Spool(
+            self.settings.spool_dir,
+            max_age=self.settings.spool_max_age,
+            max_files=self.settings.spool_max_files,
+            max_bytes=self.settings.spool_max_bytes,
+            sweep_interval=self.settings.spool_sweep_interval,
+            index_size=self.settings.spool_index_size
+        )
+        self.supervisor = Supervisor()
+        self.spawner = Spawner(self.settings.spawn_mode)
+        self.diskless = DisklessHandoff(self.settings.diskless_mode, self.settings.diskless_fifo_timeout)
+        self.metrics = Metrics()
+        # Coalesces duplicate launches and bounds concurrent spawns
+        self.admission = AdmissionControl(
+            self.settings.launch_coalesce_window,
+            self.settings.launch_max_in_flight,
+            self.settings.launch_max_queued
+        )
+        # Launches precomputed by the prepare action, by plan ID
+        self.plans = PlanCache(self.settings.plan_ttl, self.settings.plan_max)
+        # Recently launched targets, answers recent and reconnect
+        self.history = SessionHistory(self.settings.history_file, self.settings.history_max)
+        # Closes this connection after REALVNC_HOST_IDLE_TIMEOUT seconds without requests
+        self.idle = IdleMonitor(self.settings.idle_timeout)
+        # Validators compiled once, with the limits of these settings
+        self.handlers = HANDLERS.compile(self.settings)
+        # Traces of decoded requests waiting for a worker, keyed by id() of the message
+        self._traces = {}
+        # Set by the shared daemon to report its clients in the stats action
+        self.daemon_stats = None
+        logger.info(f"RealVNC Launcher initialized on {self.system} (JSON backend: {self.serializer})")
+        
+    def get_default_vnc_path(self):
+        """Get the default RealVNC Viewer executable path for the current platform."""
+        return self.resolver.resolve()
+    
+    def launch_realvnc(self, connection_file="", custom_vnc_path="", file_verified=False, pass_fds=(), target=None):
+        """Launch RealVNC Viewer with optional connection file.
+        
+        ``file_verified`` skips the existence check for files the host just
+        wrote or found in its spool index. ``pass_fds`` are inherited by the
+        viewer (Linux diskless handoff). ``target`` labels the session.
+        """
+        try:
+            # Determine VNC executable path
+            if custom_vnc_path:
+                vnc_path = custom_vnc_path
+            else:
+                started = time.perf_counter()
+                vnc_path = self.get_default_vnc_path()
+                self.phase('launch', 'resolve', started)
+            
+            if not vnc_path:
+                raise Exception("RealVNC Viewer not found. Please install RealVNC Viewer or specify custom path.")
+            
+            use_file = bool(connection_file) and (file_verified or os.path.exists(connection_file))
+            cmd, options = self.build_command(vnc_path, connection_file if use_file else "")
+            if pass_fds:
+                options = dict(options, pass_fds=pass_fds)
+            return self.spawn_viewer(cmd, options, target)
+            
+        except Exception as e:
+            error_msg = f"Failed to launch RealVNC: {str(e)}"
+            logger.error(error_msg)
+            return {
+                "success": False,
+                "error": error_msg
+            }
+    
+    def build_command(self, vnc_path, connection_file=""):
+        """Viewer command line for this platform and the ``Popen`` options it needs."""
+        if self.system == "Windows":
+            # Use start command to launch program on Windows, without blocking
+            cmd = ["cmd", "/c", "start", "", vnc_path]
+            if connection_file:
+                cmd.append(connection_file)
+            return cmd, {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        
+        if self.system == "Darwin" and vnc_path.endswith(".app"):
+            # Use 'open' command for .app bundles
+            cmd = ["open", vnc_path]
+            if connection_file:
+                cmd.extend(["--args", connection_file])
+            return cmd, {}
+        
+        # Direct executable: macOS binaries, Linux and other Unix-like systems
+        cmd = [vnc_path]
+        if connection_file:
+            cmd.append(connection_file)
+        return cmd, {}
+    
+    def spawn_viewer(self, cmd, options, target=None):
+        """Start the viewer and add it to the session table."""
+        spawn_started = time.perf_counter()
+        pid, process = self.spawner.spawn(cmd, **options)
+        self.phase('launch', 'spawn', spawn_started)
+        self.supervisor.track(pid, target, ' '.join(cmd), process)
+        logger.info(f"RealVNC launched with command: {' '.join(cmd)}")
+        return {
+            "success": True,
+            "message": "RealVNC Viewer launched successfully",
+            "pid": pid,
+            "command": ' '.join(cmd)
+        }
+    
+    def read_message(self):
+        """Read message from stdin using Chrome native messaging protocol."""
+        while True:
+            try:
+                payload = self.frame_reader.read_payload()
+                if payload is None:
+                    return None
+                if not self.idle.touch():
+                    # Closing for idleness: leave the request unanswered, the extension resends it
+                    return None
+                started = time.perf_counter()
+                message = self.frame_reader.decode(payload)
+                if isinstance(message, dict):
+                    decoded = time.perf_counter()
+                    self.metrics.observe_phase(self.action_label(message), 'decode', decoded - started)
+                    if message.get('traceId') is not None:
+                        trace = tracing.Trace(message, started, self.settings.started_at)
+                        trace.span('decode', started, decoded)
+                        self._traces[id(message)] = trace
+                return message
+            except RejectedFrame as e:
+                # The frame was skipped, report it and keep serving the port
+                logger.error(f"Rejected message: {e}")
+                self.metrics.increment('rejected_frames')
+                self.send_message(rejected_response(e))
+            except Exception as e:
+                logger.error(f"Error reading message: {e}")
+                return None
+    
+    def send_message(self, message):
+        """Send message to stdout using Chrome native messaging protocol."""
+        try:
+            with self._write_lock:
+                started = time.perf_counter()
+                self.frame_writer.write(message)
+            if message.get('traceId') is not None:
+                tracing.emit_event(message['traceId'], message.get('requestId'), None, 'send',
+                                   None, time.perf_counter() - started)
+            
+        except Exception as e:
+            logger.error(f"Error sending message: {e}")
+    
+    def write_connection_file(self, connection_file, svn_content):
+        """Write SVN content to the connection file.
+        
+        Relative names (what the extension sends) go into the managed spool,
+        content-addressed so identical profiles share one file; the name the
+        extension picked is not used. Absolute paths are written as given.
+        """
+        if not os.path.isabs(connection_file):
+            connection_file, _, reused = self.spool.store(svn_content)
+            if reused:
+                logger.info(f"SVN file reused: {connection_file}")
+            else:
+                logger.info(f"SVN file created: {connection_file}")
+            return connection_file
+        
+        # Ensure directory exists
+        dir_path = os.path.dirname(connection_file)
+        if dir_path and not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+            logger.info(f"Created directory: {dir_path}")
+        
+        # Write SVN file
+        with open(connection_file, 'w', encoding='utf-8') as f:
+            f.write(svn_content)
+        logger.info(f"SVN file created: {connection_file}")
+        return connection_file
+    
+    def session_address(self, message, svn_content):
+        """``(host, port)`` of a launch, from the message or the profile."""
+        host = message.get('host')
+        port = message.get('port')
+        if not host and svn_content:
+            host, port = profile_target(svn_content)
+        if isinstance(port, str) and port.isdigit():
+            port = int(port)
+        return host, port
+    
+    def session_target(self, message, svn_content):
+        """``host:port`` for the session table, from the message or the profile."""
+        return target_label(*self.session_address(message, svn_content))
+    
+    def remember(self, result, address, svn_content, profile, vnc_path):
+        """Add a successful launch to the session history."""
+        target = target_label(*address)
+        if not result.get('success') or target is None:
+            return
+        digest = content_hash(svn_content.encode('utf-8')) if svn_content else None
+        self.history.record(target, address[0], address[1], digest, profile or None, vnc_path or None)
+    
+    def stored_profile(self, entry):
+        """Path of the profile a history entry can be relaunched from, or None."""
+        if entry['digest']:
+            path = self.spool.lookup(entry['digest'])
+            if path is not None:
+                return path
+        profile = entry['profile']
+        if profile and os.path.isabs(profile) and os.path.isfile(profile):
+            return profile
+        return None
+    
+    def prepare_plan(self, spec):
+        """Resolve the viewer, write the profile and build the command of one launch, for a later ``planId``."""
+        connection_file = spec.get('connectionFile', '')
+        custom_vnc_path = spec.get('vncPath', '')
+        svn_content = spec.get('svnContent', '')
+        address = self.session_address(spec, svn_content)
+        target = target_label(*address)
+        
+        if custom_vnc_path:
+            vnc_path = custom_vnc_path
+        else:
+            started = time.perf_counter()
+            vnc_path = self.get_default_vnc_path()
+            self.phase('prepare', 'resolve', started)
+        if not vnc_path:
+            return {
+                "success": False,
+                "error": "RealVNC Viewer not found. Please install RealVNC Viewer or specify custom path."
+            }
+        
+        if (svn_content and connection_file and spec.get('diskless', True) is not False
+                and self.system == "Linux" and self.diskless.active_kind() is not None):
+            # A handoff serves one spawn, it is made at launch time
+            plan_spec = dict(spec, vncPath=vnc_path)
+            plan_spec.pop('planId', None)
+            plan = LaunchPlan(self.launch_key(spec), target, vnc_path, spec=plan_spec)
+        else:
+            if svn_content and connection_file:
+                try:
+                    started = time.perf_counter()
+                    connection_file = self.write_connection_file(connection_file, svn_content)
+                    self.phase('prepare', 'write', started)
+                except Exception as e:
+                    logger.error(f"Failed to create SVN file: {e}")
+                    return {
+                        "success": False,
+                        "error": f"Failed to create SVN file: {e}"
+                    }
+            elif connection_file and not os.path.exists(connection_file):
+                connection_file = ''
+            cmd, options = self.build_command(vnc_path, connection_file)
+            digest = content_hash(svn_content.encode('utf-8')) if svn_content else None
+            plan = LaunchPlan(self.launch_key(spec), target, vnc_path, connection_file, cmd, options,
+                              address=address, digest=digest)
+        
+        plan_id = self.plans.add(plan)
+        return {
+            "success": True,
+            "planId": plan_id,
+            "target": target,
+            "expiresIn": self.plans.ttl
+        }
+    
+    def launch_plan(self, plan):
+        """Start the viewer of a prepared plan; None when the plan no longer holds and the launch must be redone."""
+        if plan.spec is not None:
+            result = self.launch_spec(plan.spec)
+        else:
+            if plan.connection_file and not os.path.exists(plan.connection_file):
+                # Swept from the spool since it was prepared
+                self.plans.discard(plan.plan_id)
+                return None
+            try:
+                result = self.spawn_viewer(plan.cmd, plan.options, plan.target)
+            except Exception as e:
+                logger.error(f"Failed to launch prepared plan {plan.plan_id}: {e}")
+                self.plans.discard(plan.plan_id)
+                return None
+            if plan.target is not None:
+                self.history.record(plan.target, plan.address[0], plan.address[1], plan.digest,
+                                    plan.connection_file or None, plan.vnc_path or None)
+        result["prepared"] = True
+        return result
+    
+    def launch_spec(self, spec):
+        """Write the profile of one launch request (or connection spec) and start the viewer."""
+        plan_id = spec.get('planId')
+        if plan_id:
+            plan = self.plans.get(plan_id)
+            full_request = spec.get('svnContent') or spec.get('connectionFile')
+            if plan is not None and full_request and self.launch_key(spec) != plan.key:
+                # Prepared for other connection data (a changed password), the request wins
+                plan = None
+            result = self.launch_plan(plan) if plan is not None else None
+            if result is not None:
+                return result
+            if not spec.get('svnContent') and not spec.get('connectionFile'):
+                return {
+                    "success": False,
+                    "error": f"Unknown or expired plan: {plan_id}"
+                }
+            # The request carries everything, launch it the regular way
+            self.metrics.increment('missed_plans')
+        
+        connection_file = spec.get('connectionFile', '')
+        custom_vnc_path = spec.get('vncPath', '')
+        svn_content = spec.get('svnContent', '')
+        address = self.session_address(spec, svn_content)
+        target = target_label(*address)
+        
+        # On Linux the profile can be handed over without touching the disk
+        if svn_content and connection_file and spec.get('diskless', True) is not False:
+            started = time.perf_counter()
+            handoff = self.diskless.prepare(svn_content) if self.system == "Linux" else None
+            if handoff is not None:
+                self.phase('launch', 'write', started)
+                result = {"success": False}
+                try:
+                    result = self.launch_realvnc(handoff.path, custom_vnc_path, True, handoff.pass_fds, target)
+                finally:
+                    handoff.finish(result.get("success", False))
+                # Nothing on disk to reconnect from, the history only lists it
+                self.remember(result, address, svn_content, None, custom_vnc_path)
+                result["handoff"] = handoff.kind
+                return result
+        
+        # If there is SVN content, write to file first
+        file_verified = False
+        if svn_content and connection_file:
+            try:
+                started = time.perf_counter()
+                connection_file = self.write_connection_file(connection_file, svn_content)
+                self.phase('launch', 'write', started)
+                file_verified = True
+            except Exception as e:
+                logger.error(f"Failed to create SVN file: {e}")
+                return {
+                    "success": False,
+                    "error": f"Failed to create SVN file: {e}"
+                }
+        
+        result = self.launch_realvnc(connection_file, custom_vnc_path, file_verified, target=target)
+        self.remember(result, address, svn_content, connection_file, custom_vnc_path)
+        return result
+    
+    @staticmethod
+    def launch_key(spec):
+        """Identity of a launch for coalescing: same profile, target file and viewer."""
+        connection_file = spec.get('connectionFile') or ''
+        svn_content = spec.get('svnContent') or ''
+        if not svn_content and not connection_file:
+            plan_id = spec.get('planId')
+            return ('plan', plan_id) if plan_id else None
+        # Relative names are fresh temp names from the extension, the spool ignores them anyway
+        if svn_content and not os.path.isabs(connection_file):
+            connection_file = ''
+        return (svn_content, connection_file, spec.get('vncPath') or '')
+    
+    def admit(self, spec, bounded=True):
+        """Launch through admission control: share an identical recent launch, refuse when saturated."""
+        return self.admit_launch(self.launch_key(spec), lambda: self.launch_spec(spec), bounded)
+    
+    def admit_launch(self, key, launch, bounded=True):
+        """Run ``launch()`` through admission control under the coalescing ``key``."""
+        result = self.admission.run(key, launch, bounded)
+        if result.get('coalesced'):
+            self.metrics.increment('coalesced_launches')
+        elif result.get('busy'):
+            self.metrics.increment('busy_launches')
+        return result
+    
+    def launch_many(self, message):
+        """Launch several viewers in parallel.
+        
+        ``hosts`` is a list of connection specs with the same fields as a
+        ``launch`` request. Profiles are written and viewers spawned on a
+        bounded thread pool; one ``partial`` frame per host is streamed back
+        as soon as it finishes, and the returned summary is the final frame.
+        """
+        specs = message['hosts']
+        
+        # Resolve the viewer once up front instead of once per worker
+        if not all(spec.get('vncPath') for spec in specs):
+            self.get_default_vnc_path()
+        
+        request_id = message.get('requestId')
+        results = [None] * len(specs)
+        workers = min(self.settings.batch_workers, len(specs))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="realvnc-batch") as pool:
+            # The batch is bounded already, its launches wait for a slot instead of being refused
+            futures = {pool.submit(self.admit, spec, False): index for index, spec in enumerate(specs)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Batch launch {index} failed: {e}")
+                    result = {"success": False, "error": f"Internal error: {e}"}
+                results[index] = result
+                
+                partial = dict(result, partial=True, index=index)
+                partial['target'] = self.session_target(specs[index], specs[index].get('svnContent', ''))
+                if request_id is not None:
+                    partial['requestId'] = request_id
+                self.send_message(partial)
+        
+        launched = sum(1 for result in results if result.get('success'))
+        logger.info(f"Batch launch finished: {launched}/{len(specs)} viewers started")
+        return {
+            "success": launched == len(specs),
+            "total": len(specs),
+            "launched": launched,
+            "failed": len(specs) - launched,
+            "pids": [result.get('pid') for result in results]
+        }
+    
+    @staticmethod
+    def is_long_poll(message):
+        """Whether ``message`` asks for an action that blocks until an event (``wait``)."""
+        return isinstance(message, dict) and HANDLERS.is_long_poll(message.get('action'))
+    
+    def handle_message(self, message):
+        """Validate a single request against its action's fields and dispatch it."""
+        action = message.get('action')
+        entry = self.handlers.get(action) if isinstance(action, str) else None
+        if entry is None:
+            return {
+                "success": False,
+                "error": f"Unknown action: {action}"
+            }
+        
+        handler, validate = entry
+        error = validate(message)
+        if error is not None:
+            self.metrics.increment('invalid_requests')
+            logger.warning(f"Rejected {action} request: {error}")
+            return {
+                "success": False,
+                "error": f"Invalid {action} request: {error}"
+            }
+        return handler(self, message)
+    
+    @HANDLERS.action('launch', *LAUNCH_FIELDS)
+    def handle_launch(self, message):
+        return self.admit(message)
+    
+    @HANDLERS.action('launch_many', Field(
+        'hosts', list, required=True, min_items=1,
+        max_items=lambda settings: settings.batch_max_hosts, items=LAUNCH_FIELDS))
+    def handle_launch_many(self, message):
+        return self.launch_many(message)
+    
+    @HANDLERS.action('prepare', Field(
+        'hosts', list, required=True, min_items=1,
+        max_items=lambda settings: settings.batch_max_hosts, items=LAUNCH_FIELDS))
+    def handle_prepare(self, message):
+        plans = []
+        for index, spec in enumerate(message['hosts']):
+            result = self.prepare_plan(spec)
+            result['index'] = index
+            plans.append(result)
+        prepared = sum(1 for plan in plans if plan['success'])
+        logger.info(f"Prepared {prepared} of {len(plans)} launch plans")
+        return {
+            "success": prepared > 0,
+            "plans": plans,
+            "prepared": prepared,
+            "ttl": self.plans.ttl
+        }
+    
+    @HANDLERS.action('recent', Field(
+        'limit', int, minimum=1, maximum=lambda settings: max(1, settings.history_max)))
+    def handle_recent(self, message):
+        limit = message.get('limit') or 20
+        hosts = []
+        for entry in self.history.recent(limit):
+            hosts.append({
+                "target": entry['target'],
+                "host": entry['host'],
+                "port": entry['port'],
+                "lastUsed": entry['last_used'],
+                "firstUsed": entry['first_used'],
+                "launches": entry['launches'],
+                "reconnectable": self.stored_profile(entry) is not None
+            })
+        return {"success": True, "hosts": hosts, "enabled": self.history.enabled}
+    
+    @HANDLERS.action('reconnect', Field('target', str, max_length=300), Field('host', str, max_length=255),
+                     Field('port', (int, str), minimum=0, maximum=65535, max_length=5, digits=True),
+                     Field('vncPath', str, max_length=MAX_PATH_LENGTH))
+    def handle_reconnect(self, message):
+        target = message.get('target') or self.session_target(message, '')
+        if not target:
+            self.metrics.increment('invalid_requests')
+            return {"success": False, "error": "Invalid reconnect request: target or host is required"}
+        
+        entry = self.history.get(target)
+        if entry is None:
+            return {"success": False, "error": f"No session history for {target}"}
+        profile = self.stored_profile(entry)
+        if profile is None:
+            return {"success": False, "error": f"The profile of {target} is no longer stored, launch it again"}
+        vnc_path = message.get('vncPath') or entry['vnc_path'] or ''
+        
+        def launch():
+            result = self.launch_realvnc(profile, vnc_path, True, target=target)
+            if result.get('success'):
+                self.history.record(target, entry['host'], entry['port'], entry['digest'], profile, entry['vnc_path'])
+            return result
+        
+        result = self.admit_launch(('reconnect', target), launch)
+        result['target'] = target
+        return result
+    
+    @HANDLERS.action('probe_hosts', Field(
+        'hosts', list, required=True, min_items=1,
+        max_items=lambda settings: settings.probe_max_hosts, items=PROBE_FIELDS),
+        Field('timeout', (int, float), minimum=0, maximum=MAX_PROBE_SECONDS))
+    def handle_probe_hosts(self, message):
+        # asyncio is loaded for probes only, not on every cold start
+        from realvnc_host.probe import DEFAULT_PORT, probe_hosts
+        
+        # Ports were checked and converted to numbers with the request
+        targets = [(entry['host'], DEFAULT_PORT if entry.get('port') is None else entry['port']) for entry in message['hosts']]
+        
+        timeout = message.get('timeout')
+        if timeout is None:
+            timeout = self.settings.probe_timeout
+        started = time.perf_counter()
+        results = probe_hosts(targets, timeout, self.settings.probe_concurrency)
+        reachable = sum(1 for result in results if result['reachable'])
+        logger.info(f"Probed {len(results)} hosts: {reachable} reachable")
+        return {
+            "success": True,
+            "results": results,
+            "reachable": reachable,
+            "elapsedMs": round((time.perf_counter() - started) * 1000.0, 3)
+        }
+    
+    @HANDLERS.action('ping', Field('warm', bool))
+    def handle_ping(self, message):
+        response = ping_response(self.system, self.serializer)
+        if message.get('warm'):
+            response['warm'] = self.warm_up()
+        return response
+    
+    @HANDLERS.action('keepalive', Field('ttl', (int, float), minimum=0, maximum=MAX_KEEPALIVE_SECONDS))
+    def handle_keepalive(self, message):
+        ttl = message.get('ttl')
+        remaining = self.idle.hold(ttl) if ttl is not None else self.idle.remaining()
+        return {
+            "success": True,
+            "idleTimeout": self.settings.idle_timeout,
+            "expiresIn": round(remaining, 3) if self.settings.idle_timeout else None
+        }
+    
+    @HANDLERS.action('check_vnc')
+    def handle_check_vnc(self, message):
+        # Answered from the resolver cache, a single stat when warm
+        vnc_path = self.get_default_vnc_path()
+        return {
+            "success": vnc_path is not None,
+            "vnc_path": vnc_path,
+            "platform": self.system
+        }
+    
+    @HANDLERS.action('sessions', Field('includeExited', bool))
+    def handle_sessions(self, message):
+        include_exited = message.get('includeExited', True) is not False
+        return {
+            "success": True,
+            "sessions": self.supervisor.sessions(include_exited),
+            "supervisor": self.supervisor.stats()
+        }
+    
+    @HANDLERS.action('kill', Field('pid', int, required=True, minimum=1), Field('signal', str, max_length=16))
+    def handle_kill(self, message):
+        pid = message['pid']
+        try:
+            self.supervisor.kill(pid, message.get('signal') or 'TERM')
+        except (LookupError, ValueError, OSError) as e:
+            return {"success": False, "error": str(e)}
+        return {"success": True, "pid": pid}
+    
+    @HANDLERS.action('wait', Field('pid', int, required=True, minimum=1), Field('timeout', (int, float), minimum=0),
+                     long_poll=True)
+    def handle_wait(self, message):
+        pid = message['pid']
+        timeout = message.get('timeout')
+        if timeout is None:
+            timeout = MAX_WAIT_SECONDS
+        session = self.supervisor.wait(pid, min(timeout, MAX_WAIT_SECONDS))
+        if session is None:
+            return {"success": False, "error": f"No session with pid {pid}"}
+        return {"success": True, "exited": not session.running, "session": session.to_dict()}
+    
+    @HANDLERS.action('spool_stats')
+    def handle_spool_stats(self, message):
+        return dict(self.spool.stats(), diskless=self.diskless.stats(), success=True)
+    
+    @HANDLERS.action('stats')
+    def handle_stats(self, message):
+        stats = dict(self.metrics.snapshot(), supervisor=self.supervisor.stats(), admission=self.admission.stats(),
+                     plans=self.plans.stats(), spawn=self.spawner.stats(), history=self.history.stats(), pid=os.getpid(),
+                     success=True)
+        if self.daemon_stats is not None:
+            stats['daemon'] = self.daemon_stats()
+        return stats
+    
+    def phase(self, action, name, started):
+        """Close a phase that began at ``started``: feed the metrics and the current trace."""
+        end = time.perf_counter()
+        self.metrics.observe_phase(action, name, end - started)
+        trace = tracing.current()
+        if trace is not None:
+            trace.span(name, started, end)
+    
+    @staticmethod
+    def action_label(message):
+        """Metrics label for a request, bounded to the known actions."""
+        action = message.get('action')
+        return action if action in HANDLERS else 'unknown'
+    
+    def process_message(self, message):
+        """Handle a message and return the response tagged with the caller's request ID."""
+        # Lazy arguments: skipped below INFO and masked by the redaction filter
+        logger.info("Received message: %s", message)
+        
+        if not isinstance(message, dict):
+            return {
+                "success": False,
+                "error": "Message must be a JSON object"
+            }
+        
+        started = time.perf_counter()
+        trace = self._traces.pop(id(message), None)
+        if trace is not None:
+            # Time between decode and a worker picking the request up
+            trace.span('queue', trace.origin + trace.spans[-1][1] + trace.spans[-1][2], started)
+        elif message.get('traceId') is not None:
+            trace = tracing.Trace(message, started, self.settings.started_at)
+        tracing.activate(trace)
+        self.idle.begin()
+        try:
+            response = self.handle_message(message)
+        except Exception as e:
+            # Keep the port alive for the next request in persistent mode
+            logger.error(f"Unhandled error for action {message.get('action')}: {e}")
+            response = {
+                "success": False,
+                "error": f"Internal error: {e}"
+            }
+        finally:
+            self.idle.end()
+            tracing.activate(None)
+        
+        self.metrics.record(self.action_label(message), time.perf_counter() - started, bool(response.get('success')))
+        
+        request_id = message.get('requestId')
+        if request_id is not None:
+            response['requestId'] = request_id
+        if trace is not None:
+            trace.span('handle', started)
+            response['traceId'] = trace.trace_id
+            response['timings'] = trace.timings()
+            trace.emit()
+        return response
+    
+    def for_connection(self, reader, writer):
+        """A launcher for another client of the same host (the shared daemon).
+        
+        It reads and writes its own frames but shares the resolver, spool,
+        session table, metrics and everything else with this launcher.
+        """
+        view = copy.copy(self)
+        reader.loads = self.frame_reader.loads
+        writer.dumps = self.frame_writer.dumps
+        view.frame_reader = reader
+        view.frame_writer = writer
+        view._write_lock = threading.Lock()
+        view.idle = IdleMonitor(self.settings.idle_timeout)
+        return view
+    
+    def warm_up(self):
+        """Resolve the viewer and create the spool directory ahead of the first launch."""
+        started = time.perf_counter()
+        vnc_path = self.get_default_vnc_path()
+        try:
+            self.spool.ensure_directory()
+            spool_ready = True
+        except OSError as e:
+            logger.warning(f"Could not create spool directory {self.spool.directory}: {e}")
+            spool_ready = False
+        self.phase('ping', 'warm', started)
+        return {"vnc_path": vnc_path, "spool": spool_ready}
+    
+    def exit_idle(self):
+        """Idle timeout of the stdio host: tell the browser, flush stats and logs, exit."""
+        from realvnc_host.logsetup import shutdown_logging
+        
+        logger.info(f"No requests for {self.settings.idle_timeout:g} s, native host exiting")
+        self.send_message(closing_event("idle"))
+        self.stop_background()
+        logger.info("RealVNC Launcher native host stopped")
+        shutdown_logging()
+        logging.shutdown()
+        # The main thread is blocked reading stdin, which cannot be interrupted portably
+        os._exit(0)
+    
+    def start_background(self):
+        """Load the JSON backend and start housekeeping threads (spool sweeper, child reaper, history writer, metrics export)."""
+        self.serializer, self.frame_reader.loads, self.frame_writer.dumps = load_backend(self.serializer)
+        self.spool.start()
+        self.supervisor.start()
+        self.history.start()
+        self.metrics.start_export(self.settings.metrics_textfile, self.settings.metrics_interval)
+    
+    def stop_background(self):
+        """Stop housekeeping threads, finish pending profile handoffs and history writes."""
+        self.spool.stop()
+        self.supervisor.stop()
+        self.diskless.drain()
+        self.history.stop()
+        self.metrics.stop_export(self.settings.metrics_textfile)
+        served = ", ".join(f"{action}={row['requests']}" for action, row in self.metrics.snapshot()['actions'].items())
+        logger.info(f"Requests served: {served or 'none'}")
+    
+    def run(self):
+        """Main message loop.
+        
+        The loop serves requests until the browser closes the port, so a single
+        long-lived port can carry many requests. Each response echoes the
+        ``requestId`` of its request so the extension can match them up.
+        """
+        logger.info("RealVNC Launcher native host started")
+        self.start_background()
+        self.idle.start(self.exit_idle)
+        
+        try:
+            while True:
+                message = self.read_message()
+                if message is None:
+                    break
+                
+                self.send_message(self.process_message(message))
+                    
+        except KeyboardInterrupt:
+            logger.info("Native host interrupted")
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+        finally:
+            self.idle.stop()
+            self.stop_background()
+            logger.info("RealVNC Launcher native host stopped")
+    
+    def run_async(self, max_concurrency):
+        """Message loop that handles requests concurrently.
+        
+        Same framing as ``run``, but a slow ``launch`` no longer blocks the
+        requests queued behind it. At most ``max_concurrency`` requests run
+        at once.
+        """
+        from realvnc_host.engine import run_stdio
+        
+        logger.info(f"RealVNC Launcher native host started (async, max_concurrency={max_concurrency})")
+        self.start_background()
+        self.idle.start(self.exit_idle)
+        
+        try:
+            run_stdio(self, max_concurrency)
+        except KeyboardInterrupt:
+            logger.info("Native host interrupted")
+        except Exception as e:
+            logger.error(f"Unexpected error: {e}")
+        finally:
+            self.idle.stop()
+            self.stop_background()
+            logger.info("RealVNC Launcher native host stopped")
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Idle timeout for a browser connection.
+
+A persistent host would otherwise live as long as the browser keeps the port
+open. ``IdleMonitor`` ends the connection once nothing has happened on it for
+``REALVNC_HOST_IDLE_TIMEOUT`` seconds: every frame read pushes the deadline
+out, a request being handled holds it, and the ``keepalive`` action can hold
+it for longer (the extension does this while an HSDES page is open).
+
+The decision to close is atomic with the frame reader: once the monitor has
+decided, the browser is told (``{"event": "closing"}``) and any frame that
+still arrives is dropped unhandled, so a request is either answered or never
+seen and the extension can safely resend it on a new port.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class IdleMonitor:
+    """Call ``on_idle`` once a connection has been idle for ``timeout`` seconds (0 disables)."""
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._deadline = time.monotonic() + timeout
+        self._in_flight = 0
+        self._closing = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def closing(self):
+        return self._closing
+
+    def touch(self):
+        """A frame arrived. Returns False when the connection is already closing and the frame must be dropped."""
+        with self._lock:
+            if self._closing:
+                return False
+            self._deadline = max(self._deadline, time.monotonic() + self.timeout)
+            return True
+
+    def begin(self):
+        """A request is being handled; the connection stays open until ``end``."""
+        with self._lock:
+            self._in_flight += 1
+
+    def end(self):
+        with self._lock:
+            self._in_flight -= 1
+            self._deadline = max(self._deadline, time.monotonic() + self.timeout)
+
+    def hold(self, seconds):
+        """Stay open for at least ``seconds`` more; returns the seconds left before an idle close."""
+        with self._lock:
+            now = time.monotonic()
+            self._deadline = max(self._deadline, now + seconds)
+            return self._deadline - now
+
+    def remaining(self):
+        """Seconds left before an idle close if nothing else happens."""
+        with self._lock:
+            return max(0.0, self._deadline - time.monotonic())
+
+    def start(self, on_idle):
+        """Watch the connection in a background thread."""
+        if self._thread is not None or not self.timeout:
+            return
+        with self._lock:
+            self._deadline = time.monotonic() + self.timeout
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, args=(on_idle,), name="realvnc-idle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread = None
+
+    def _watch(self, on_idle):
+        while True:
+            with self._lock:
+                wait = self._deadline - time.monotonic()
+                if wait <= 0 and not self._in_flight:
+                    self._closing = True
+                    break
+            # Past the deadline with a request still running: look again shortly
+            if self._stop.wait(wait if wait > 0 else 1.0):
+                return
+        try:
+            on_idle()
+        except Exception as e:
+            logger.error(f"Idle shutdown failed: {e}")
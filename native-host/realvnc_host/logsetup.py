@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Logging setup for the native messaging host.
+
+Kept out of the import path of the entry script so the log file is only
+opened after the first request has been answered. Until then
+``buffer_logging`` keeps the records of that request in memory, without
+loading ``logging.handlers`` and the socket and pickle modules behind it.
+
+Request threads only put records on an in-memory queue; a background
+listener thread formats them and writes them to a rotating log file (and
+stderr, which the browser keeps in its own log). Sensitive message fields such
+as ``svnContent`` are masked before a record leaves the calling thread.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+
+from realvnc_host.tracing import TRACE_LOGGER
+
+REDACTED = "***"
+
+# Message fields that must never reach a log file
+DEFAULT_REDACT_FIELDS = ("svnContent", "password", "vncPassword")
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class RedactFilter(logging.Filter):
+    """Mask sensitive fields in dict/list log arguments."""
+
+    def __init__(self, fields=DEFAULT_REDACT_FIELDS):
+        super().__init__()
+        self.fields = frozenset(field.lower() for field in fields)
+
+    def _redact(self, value):
+        if isinstance(value, dict):
+            return {
+                key: REDACTED if str(key).lower() in self.fields else self._redact(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return type(value)(self._redact(item) for item in value)
+        return value
+
+    def filter(self, record):
+        if isinstance(record.msg, (dict, list)):
+            record.msg = self._redact(record.msg)
+        if isinstance(record.args, dict):
+            record.args = self._redact(record.args)
+        elif record.args:
+            record.args = tuple(self._redact(arg) for arg in record.args)
+        return True
+
+
+class LoggerFilter(logging.Filter):
+    """Pass records of one logger (and its children), or everything else when ``exclude`` is set."""
+
+    def __init__(self, name, exclude=False):
+        super().__init__(name)
+        self.exclude = exclude
+
+    def filter(self, record):
+        return super().filter(record) != self.exclude
+
+
+class _EarlyBuffer(logging.Handler):
+    """Records logged before ``configure_logging``, replayed by it."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def _level(settings):
+    level = logging.getLevelName(settings.log_level.upper())
+    return level if isinstance(level, int) else logging.INFO
+
+
+def buffer_logging(settings):
+    """Hold log records in memory until ``configure_logging`` is called."""
+    handler = _EarlyBuffer()
+    handler.addFilter(RedactFilter(DEFAULT_REDACT_FIELDS + tuple(settings.log_redact)))
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(_level(settings))
+
+
+def _file_handler(settings, path=None):
+    """Rotating handler for the log file, by size or by time."""
+    import logging.handlers
+
+    path = os.path.expanduser(path or settings.log_file)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if settings.log_rotate == "time":
+        return logging.handlers.TimedRotatingFileHandler(
+            path,
+            when=settings.log_rotate_when,
+            backupCount=settings.log_backups,
+            encoding='utf-8',
+            delay=True
+        )
+    return logging.handlers.RotatingFileHandler(
+        path,
+        maxBytes=settings.log_max_bytes,
+        backupCount=settings.log_backups,
+        encoding='utf-8',
+        delay=True
+    )
+
+
+def configure_logging(settings):
+    """Route host logs through a queue to a rotating file and stderr."""
+    global _listener
+    import logging.handlers
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = []
+    try:
+        handlers.append(_file_handler(settings))
+    except OSError as e:
+        sys.stderr.write(f"RealVNC Launcher: cannot open log file {settings.log_file}: {e}\n")
+    if settings.log_stderr:
+        handlers.append(logging.StreamHandler(sys.stderr))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if settings.trace_file:
+        # Trace events get their own JSON-lines file and stay out of the main log
+        try:
+            trace_handler = _file_handler(settings, settings.trace_file)
+        except OSError as e:
+            sys.stderr.write(f"RealVNC Launcher: cannot open trace file {settings.trace_file}: {e}\n")
+        else:
+            for handler in handlers:
+                handler.addFilter(LoggerFilter(TRACE_LOGGER, exclude=True))
+            trace_handler.addFilter(LoggerFilter(TRACE_LOGGER))
+            trace_handler.setFormatter(logging.Formatter('%(message)s'))
+            handlers.append(trace_handler)
+
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(RedactFilter(DEFAULT_REDACT_FIELDS + tuple(settings.log_redact)))
+
+    root = logging.getLogger()
+    early = []
+    for handler in list(root.handlers):
+        if isinstance(handler, _EarlyBuffer):
+            early.extend(handler.records)
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(_level(settings))
+
+    _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    for record in early:
+        queue_handler.handle(record)
+
+
+def shutdown_logging():
+    """Drain queued records to disk and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        listener, _listener = _listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
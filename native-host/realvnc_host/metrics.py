@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+In-process metrics for the native host.
+
+Every request is counted per action and its handling time goes into a
+fixed-bucket latency histogram; launches also record how long each phase
+took (frame decode, profile write, viewer path resolution, spawn). The data
+is returned by the ``stats`` action and can be written periodically as a
+Prometheus textfile for node_exporter's textfile collector.
+
+Recording is a dict lookup, a bisect and a few integer additions under one
+lock, cheap enough to stay on for every request.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Histogram upper bounds in seconds, shared by every histogram
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+METRIC_PREFIX = "realvnc_host"
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations in seconds."""
+
+    __slots__ = ("bounds", "counts", "count", "total", "maximum")
+
+    def __init__(self, bounds=DEFAULT_BUCKETS):
+        self.bounds = bounds
+        # One slot per bound plus the overflow (+Inf) bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def cumulative(self):
+        """Cumulative counts per bound, the last entry being +Inf."""
+        result = []
+        running = 0
+        for count in self.counts:
+            running += count
+            result.append(running)
+        return result
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (max for the overflow bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, running in zip(self.bounds, self.cumulative()):
+            if running >= rank:
+                return bound
+        return self.maximum
+
+    def to_dict(self):
+        def ms(value):
+            return round(value * 1000.0, 3) if value is not None else None
+
+        return {
+            "count": self.count,
+            "sum_ms": ms(self.total),
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+            "max_ms": ms(self.maximum),
+            "p50_ms": ms(self.quantile(0.50)),
+            "p95_ms": ms(self.quantile(0.95)),
+            "p99_ms": ms(self.quantile(0.99)),
+            "buckets_ms": [[ms(bound), running] for bound, running in zip(self.bounds, self.cumulative())],
+        }
+
+
+class Metrics:
+    """Per-action counters and latency histograms, plus launch phase histograms."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._errors = {}
+        self._latency = {}
+        self._phases = {}
+        self._counters = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, action, seconds, success=True):
+        """Count one handled request and its handling time."""
+        with self._lock:
+            self._requests[action] = self._requests.get(action, 0) + 1
+            if not success:
+                self._errors[action] = self._errors.get(action, 0) + 1
+            histogram = self._latency.get(action)
+            if histogram is None:
+                histogram = self._latency[action] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def observe_phase(self, action, phase, seconds):
+        """Record the duration of one phase of an action (e.g. launch/spawn)."""
+        key = (action, phase)
+        with self._lock:
+            histogram = self._phases.get(key)
+            if histogram is None:
+                histogram = self._phases[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1):
+        """Bump a free-standing counter (rejected frames, ...)."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def snapshot(self):
+        """Everything recorded so far, durations in milliseconds."""
+        with self._lock:
+            actions = {
+                action: dict(
+                    self._latency[action].to_dict(),
+                    requests=self._requests.get(action, 0),
+                    errors=self._errors.get(action, 0)
+                )
+                for action in sorted(self._latency)
+            }
+            phases = {}
+            for (action, phase), histogram in sorted(self._phases.items()):
+                phases.setdefault(action, {})[phase] = histogram.to_dict()
+            return {
+                "uptime": round(time.time() - self.started_at, 3),
+                "actions": actions,
+                "phases": phases,
+                "counters": dict(self._counters),
+            }
+
+    def prometheus_text(self):
+        """Metrics in the Prometheus text exposition format."""
+        lines = []
+
+        def histogram_lines(name, labels, histogram):
+            for bound, running in zip(self.buckets, histogram.cumulative()):
+                lines.append(f'{name}_bucket{{{labels},le="{bound:g}"}} {running}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{name}_sum{{{labels}}} {histogram.total:.6f}')
+            lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+        with self._lock:
+            lines.append(f"# HELP {METRIC_PREFIX}_uptime_seconds Seconds since the host started.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_uptime_seconds gauge")
+            lines.append(f"{METRIC_PREFIX}_uptime_seconds {time.time() - self.started_at:.3f}")
+
+            lines.append(f"# HELP {METRIC_PREFIX}_requests_total Requests handled, by action.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_requests_total counter")
+            for action in sorted(self._requests):
+                lines.append(f'{METRIC_PREFIX}_requests_total{{action="{action}"}} {self._requests[action]}')
+
+            lines.append(f"# HELP {METRIC_PREFIX}_request_errors_total Requests answered with success=false, by action.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_request_errors_total counter")
+            for action in sorted(self._requests):
+                lines.append(f'{METRIC_PREFIX}_request_errors_total{{action="{action}"}} {self._errors.get(action, 0)}')
+
+            name = f"{METRIC_PREFIX}_request_duration_seconds"
+            lines.append(f"# HELP {name} Request handling time, by action.")
+            lines.append(f"# TYPE {name} histogram")
+            for action in sorted(self._latency):
+                histogram_lines(name, f'action="{action}"', self._latency[action])
+
+            name = f"{METRIC_PREFIX}_phase_duration_seconds"
+            lines.append(f"# HELP {name} Time spent in each phase of an action.")
+            lines.append(f"# TYPE {name} histogram")
+            for (action, phase), histogram in sorted(self._phases.items()):
+                histogram_lines(name, f'action="{action}",phase="{phase}"', histogram)
+
+            for counter in sorted(self._counters):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{counter}_total counter")
+                lines.append(f"{METRIC_PREFIX}_{counter}_total {self._counters[counter]}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Write the Prometheus text atomically (the collector must never see a partial file)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def _export_loop(self, path, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.write_textfile(path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics textfile {path}: {e}")
+
+    def start_export(self, path, interval):
+        """Write the textfile every ``interval`` seconds until ``stop_export``."""
+        if self._thread is not None or not path or interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._export_loop,
+            args=(path, interval),
+            name="realvnc-metrics",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop_export(self, path=None):
+        """Stop the export thread and write the final numbers once more."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=5)
+            self._thread = None
+        if path:
+            try:
+                self.write_textfile(path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics textfile {path}: {e}")
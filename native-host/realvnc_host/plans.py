@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Prepared launch plans.
+
+The ``prepare`` action does the work of a launch that does not depend on the
+click: it resolves the viewer, writes the profile into the spool and builds
+the platform command line. The result is kept here under a random plan ID
+for ``REALVNC_HOST_PLAN_TTL`` seconds. A ``launch`` that carries the
+``planId`` then only spawns the viewer.
+
+A plan can be launched any number of times until it expires. A plan whose
+spawn failed is dropped, and so is one whose profile file is gone. The
+extension always sends the full request along with the ``planId``, so a
+missing plan means a regular launch, never a failure.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class LaunchPlan:
+    """Everything a launch needs except the spawn itself.
+
+    ``cmd``/``options`` are the viewer command line and its ``Popen``
+    options. A plan for a diskless handoff has no command: the handoff must
+    be made per spawn, so it keeps the request (``spec``) with the viewer
+    already resolved instead.
+    """
+
+    __slots__ = ("plan_id", "key", "target", "address", "digest", "vnc_path", "connection_file", "cmd", "options",
+                 "spec", "created_at", "expires_at", "launches")
+
+    def __init__(self, key, target, vnc_path, connection_file="", cmd=None, options=None, spec=None,
+                 address=(None, None), digest=None):
+        self.plan_id = None
+        self.key = key
+        self.target = target
+        # (host, port) and profile hash for the session history
+        self.address = address
+        self.digest = digest
+        self.vnc_path = vnc_path
+        self.connection_file = connection_file
+        self.cmd = cmd
+        self.options = options or {}
+        self.spec = spec
+        self.created_at = None
+        self.expires_at = None
+        self.launches = 0
+
+
+class PlanCache:
+    """Plans by ID, dropped after ``ttl`` seconds; the oldest go first beyond ``max_plans``."""
+
+    def __init__(self, ttl=60.0, max_plans=64):
+        self.ttl = ttl
+        self.max_plans = max(1, max_plans)
+        self._lock = threading.Lock()
+        self._plans = OrderedDict()
+        self._prepared = 0
+        self._used = 0
+        self._expired = 0
+        self._evicted = 0
+
+    def _expire(self, now):
+        while self._plans:
+            plan = next(iter(self._plans.values()))
+            if plan.expires_at > now:
+                break
+            del self._plans[plan.plan_id]
+            self._expired += 1
+
+    def add(self, plan):
+        """Store ``plan`` under a new ID and return the ID."""
+        # Not imported with the module, it pulls in hashlib and random on every cold start
+        import secrets
+
+        now = time.monotonic()
+        plan.plan_id = secrets.token_urlsafe(12)
+        plan.created_at = now
+        plan.expires_at = now + self.ttl
+        with self._lock:
+            self._expire(now)
+            while len(self._plans) >= self.max_plans:
+                self._plans.popitem(last=False)
+                self._evicted += 1
+            self._plans[plan.plan_id] = plan
+            self._prepared += 1
+        return plan.plan_id
+
+    def get(self, plan_id):
+        """The live plan for ``plan_id``, or None when it is unknown or expired."""
+        with self._lock:
+            self._expire(time.monotonic())
+            plan = self._plans.get(plan_id)
+            if plan is not None:
+                plan.launches += 1
+                self._used += 1
+            return plan
+
+    def discard(self, plan_id):
+        with self._lock:
+            self._plans.pop(plan_id, None)
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "active": len(self._plans),
+                "ttl": self.ttl,
+                "prepared": self._prepared,
+                "used": self._used,
+                "expired": self._expired,
+                "evicted": self._evicted,
+            }
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel reachability probe for VNC servers.
+
+Opens TCP connections to many ``host:port`` pairs at once with asyncio and
+reads the 12-byte ProtocolVersion banner (``RFB 003.008\\n``) every RFB
+server sends as soon as a client connects. Each host reports its connect
+latency and its banner latency (measured from the connect), so the
+extension can rank or grey out hosts before a viewer is started.
+
+Everything runs under one total deadline: a host that is not done by then
+is reported as timed out instead of holding up the answer for the others.
+The probe closes each connection right after the banner, before any
+authentication starts.
+"""
+
+import asyncio
+import re
+import time
+
+# Port of display :0, used when a host comes without one
+DEFAULT_PORT = 5900
+
+# "RFB xxx.yyy\n", sent by the server first
+BANNER_SIZE = 12
+_BANNER = re.compile(rb"RFB (\d{3})\.(\d{3})\n")
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
+
+
+def parse_banner(banner):
+    """``"3.8"`` for an RFB ProtocolVersion banner, or None when it is not one."""
+    match = _BANNER.fullmatch(banner)
+    if match is None:
+        return None
+    return f"{int(match.group(1))}.{int(match.group(2))}"
+
+
+async def _probe_one(host, port, deadline, slots):
+    loop = asyncio.get_event_loop()
+    result = {"host": host, "port": port, "reachable": False, "rfb": None, "connectMs": None, "bannerMs": None}
+
+    async with slots:
+        started = time.perf_counter()
+        if loop.time() >= deadline:
+            result["error"] = "Deadline passed before the probe started"
+            return result
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), deadline - loop.time())
+        except asyncio.TimeoutError:
+            result["error"] = "Timed out connecting"
+            return result
+        except (OSError, UnicodeError) as e:
+            result["error"] = f"Connection failed: {getattr(e, 'strerror', None) or e}"
+            return result
+
+        connected = time.perf_counter()
+        result["reachable"] = True
+        result["connectMs"] = _ms(connected - started)
+        try:
+            banner = await asyncio.wait_for(reader.readexactly(BANNER_SIZE), deadline - loop.time())
+            result["bannerMs"] = _ms(time.perf_counter() - connected)
+            result["rfb"] = parse_banner(banner)
+            if result["rfb"] is None:
+                result["error"] = "Not an RFB server"
+        except asyncio.TimeoutError:
+            result["error"] = "No RFB banner before the deadline"
+        except (asyncio.IncompleteReadError, OSError):
+            result["error"] = "Connection closed before the RFB banner"
+        finally:
+            writer.close()
+    return result
+
+
+async def _probe_all(targets, timeout, concurrency):
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + timeout
+    slots = asyncio.Semaphore(max(1, concurrency))
+    return await asyncio.gather(*(_probe_one(host, port, deadline, slots) for host, port in targets))
+
+
+def probe_hosts(targets, timeout=2.0, concurrency=64):
+    """Probe ``(host, port)`` pairs concurrently; one result dict per target, in order.
+
+    Runs its own event loop, so call it from a worker thread (as the request
+    handlers are), never from inside a running loop.
+    """
+    if not targets:
+        return []
+    return asyncio.run(_probe_all(targets, timeout, concurrency))
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Helpers for the connection profiles generated by the extension.
+
+The profile is the INI-like text built by ``generateSVNFile`` in
+``src/background.ts``; only the fields the host needs are parsed here.
+"""
+
+
+def profile_target(content):
+    """``(host, port)`` from the ``[connection]`` section, or ``(None, None)``."""
+    host = None
+    port = None
+    in_connection = False
+    for line in content.splitlines():
+        line = line.strip()
+        if line.startswith("["):
+            if in_connection:
+                break
+            in_connection = line == "[connection]"
+            continue
+        if not in_connection or "=" not in line:
+            continue
+        key, _, value = line.partition("=")
+        key = key.strip()
+        if key == "host":
+            host = value.strip() or None
+        elif key == "port":
+            try:
+                port = int(value.strip())
+            except ValueError:
+                port = None
+    return host, port
+
+
+def target_label(host, port):
+    """``host:port`` label for logs and session tables."""
+    if not host:
+        return None
+    return f"{host}:{port}" if port else host
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Minimal native messaging protocol helpers.
+
+This module is imported before the first frame is answered, so it must stay
+cheap: only ``sys`` is allowed at import time.
+"""
+
+import sys
+
+# Version reported in ping responses
+PROTOCOL_VERSION = "1.2.0"
+
+_SYSTEM_NAMES = {
+    "win32": "Windows",
+    "cygwin": "Windows",
+    "darwin": "Darwin",
+}
+
+
+def system_name():
+    """Same values as ``platform.system()`` without importing ``platform``."""
+    if sys.platform.startswith("linux"):
+        return "Linux"
+    name = _SYSTEM_NAMES.get(sys.platform)
+    if name is None:
+        import platform
+        name = platform.system()
+    return name
+
+
+def ping_response(system, serializer=None):
+    """Body of the ``ping`` response, shared by the fast path and the full host."""
+    response = {
+        "success": True,
+        "message": "pong",
+        "version": PROTOCOL_VERSION,
+        "platform": system
+    }
+    if serializer:
+        response["serializer"] = serializer
+    return response
+
+
+def closing_event(reason):
+    """Unsolicited frame sent before the host closes the port on its own."""
+    return {
+        "event": "closing",
+        "reason": reason
+    }
+
+
+def rejected_response(error):
+    """Response for a frame that could not be accepted."""
+    return {
+        "success": False,
+        "error": f"Invalid message: {error}"
+    }
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Declarative request handlers.
+
+Every action is registered once, together with the fields it accepts. When
+a launcher starts, ``HandlerRegistry.compile`` turns those declarations into
+flat lists of small check closures (with limits taken from the settings
+already resolved), so validating a request is a few ``dict.get`` and
+``isinstance`` calls. A malformed or oversized message is rejected before
+its handler writes a profile or spawns anything.
+
+New actions plug in by decorating a handler; the message loop and the
+dispatcher do not change. An action that blocks until something happens
+(``wait``) is registered with ``long_poll=True`` so the request engine runs
+it outside the slots of regular requests::
+
+    @HANDLERS.action('echo', Field('text', str, required=True, max_length=256))
+    def handle_echo(launcher, message):
+        return {"success": True, "text": message['text']}
+"""
+
+_TYPE_NAMES = {
+    str: "a string",
+    int: "an integer",
+    float: "a number",
+    bool: "a boolean",
+    list: "a list",
+    dict: "a JSON object",
+}
+
+
+class Field:
+    """One request field: accepted types, whether it is required and its limits.
+
+    ``max_length`` bounds strings, ``min_items``/``max_items`` bound lists,
+    ``minimum``/``maximum`` bound numbers, and ``items`` is a tuple of fields
+    that every list entry (a JSON object) must satisfy. With ``digits`` a
+    string must be a decimal number; it is converted to an ``int`` in the
+    message, and the number bounds apply to it. Any limit may be a
+    callable taking the settings, it is resolved when the registry compiles.
+    A ``null`` value counts as absent.
+    """
+
+    __slots__ = ("name", "types", "required", "max_length", "minimum", "maximum",
+                 "min_items", "max_items", "items", "digits")
+
+    def __init__(self, name, types, required=False, max_length=None, minimum=None, maximum=None,
+                 min_items=None, max_items=None, items=None, digits=False):
+        self.name = name
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.required = required
+        self.max_length = max_length
+        self.minimum = minimum
+        self.maximum = maximum
+        self.min_items = min_items
+        self.max_items = max_items
+        self.items = items
+        self.digits = digits
+
+
+def _resolve(limit, settings):
+    return limit(settings) if callable(limit) else limit
+
+
+def _describe(types):
+    # "a number" already covers integers
+    names = [_TYPE_NAMES.get(t, t.__name__) for t in types if not (t is int and float in types)]
+    return " or ".join(names)
+
+
+def _compile_field(field, settings):
+    """A closure returning an error string for a bad value of ``field``, or None."""
+    name = field.name
+    types = field.types
+    required = field.required
+    expected = _describe(types)
+    # bool is an int subclass, true/false must not pass for a number
+    numbers_only = bool not in types and (int in types or float in types)
+    max_length = _resolve(field.max_length, settings)
+    minimum = _resolve(field.minimum, settings)
+    maximum = _resolve(field.maximum, settings)
+    min_items = _resolve(field.min_items, settings)
+    max_items = _resolve(field.max_items, settings)
+    validate_item = compile_fields(field.items, settings) if field.items else None
+    digits = field.digits
+
+    def check(message):
+        value = message.get(name)
+        if value is None:
+            return f"{name} is required" if required else None
+        if not isinstance(value, types) or (numbers_only and isinstance(value, bool)):
+            return f"{name} must be {expected}"
+        if isinstance(value, str):
+            if max_length is not None and len(value) > max_length:
+                return f"{name} is longer than {max_length} characters"
+            if not digits:
+                return None
+            if not (value.isascii() and value.isdigit()):
+                return f"{name} must be a number"
+            # Handlers see the number, the bounds below apply to it
+            value = message[name] = int(value)
+        if isinstance(value, list):
+            if min_items is not None and len(value) < min_items:
+                if min_items == 1:
+                    return f"{name} must not be empty"
+                return f"{name} needs at least {min_items} entries"
+            if max_items is not None and len(value) > max_items:
+                return f"{name} has more than {max_items} entries"
+            if validate_item is not None:
+                for index, item in enumerate(value):
+                    if not isinstance(item, dict):
+                        return f"{name}[{index}] must be a JSON object"
+                    error = validate_item(item)
+                    if error is not None:
+                        return f"{name}[{index}].{error}"
+        elif isinstance(value, (int, float)):
+            if minimum is not None and value < minimum:
+                return f"{name} must be at least {minimum}"
+            if maximum is not None and value > maximum:
+                return f"{name} must be at most {maximum}"
+        return None
+
+    return check
+
+
+def compile_fields(fields, settings=None):
+    """Validator for a message with ``fields``: returns the first error string, or None."""
+    checks = tuple(_compile_field(field, settings) for field in fields)
+
+    def validate(message):
+        for check in checks:
+            error = check(message)
+            if error is not None:
+                return error
+        return None
+
+    return validate
+
+
+class HandlerRegistry:
+    """Actions, their handler functions and their declared fields."""
+
+    def __init__(self, common=()):
+        # Fields every action accepts (requestId, traceId, ...)
+        self.common = tuple(common)
+        self._actions = {}
+        self._long_polls = set()
+
+    def action(self, name, *fields, long_poll=False):
+        """Decorator registering ``handler(launcher, message)`` for ``name``."""
+        def register(handler):
+            self._actions[name] = (handler, self.common + fields)
+            if long_poll:
+                self._long_polls.add(name)
+            return handler
+        return register
+
+    def is_long_poll(self, name):
+        """Whether ``name`` is an action that blocks until an event or its timeout."""
+        return isinstance(name, str) and name in self._long_polls
+
+    def names(self):
+        """Registered action names, in registration order."""
+        return tuple(self._actions)
+
+    def __contains__(self, name):
+        # Whatever a client put in "action", unhashable values included
+        return isinstance(name, str) and name in self._actions
+
+    def compile(self, settings=None):
+        """``{action: (handler, validator)}`` with every limit resolved against ``settings``."""
+        return {
+            name: (handler, compile_fields(fields, settings))
+            for name, (handler, fields) in self._actions.items()
+        }
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Browser-facing relay to the shared per-user host daemon.
+
+Every browser (Chrome, Edge, Firefox) starts its own native host process.
+With the daemon enabled that process is only a relay: it connects to the
+daemon's Unix socket, starting the daemon first when nobody is listening,
+and copies bytes between stdio and the socket without parsing a single
+frame. The daemon owns the viewer cache, the spool and the session table, so
+every browser talks to one warm process.
+
+Before any frame, the relay sends the build it runs (``build_fingerprint``)
+and the daemon answers whether it runs the same one. A daemon started from
+older code steps down: it gives up the socket, serves the relays it already
+has and exits, and the relay starts a daemon of its own build. When a
+daemon cannot be started at all, the failure is recorded next to the socket
+so the ports opened in the next ``REALVNC_HOST_DAEMON_RETRY`` seconds go
+straight to in-process serving instead of waiting for it again.
+
+This module is on the startup path of every host, so it only imports
+``os``, ``socket`` and ``threading``; the daemon is spawned with
+``subprocess`` imported on demand.
+"""
+
+import os
+import socket
+import threading
+import time
+
+from realvnc_host.protocol import PROTOCOL_VERSION
+
+# Bytes copied per read in either direction
+_CHUNK = 64 * 1024
+
+# Pause between connection attempts while a fresh daemon starts up
+_CONNECT_RETRY = 0.01
+
+# Handshake line sent by the relay, followed by its build fingerprint
+HANDSHAKE = b"REALVNC-HOST "
+
+# Daemon answers: same build, or stepped down for the relay's build
+HANDSHAKE_OK = b"OK"
+HANDSHAKE_RETIRED = b"RETIRED"
+
+# Longest handshake line either side accepts
+HANDSHAKE_MAX = 256
+
+
+def build_fingerprint(script):
+    """Identity of the host code run from ``script``: protocol version, file count, total size, newest mtime.
+
+    Covers the script (``realvnc_launcher.py`` or the zipapp bundle) and,
+    for a source layout, every module of the package; one ``stat`` each.
+    """
+    paths = [os.path.abspath(script)]
+    package = os.path.dirname(os.path.abspath(__file__))
+    # Inside the zipapp the package is no directory, the bundle's own stat covers it
+    if os.path.isdir(package):
+        paths.extend(os.path.join(package, name) for name in sorted(os.listdir(package)) if name.endswith(".py"))
+    count = size = newest = 0
+    for path in paths:
+        try:
+            info = os.stat(path)
+        except OSError:
+            continue
+        count += 1
+        size += info.st_size
+        newest = max(newest, info.st_mtime_ns)
+    return f"{PROTOCOL_VERSION}/{count}/{size}/{newest}"
+
+
+def daemon_supported(settings):
+    """Whether this host should try the daemon at all."""
+    if settings.daemon_mode == "off" or not hasattr(socket, "AF_UNIX"):
+        return False
+    # Named pipes would be the Windows equivalent; "auto" only covers POSIX
+    return settings.daemon_mode == "on" or os.name == "posix"
+
+
+def connect(path):
+    """Connected socket to the daemon, or None when nobody listens on ``path``."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def spawn_daemon(script):
+    """Start ``<script> --daemon`` detached from this process and the browser.
+
+    ``script`` is ``realvnc_launcher.py`` or the zipapp bundle; the daemon
+    runs with the same interpreter and isolation flags as this relay.
+    """
+    import subprocess
+    import sys
+
+    script = os.path.abspath(script)
+    command = [sys.executable]
+    if sys.flags.isolated:
+        command.append("-I")
+    if sys.flags.no_site:
+        command.append("-S")
+    subprocess.Popen(
+        command + [script, "--daemon"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        cwd=os.path.dirname(script),
+        start_new_session=True
+    )
+
+
+def handshake(sock, build, timeout):
+    """Tell the daemon our build; returns its answer (``HANDSHAKE_OK``, ``HANDSHAKE_RETIRED``) or None."""
+    sock.settimeout(timeout)
+    reply = b""
+    try:
+        sock.sendall(HANDSHAKE + build.encode("ascii") + b"\n")
+        # Nothing but the answer arrives before the first request is forwarded
+        while not reply.endswith(b"\n") and len(reply) < HANDSHAKE_MAX:
+            chunk = sock.recv(HANDSHAKE_MAX - len(reply))
+            if not chunk:
+                return None
+            reply += chunk
+    except OSError:
+        return None
+    sock.settimeout(None)
+    return reply.strip() if reply.endswith(b"\n") else None
+
+
+def connect_or_spawn(settings, script, build):
+    """Connect to a daemon of this build, starting one when needed. Returns None when that fails."""
+    sock = connect(settings.daemon_socket)
+    if sock is not None:
+        answer = handshake(sock, build, settings.daemon_start_timeout)
+        if answer == HANDSHAKE_OK:
+            return sock
+        sock.close()
+        if answer != HANDSHAKE_RETIRED:
+            return None
+        # The old daemon has given up the socket and lock, start one of this build
+    try:
+        spawn_daemon(script)
+    except OSError:
+        return None
+    # A second relay may spawn one too; only one daemon wins the lock, both connect to it
+    deadline = time.monotonic() + settings.daemon_start_timeout
+    while time.monotonic() < deadline:
+        time.sleep(_CONNECT_RETRY)
+        sock = connect(settings.daemon_socket)
+        if sock is None:
+            continue
+        answer = handshake(sock, build, max(_CONNECT_RETRY, deadline - time.monotonic()))
+        if answer == HANDSHAKE_OK:
+            return sock
+        sock.close()
+        if answer != HANDSHAKE_RETIRED:
+            return None
+    return None
+
+
+def failure_marker(settings):
+    """File recording that a daemon of some build could not be started."""
+    return settings.daemon_socket + ".failed"
+
+
+def failed_recently(settings, build):
+    """Whether starting a daemon of ``build`` failed less than ``daemon_retry`` seconds ago."""
+    marker = failure_marker(settings)
+    try:
+        if time.time() - os.stat(marker).st_mtime >= settings.daemon_retry:
+            return False
+        with open(marker, encoding="ascii") as f:
+            return f.read().strip() == build
+    except (OSError, ValueError):
+        return False
+
+
+def record_failure(settings, build):
+    """Let the next relays of ``build`` skip the daemon for a while; a new build tries again at once."""
+    marker = failure_marker(settings)
+    try:
+        os.makedirs(os.path.dirname(marker) or ".", mode=0o700, exist_ok=True)
+        with open(marker, "w", encoding="ascii") as f:
+            f.write(build + "\n")
+    except OSError:
+        pass
+
+
+def _pump_stdin(sock, stdin_fd):
+    """Browser to daemon; half-close the socket when the browser closes the port."""
+    try:
+        while True:
+            data = os.read(stdin_fd, _CHUNK)
+            if not data:
+                break
+            sock.sendall(data)
+    except OSError:
+        pass
+    finally:
+        try:
+            sock.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+
+def pump(sock, stdin_fd=0, stdout_fd=1):
+    """Copy frames both ways until the daemon closes the connection."""
+    threading.Thread(target=_pump_stdin, args=(sock, stdin_fd), name="realvnc-relay", daemon=True).start()
+    buffer = bytearray(_CHUNK)
+    view = memoryview(buffer)
+    try:
+        while True:
+            count = sock.recv_into(buffer)
+            if not count:
+                break
+            chunk = view[:count]
+            while chunk:
+                chunk = chunk[os.write(stdout_fd, chunk):]
+    except OSError:
+        pass
+    finally:
+        sock.close()
+
+
+def relay(settings, script):
+    """Serve this browser port through the daemon. Returns False when the daemon is unavailable.
+
+    Nothing has been read from stdin when False is returned, so the caller
+    can still serve the port in process.
+    """
+    if not daemon_supported(settings):
+        return False
+    build = build_fingerprint(script)
+    if failed_recently(settings, build):
+        return False
+    sock = connect_or_spawn(settings, script, build)
+    if sock is None:
+        record_failure(settings, build)
+        return False
+    pump(sock)
+    return True
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+RealVNC Viewer executable discovery.
+
+Candidates are the well-known install locations for the platform followed by
+every ``PATH`` entry. They are probed in parallel and the winner is cached on
+disk together with its mtime and size, so later lookups cost a single stat
+until the executable is upgraded, moved or removed.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+CACHE_FILE_NAME = "viewer_path.json"
+
+# A miss is remembered briefly so repeated check_vnc calls do not re-walk everything
+NEGATIVE_CACHE_SECONDS = 30.0
+
+# Upper bound on threads used to stat candidates
+MAX_PROBE_WORKERS = 8
+
+
+def default_candidates(system):
+    """Well-known RealVNC Viewer locations for the platform, in priority order."""
+    if system == "Windows":
+        # Common installation paths on Windows
+        return [
+            r"C:\\Program Files\\RealVNC\\VNC Viewer\\vncviewer.exe",
+            r"C:\\Program Files (x86)\\RealVNC\\VNC Viewer\\vncviewer.exe",
+            r"C:\\Users\\{}\\AppData\\Local\\RealVNC\\VNC Viewer\\vncviewer.exe".format(os.getenv('USERNAME', ''))
+        ]
+    elif system == "Darwin":  # macOS
+        return [
+            "/Applications/VNC Viewer.app/Contents/MacOS/vncviewer",
+            "/Applications/VNC Viewer.app",
+            os.path.expanduser("~/Applications/VNC Viewer.app")
+        ]
+    # Linux and other Unix-like systems
+    return [
+        "/usr/bin/vncviewer",
+        "/usr/local/bin/vncviewer",
+        "/opt/VNC/bin/vncviewer"
+    ]
+
+
+def path_candidates(system):
+    """``vncviewer`` in every ``PATH`` directory, in ``PATH`` order."""
+    name = "vncviewer.exe" if system == "Windows" else "vncviewer"
+    candidates = []
+    for directory in os.environ.get("PATH", "").split(os.pathsep):
+        if directory:
+            candidates.append(os.path.join(directory.strip('"'), name))
+    return candidates
+
+
+def _stat(path):
+    """Stat a candidate, returning None when it does not exist."""
+    try:
+        return os.stat(path)
+    except (OSError, ValueError):
+        return None
+
+
+class ViewerResolver:
+    """Find the RealVNC Viewer executable and keep the answer warm."""
+
+    def __init__(self, system, cache_dir=None):
+        self.system = system
+        self.cache_path = os.path.join(cache_dir, CACHE_FILE_NAME) if cache_dir else None
+        self._lock = threading.Lock()
+        self._entry = None
+        self._miss_until = 0.0
+        self._loaded = False
+
+    def candidates(self):
+        """All candidate paths in priority order, without duplicates."""
+        seen = set()
+        ordered = []
+        for path in default_candidates(self.system) + path_candidates(self.system):
+            key = os.path.normcase(path)
+            if key not in seen:
+                seen.add(key)
+                ordered.append(path)
+        return ordered
+
+    def resolve(self):
+        """Return the viewer path, or None when it is not installed."""
+        with self._lock:
+            if not self._loaded:
+                self._entry = self._load()
+                self._loaded = True
+
+            entry = self._entry
+            if entry is not None and self._is_fresh(entry):
+                return entry["path"]
+
+            if entry is None and time.monotonic() < self._miss_until:
+                return None
+
+            if entry is not None:
+                logger.info(f"Cached RealVNC path is stale: {entry['path']}")
+
+            self._entry = self._probe()
+            if self._entry is None:
+                self._miss_until = time.monotonic() + NEGATIVE_CACHE_SECONDS
+                self._remove()
+                return None
+
+            self._save(self._entry)
+            return self._entry["path"]
+
+    def cached_path(self):
+        """Last known viewer path without touching the disk, or None."""
+        entry = self._entry
+        return entry["path"] if entry else None
+
+    def invalidate(self):
+        """Forget the cached answer so the next lookup probes again."""
+        with self._lock:
+            self._entry = None
+            self._miss_until = 0.0
+            self._loaded = True
+            self._remove()
+
+    def _is_fresh(self, entry):
+        """One stat: the cached path still exists and is the same file."""
+        st = _stat(entry["path"])
+        return st is not None and st.st_mtime_ns == entry["mtime_ns"] and st.st_size == entry["size"]
+
+    def _probe(self):
+        """Stat every candidate in parallel and pick the highest-priority hit."""
+        candidates = self.candidates()
+        workers = min(MAX_PROBE_WORKERS, len(candidates)) or 1
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="realvnc-probe") as pool:
+            results = list(pool.map(_stat, candidates))
+
+        for path, st in zip(candidates, results):
+            if st is not None:
+                logger.info(f"Found RealVNC at: {path}")
+                return {"path": path, "mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+        logger.warning("RealVNC Viewer not found in default locations or PATH")
+        return None
+
+    def _load(self):
+        """Read the cache file written by a previous run."""
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get("system") != self.system:
+                return None
+            return {"path": entry["path"], "mtime_ns": int(entry["mtime_ns"]), "size": int(entry["size"])}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def _save(self, entry):
+        """Atomically replace the cache file."""
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(entry, system=self.system), f)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write viewer cache: {e}")
+
+    def _remove(self):
+        """Delete the cache file if present."""
+        if not self.cache_path:
+            return
+        try:
+            os.remove(self.cache_path)
+        except OSError:
+            pass
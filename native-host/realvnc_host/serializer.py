@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+JSON backend selection for native messaging frames.
+
+``orjson`` parses straight from the frame buffer and serializes to bytes, so
+it skips the str/bytes round trip the stdlib needs on both sides. It is used
+when installed (``REALVNC_HOST_JSON=auto``, the default) and the stdlib
+``json`` module otherwise.
+
+Importing ``orjson`` costs tens of milliseconds (it pulls in ``uuid``,
+``zoneinfo`` and more), which would blow the cold start budget, so the
+decision is split: ``select_backend`` only looks the module up on
+``sys.path`` and is cheap enough for the fast-start path, while
+``load_backend`` does the import once the first request has been answered.
+Both ``ping`` paths report the same selected backend.
+"""
+
+from realvnc_host.framing import default_dumps, default_loads
+
+BACKENDS = ("auto", "orjson", "json")
+
+
+def _module_available(name):
+    """Whether ``name`` can be imported, without importing it."""
+    try:
+        # Already loaded by the interpreter itself, unlike importlib.util
+        from _frozen_importlib_external import PathFinder
+    except ImportError:
+        from importlib.util import find_spec
+        return find_spec(name) is not None
+    return PathFinder.find_spec(name) is not None
+
+
+def select_backend(preference="auto"):
+    """Name of the backend to use: ``"orjson"`` when wanted and installed, else ``"json"``."""
+    if preference in ("auto", "orjson") and _module_available("orjson"):
+        return "orjson"
+    return "json"
+
+
+def load_backend(name):
+    """Import a backend and return ``(name, loads, dumps)``.
+
+    Falls back to the stdlib when ``orjson`` turns out not to be importable,
+    the returned name says which backend is really in use.
+    """
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            return "json", default_loads, default_dumps
+
+        def orjson_dumps(message, _dumps=orjson.dumps, _option=orjson.OPT_NON_STR_KEYS):
+            return _dumps(message, option=_option)
+
+        # orjson.loads accepts the memoryview over the frame buffer as is
+        return "orjson", orjson.loads, orjson_dumps
+    return "json", default_loads, default_dumps
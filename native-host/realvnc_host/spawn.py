@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+Viewer spawn backends.
+
+``Popen`` forks the host and closes every descriptor above 2 in the child
+before ``exec``, which costs more the bigger and longer-lived the host is.
+On Linux and macOS with Python 3.8+ the viewer is started with
+``os.posix_spawnp`` instead:
+
+* stdin, stdout and stderr are ``/dev/null`` and the only other descriptors
+  the viewer gets are the ones a launch passes on purpose (the Linux memfd
+  handoff). Everything the host opens itself is close-on-exec already, and
+  inheritable descriptors the host was started with are made
+  close-on-exec once when the backend starts.
+* the viewer runs in a new session (``setsid``), detached from the host and
+  the browser, and gets the default SIGPIPE/SIGXFSZ dispositions back as
+  ``Popen`` would restore them.
+* the environment is the one the host started with, converted once.
+
+``Popen`` (with the same detaching and ``/dev/null`` stdio) is used on
+Windows, before Python 3.8, when ``REALVNC_HOST_SPAWN`` is ``popen``, and
+for launches whose passed descriptors ``posix_spawn`` cannot keep open
+(only glibc 2.29+ clears close-on-exec for ``dup2(fd, fd)``).
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import threading
+
+logger = logging.getLogger(__name__)
+
+MODES = ("auto", "posix_spawn", "popen")
+
+# Signals Python ignores that the viewer must see with their default action
+_DEFAULT_SIGNALS = tuple(getattr(signal, name) for name in ("SIGPIPE", "SIGXFSZ") if hasattr(signal, name))
+
+
+def posix_spawn_supported():
+    return os.name == "posix" and hasattr(os, "posix_spawnp")
+
+
+def _dup2_keeps_fds():
+    """True when ``dup2(fd, fd)`` in posix_spawn clears close-on-exec (glibc 2.29+)."""
+    try:
+        name, version = os.confstr("CS_GNU_LIBC_VERSION").split()
+        major, minor = (int(part) for part in version.split(".")[:2])
+    except (AttributeError, OSError, ValueError, TypeError):
+        return False
+    return name == "glibc" and (major, minor) >= (2, 29)
+
+
+def _fd_directory():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return path
+    return None
+
+
+def seal_inherited_fds():
+    """Make descriptors above 2 close-on-exec. Returns how many were inheritable."""
+    directory = _fd_directory()
+    if directory is None:
+        return 0
+    sealed = 0
+    for name in os.listdir(directory):
+        fd = int(name)
+        if fd <= 2:
+            continue
+        try:
+            if os.get_inheritable(fd):
+                os.set_inheritable(fd, False)
+                sealed += 1
+        except OSError:
+            # The directory's own descriptor, closed by now
+            continue
+    return sealed
+
+
+class Spawner:
+    """Start viewers with ``posix_spawn`` where it can be used, ``Popen`` otherwise."""
+
+    def __init__(self, mode="auto"):
+        self.mode = mode if mode in MODES else "auto"
+        self.backend = "popen"
+        self._pass_fds = False
+        self._lock = threading.Lock()
+        self._spawned = {"posix_spawn": 0, "popen": 0}
+        # Converting os.environ costs about as much as the spawn itself; the host never changes it
+        self._environ = None
+        if self.mode != "popen" and posix_spawn_supported():
+            self.backend = "posix_spawn"
+            self._pass_fds = _dup2_keeps_fds()
+            self._environ = dict(os.environb)
+            sealed = seal_inherited_fds()
+            if sealed:
+                logger.info(f"Marked {sealed} inherited descriptors close-on-exec")
+        elif self.mode == "posix_spawn":
+            logger.warning("posix_spawn is not available, spawning viewers with Popen")
+
+    def spawn(self, cmd, pass_fds=(), **options):
+        """Start ``cmd`` detached with null stdio; returns ``(pid, Popen or None)``."""
+        if self.backend == "posix_spawn" and not options and (self._pass_fds or not pass_fds):
+            try:
+                pid = self._posix_spawn(cmd, pass_fds)
+                self._count("posix_spawn")
+                return pid, None
+            except NotImplementedError as e:
+                # setsid or setsigdef missing on this platform: use Popen from now on
+                logger.warning(f"posix_spawn unusable ({e}), spawning viewers with Popen")
+                self.backend = "popen"
+
+        if os.name == "posix":
+            options = dict(options, start_new_session=True, pass_fds=pass_fds)
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            **options
+        )
+        self._count("popen")
+        return process.pid, process
+
+    def _posix_spawn(self, cmd, pass_fds):
+        actions = [
+            (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+            (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+            (os.POSIX_SPAWN_DUP2, 1, 2),
+        ]
+        # dup2 onto itself keeps the descriptor open across exec, same number
+        actions.extend((os.POSIX_SPAWN_DUP2, fd, fd) for fd in pass_fds)
+        return os.posix_spawnp(cmd[0], cmd, self._environ, file_actions=actions,
+                               setsid=True, setsigdef=_DEFAULT_SIGNALS)
+
+    def _count(self, backend):
+        with self._lock:
+            self._spawned[backend] += 1
+
+    def stats(self):
+        with self._lock:
+            return {"mode": self.mode, "backend": self.backend, "spawned": dict(self._spawned)}
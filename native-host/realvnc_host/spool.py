@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""
+Managed spool directory for generated connection files.
+
+Every ``launch`` that carries ``svnContent`` leaves a connection file behind.
+The spool keeps them in one directory and a background sweeper evicts files
+older than the maximum age, then the oldest files until the directory is back
+under its file-count and total-size limits. Files modified within the last
+``EVICTION_GRACE_SECONDS`` are never evicted, by any host sharing the
+directory, so a viewer that is still starting can read its profile.
+
+Profiles are stored content-addressed: the file name is a hash of the
+content, so reconnecting to the same host reuses the existing file instead
+of writing a new one. A small in-memory index remembers when each recent
+file's mtime was last set. A hit within ``INDEX_TRUST_SECONDS`` of that
+skips the disk entirely: the grace period is longer, so no host (one per
+browser when the daemon is off) can have swept the file since. Older hits
+``stat`` the file and refresh its mtime, at most once per trust period.
+"""
+
+import hashlib
+import logging
+import os
+import stat
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Only files with this suffix are managed (and ever deleted) by the spool
+SPOOL_SUFFIX = ".svn"
+
+# Files modified more recently than this are never evicted
+EVICTION_GRACE_SECONDS = 120.0
+
+# How long after setting a file's mtime an index hit is trusted without a stat;
+# shorter than the grace period, so the file cannot have been swept meanwhile
+INDEX_TRUST_SECONDS = 60.0
+
+# Hex digits of the SHA-256 content hash used as the file name
+HASH_LENGTH = 32
+
+# Suffix of partially written files, renamed into place once complete
+TEMP_SUFFIX = ".tmp"
+
+
+def content_hash(data):
+    """Content address of a connection profile (bytes)."""
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+class Spool:
+    """Connection-file directory with TTL, count and size limits."""
+
+    def __init__(self, directory, max_age=86400.0, max_files=200, max_bytes=10 * 1024 * 1024,
+                 sweep_interval=300.0, index_size=64):
+        self.directory = directory
+        self.max_age = max_age
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.sweep_interval = sweep_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._dir_ready = False
+        self._files = 0
+        self._bytes = 0
+        self._oldest_mtime = None
+        self._written_total = 0
+        self._evicted_total = 0
+        self._last_sweep = None
+        # content hash -> (path, last use time, last time its mtime was set), most recently used last
+        self._index = OrderedDict()
+        self.index_size = index_size
+        self._index_hits = 0
+        self._disk_hits = 0
+
+    def ensure_directory(self):
+        """Create the spool directory once."""
+        if not self._dir_ready:
+            os.makedirs(self.directory, exist_ok=True)
+            self._dir_ready = True
+
+    def store(self, content):
+        """Store a profile content-addressed and return ``(path, digest, reused)``.
+
+        Identical content maps to the same file. A recent index hit costs no
+        system call; otherwise one ``stat`` decides whether it must be written.
+        """
+        data = content.encode('utf-8')
+        digest = content_hash(data)
+        path = os.path.join(self.directory, digest + SPOOL_SUFFIX)
+        found = self._find(digest, path, len(data))
+        if found is None:
+            self.ensure_directory()
+            self._write_atomic(path, data)
+            self._count_written(len(data))
+            self._remember(digest, path, time.time())
+        return path, digest, found is not None
+
+    def lookup(self, digest):
+        """Path of a stored profile by content hash, or None when it is gone."""
+        path = os.path.join(self.directory, digest + SPOOL_SUFFIX)
+        if self._find(digest, path) is None:
+            self._forget(path)
+            return None
+        return path
+
+    def _find(self, digest, path, size=None):
+        """``"index"`` or ``"disk"`` when ``path`` holds the profile (of ``size`` bytes), else None."""
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is not None and now - entry[2] < INDEX_TRUST_SECONDS:
+                self._index[digest] = (path, now, entry[2])
+                self._index.move_to_end(digest)
+                self._index_hits += 1
+                return "index"
+        touched = self._touch(path, size, now)
+        if touched is None:
+            return None
+        with self._lock:
+            self._disk_hits += 1
+        self._remember(digest, path, touched, now)
+        return "disk"
+
+    @staticmethod
+    def _touch(path, size, now):
+        """When ``path``'s mtime was set, refreshing it if older than the trust period; None when missing.
+
+        The mtime keeps hosts sharing the directory from sweeping a profile that
+        is about to be launched; one that vanished in between counts as missing.
+        """
+        try:
+            info = os.stat(path)
+            if not stat.S_ISREG(info.st_mode) or (size is not None and info.st_size != size):
+                return None
+            if now - info.st_mtime < INDEX_TRUST_SECONDS:
+                return info.st_mtime
+            os.utime(path)
+        except OSError:
+            return None
+        return now
+
+    def _remember(self, digest, path, touched, now=None):
+        with self._lock:
+            self._index[digest] = (path, now or touched, touched)
+            self._index.move_to_end(digest)
+            while len(self._index) > self.index_size:
+                self._index.popitem(last=False)
+
+    def _write_atomic(self, path, data):
+        """Write to a temporary file, fsync, then rename so readers never see a partial profile."""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}{TEMP_SUFFIX}"
+        try:
+            # Profiles hold credentials: owner-only permissions
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o600)
+            with open(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _count_written(self, size):
+        # Counters are approximate between sweeps (an overwrite counts as a new file)
+        with self._lock:
+            self._files += 1
+            self._bytes += size
+            self._written_total += 1
+            if self._oldest_mtime is None:
+                self._oldest_mtime = time.time()
+
+    def _scan(self):
+        """(last use, size, path) of every managed file, oldest first.
+
+        The last use is the later of the file's mtime and the last time the
+        in-memory index handed it out, so a profile reused from memory is not
+        expired while it is still in use. Leftover temporary files from an
+        interrupted write are removed on the way.
+        """
+        with self._lock:
+            last_used = {path: used for path, used, _ in self._index.values()}
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    name = entry.name
+                    if name.endswith(TEMP_SUFFIX) and SPOOL_SUFFIX in name:
+                        try:
+                            if now - entry.stat(follow_symlinks=False).st_mtime > EVICTION_GRACE_SECONDS:
+                                self._remove(entry.path)
+                        except OSError:
+                            pass
+                        continue
+                    if not name.endswith(SPOOL_SUFFIX):
+                        continue
+                    try:
+                        if not entry.is_file(follow_symlinks=False):
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    entries.append((max(st.st_mtime, last_used.get(entry.path, 0.0)), st.st_size, entry.path))
+        except FileNotFoundError:
+            return []
+        entries.sort()
+        return entries
+
+    def _remove(self, path):
+        self._forget(path)
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return True
+        except OSError as e:
+            logger.warning(f"Could not evict spool file {path}: {e}")
+            return False
+
+    def _forget(self, path):
+        """Drop an evicted file from the in-memory index."""
+        name = os.path.basename(path)
+        if name.endswith(SPOOL_SUFFIX):
+            with self._lock:
+                self._index.pop(name[:-len(SPOOL_SUFFIX)], None)
+
+    def sweep(self):
+        """Evict expired files, then the oldest ones until under the limits.
+
+        Returns the number of files removed.
+        """
+        now = time.time()
+        entries = self._scan()
+        kept = []
+        evicted = 0
+
+        for mtime, size, path in entries:
+            if self.max_age and now - mtime > max(self.max_age, EVICTION_GRACE_SECONDS):
+                if self._remove(path):
+                    evicted += 1
+                    continue
+            kept.append((mtime, size, path))
+
+        total_bytes = sum(size for _, size, _ in kept)
+        index = 0
+        while index < len(kept) and (
+            (self.max_files and len(kept) - index > self.max_files)
+            or (self.max_bytes and total_bytes > self.max_bytes)
+        ):
+            mtime, size, path = kept[index]
+            if now - mtime < EVICTION_GRACE_SECONDS:
+                break
+            if self._remove(path):
+                evicted += 1
+                total_bytes -= size
+            index += 1
+        kept = kept[index:]
+
+        with self._lock:
+            self._files = len(kept)
+            self._bytes = sum(size for _, size, _ in kept)
+            self._oldest_mtime = kept[0][0] if kept else None
+            self._evicted_total += evicted
+            self._last_sweep = now
+
+        if evicted:
+            logger.info(f"Spool sweep evicted {evicted} file(s), {len(kept)} left")
+        return evicted
+
+    def stats(self):
+        """Current spool size and limits."""
+        with self._lock:
+            oldest = self._oldest_mtime
+            return {
+                "directory": self.directory,
+                "files": self._files,
+                "bytes": self._bytes,
+                "oldest_age": round(time.time() - oldest, 3) if oldest is not None else None,
+                "written_total": self._written_total,
+                "evicted_total": self._evicted_total,
+                "dedup_index_hits": self._index_hits,
+                "dedup_disk_hits": self._disk_hits,
+                "dedup_index_size": len(self._index),
+                "last_sweep": self._last_sweep,
+                "max_age": self.max_age,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Spool sweep failed: {e}")
+            if self._stop.wait(self.sweep_interval):
+                break
+
+    def start(self):
+        """Start the background sweeper (the first sweep runs immediately)."""
+        if self._thread is not None or self.sweep_interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sweep_loop, name="realvnc-spool-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background sweeper."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5)
+        self._thread = None
@@ -0,0 +1,319 @@
+# -*- coding: utf-8 -*-
+"""
+Supervisor for the viewer processes started by the host.
+
+A long-lived host must reap the viewers it starts, otherwise every exited
+viewer stays behind as a zombie. A single reaper thread waits on a pidfd per
+child where the kernel supports it (Linux 5.3+, Python 3.9+) and falls back to
+polling ``waitpid(WNOHANG)`` elsewhere. Every child gets an entry in a small
+session table that the ``sessions``, ``kill`` and ``wait`` actions read, so
+the extension can show live state without asking the OS.
+
+On Windows the viewer is started through ``cmd /c start``; the tracked pid is
+that short-lived ``cmd`` process, not the viewer itself.
+"""
+
+import logging
+import os
+import selectors
+import signal
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Polling period when pidfds are not available
+DEFAULT_POLL_INTERVAL = 0.5
+
+# Exited sessions kept for the sessions action
+DEFAULT_HISTORY = 50
+
+_SIGNALS = {
+    "TERM": getattr(signal, "SIGTERM", None),
+    "KILL": getattr(signal, "SIGKILL", None),
+    "INT": getattr(signal, "SIGINT", None),
+    "HUP": getattr(signal, "SIGHUP", None),
+}
+
+
+class Session:
+    """One viewer process started by the host."""
+
+    __slots__ = ("pid", "label", "command", "started_at", "ended_at", "returncode", "process")
+
+    def __init__(self, pid, label, command, process=None):
+        self.pid = pid
+        self.label = label
+        self.command = command
+        self.started_at = time.time()
+        self.ended_at = None
+        self.returncode = None
+        self.process = process
+
+    @property
+    def running(self):
+        return self.ended_at is None
+
+    def to_dict(self):
+        return {
+            "pid": self.pid,
+            "target": self.label,
+            "command": self.command,
+            "running": self.running,
+            "returncode": self.returncode,
+            "started_at": round(self.started_at, 3),
+            "ended_at": round(self.ended_at, 3) if self.ended_at else None,
+            "uptime": round((self.ended_at or time.time()) - self.started_at, 3),
+        }
+
+
+def _decode_status(status):
+    """waitpid status to a Popen-style return code (negative for signals)."""
+    if hasattr(os, "waitstatus_to_exitcode"):
+        return os.waitstatus_to_exitcode(status)
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class Supervisor:
+    """Reap viewer processes as they exit and keep a table of sessions."""
+
+    def __init__(self, poll_interval=DEFAULT_POLL_INTERVAL, history=DEFAULT_HISTORY):
+        self.poll_interval = poll_interval
+        self._active = {}
+        self._exited = deque(maxlen=history)
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self._use_pidfd = os.name == "posix" and hasattr(os, "pidfd_open")
+        self._selector = None
+        self._pidfds = {}
+        self._unwatched = set()
+        self._wake_r = self._wake_w = None
+
+    # -- tracking -------------------------------------------------------
+
+    def track(self, pid, label=None, command=None, process=None):
+        """Add a freshly spawned child to the session table."""
+        session = Session(pid, label, command, process)
+        with self._cond:
+            self._active[pid] = session
+            if self._use_pidfd:
+                self._unwatched.add(pid)
+        # The reaper thread opens the pidfd, so only it ever touches the selector
+        self._wake()
+        return session
+
+    def _watch_pidfd(self, pid):
+        """Register a pidfd for ``pid``. Returns False when one cannot be opened."""
+        try:
+            fd = os.pidfd_open(pid)
+        except OSError as e:
+            logger.debug(f"pidfd_open({pid}) failed: {e}")
+            return False
+        self._pidfds[fd] = pid
+        self._selector.register(fd, selectors.EVENT_READ, pid)
+        return True
+
+    def _wake(self):
+        if self._wake_w is not None:
+            try:
+                os.write(self._wake_w, b"\0")
+            except OSError:
+                pass
+
+    # -- reaping --------------------------------------------------------
+
+    def _mark_exited(self, pid, returncode):
+        with self._cond:
+            session = self._active.pop(pid, None)
+            if session is None:
+                return
+            session.returncode = returncode
+            session.ended_at = time.time()
+            if session.process is not None:
+                # Tell Popen the child is gone so it never waits on the pid again
+                session.process.returncode = returncode
+                session.process = None
+            self._exited.append(session)
+            self._cond.notify_all()
+        logger.info(f"Viewer {pid} ({session.label or 'no target'}) exited with {returncode}")
+
+    def _reap(self, pid):
+        """Collect ``pid`` if it has exited. Returns True when it is gone."""
+        if os.name != "posix":
+            with self._cond:
+                session = self._active.get(pid)
+            process = session.process if session else None
+            if process is None:
+                return True
+            returncode = process.poll()
+            if returncode is None:
+                return False
+            self._mark_exited(pid, returncode)
+            return True
+
+        try:
+            reaped, status = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            # Reaped elsewhere: the exit code is lost
+            self._mark_exited(pid, None)
+            return True
+        if reaped == 0:
+            return False
+        self._mark_exited(pid, _decode_status(status))
+        return True
+
+    def reap_all(self):
+        """Collect every exited child now."""
+        with self._cond:
+            pids = list(self._active)
+        for pid in pids:
+            self._reap(pid)
+
+    def _run_pidfd(self):
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                unwatched, self._unwatched = self._unwatched, set()
+            retry = set()
+            for pid in unwatched:
+                # Exited already or pidfd not available: fall back to waitpid polling
+                if not self._watch_pidfd(pid) and not self._reap(pid):
+                    retry.add(pid)
+            if retry:
+                with self._cond:
+                    self._unwatched |= retry
+            for key, _ in self._selector.select(timeout=self.poll_interval if retry else None):
+                if key.fd == self._wake_r:
+                    try:
+                        os.read(self._wake_r, 4096)
+                    except OSError:
+                        pass
+                    continue
+                self._selector.unregister(key.fd)
+                self._pidfds.pop(key.fd, None)
+                os.close(key.fd)
+                self._reap(key.data)
+
+    def _run_poll(self):
+        while True:
+            with self._cond:
+                if self._stop:
+                    return
+                self._cond.wait(self.poll_interval)
+            self.reap_all()
+
+    def start(self):
+        """Start the reaper thread."""
+        if self._thread is not None:
+            return
+        self._stop = False
+        target = self._run_poll
+        if self._use_pidfd:
+            try:
+                self._selector = selectors.DefaultSelector()
+                self._wake_r, self._wake_w = os.pipe()
+                os.set_blocking(self._wake_r, False)
+                self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+                target = self._run_pidfd
+            except OSError as e:
+                logger.warning(f"pidfd reaper unavailable, polling instead: {e}")
+                self._close_selector()
+        self._thread = threading.Thread(target=target, name="realvnc-reaper", daemon=True)
+        self._thread.start()
+
+    def _close_selector(self):
+        if self._selector is not None:
+            for fd in list(self._pidfds):
+                try:
+                    self._selector.unregister(fd)
+                except (KeyError, ValueError):
+                    pass
+                os.close(fd)
+            self._pidfds.clear()
+            self._selector.close()
+            self._selector = None
+        for fd in (self._wake_r, self._wake_w):
+            if fd is not None:
+                os.close(fd)
+        self._wake_r = self._wake_w = None
+
+    def stop(self):
+        """Stop the reaper thread. Running viewers are left alone."""
+        if self._thread is None:
+            return
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        self._wake()
+        self._thread.join(timeout=5)
+        self._thread = None
+        self._close_selector()
+        self.reap_all()
+
+    # -- queries and actions -------------------------------------------
+
+    def get(self, pid):
+        with self._cond:
+            session = self._active.get(pid)
+            return session if session is not None else self._find_exited(pid)
+
+    def sessions(self, include_exited=True):
+        """Snapshot of the session table, running sessions first."""
+        with self._cond:
+            rows = [s.to_dict() for s in self._active.values()]
+            if include_exited:
+                rows.extend(s.to_dict() for s in reversed(self._exited))
+        return rows
+
+    def kill(self, pid, signal_name="TERM"):
+        """Signal a viewer the host started. Other pids are refused."""
+        with self._cond:
+            session = self._active.get(pid)
+        if session is None:
+            raise LookupError(f"No running session with pid {pid}")
+
+        if os.name != "posix":
+            if session.process is None:
+                raise LookupError(f"Session {pid} cannot be signalled")
+            if str(signal_name).upper() == "KILL":
+                session.process.kill()
+            else:
+                session.process.terminate()
+            return
+
+        signum = _SIGNALS.get(str(signal_name).upper())
+        if signum is None:
+            raise ValueError(f"Unsupported signal: {signal_name}")
+        os.kill(pid, signum)
+
+    def _find_exited(self, pid):
+        return next((s for s in self._exited if s.pid == pid), None)
+
+    def wait(self, pid, timeout=None):
+        """Block until a session ends or the timeout passes; returns the session or None."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._thread is None:
+                # No reaper running: collect the child inline
+                self._reap(pid)
+            with self._cond:
+                session = self._active.get(pid)
+                if session is None:
+                    return self._find_exited(pid)
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return session
+                self._cond.wait(self.poll_interval if remaining is None else min(remaining, self.poll_interval))
+
+    def stats(self):
+        with self._cond:
+            return {
+                "active": len(self._active),
+                "exited_kept": len(self._exited),
+                "reaper": "pidfd" if self._selector is not None else ("poll" if self._thread else "off"),
+            }
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Per-request tracing for the native host.
+
+A request that carries a ``traceId`` (and optionally ``clientTs``, the
+browser's ``Date.now()`` when the user clicked) is traced: every stage the
+host goes through -- frame decode, waiting for a worker, profile write,
+viewer path resolution, spawn, the whole handler and the response write --
+becomes a span with monotonic start and duration. Spans are written as one
+JSON object per line to the ``realvnc_host.trace`` logger, and their
+durations are echoed in the response under ``timings`` so the extension can
+log click-to-spawn latency end to end.
+
+Requests without a ``traceId`` pay nothing beyond one dict lookup.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+TRACE_LOGGER = "realvnc_host.trace"
+
+trace_logger = logging.getLogger(TRACE_LOGGER)
+
+_local = threading.local()
+
+
+def _ms(seconds):
+    return round(seconds * 1000.0, 3)
+
+
+class Trace:
+    """Spans recorded for one traced request.
+
+    ``origin`` is the ``perf_counter`` value the span offsets are relative
+    to: the moment the host started decoding the request.
+    """
+
+    __slots__ = ("trace_id", "request_id", "action", "client_ts", "received_at", "origin", "host_age", "spans")
+
+    def __init__(self, message, origin=None, host_started=None):
+        self.trace_id = message.get('traceId')
+        self.request_id = message.get('requestId')
+        self.action = message.get('action')
+        client_ts = message.get('clientTs')
+        self.client_ts = client_ts if isinstance(client_ts, (int, float)) else None
+        self.received_at = time.time()
+        self.origin = time.perf_counter() if origin is None else origin
+        self.host_age = self.received_at - host_started if host_started else None
+        self.spans = []
+
+    def span(self, name, start, end=None):
+        """Record a span between two ``perf_counter`` values (``end`` defaults to now)."""
+        if end is None:
+            end = time.perf_counter()
+        self.spans.append((name, start - self.origin, end - start))
+
+    def timings(self):
+        """Durations echoed to the extension, in milliseconds."""
+        spans = {}
+        for name, _, duration in self.spans:
+            # Batched phases (several writes, ...) add up
+            spans[name] = round(spans.get(name, 0.0) + _ms(duration), 3)
+        timings = {
+            "receivedAt": round(self.received_at * 1000.0, 3),
+            "spans": spans,
+        }
+        if self.client_ts is not None:
+            # Wall clocks of the browser and the host: browser port setup plus host start for a cold host
+            timings["clientToHostMs"] = round(self.received_at * 1000.0 - self.client_ts, 3)
+        if self.host_age is not None:
+            timings["hostAgeMs"] = _ms(self.host_age)
+        return timings
+
+    def emit(self):
+        """Write one JSON event per span to the trace log."""
+        if not trace_logger.isEnabledFor(logging.INFO):
+            return
+        for name, start, duration in self.spans:
+            emit_event(self.trace_id, self.request_id, self.action, name, start, duration)
+
+
+def emit_event(trace_id, request_id, action, span, start, duration):
+    """Write a single span event; ``start`` is the offset from the request's origin in seconds."""
+    trace_logger.info(json.dumps({
+        "ts": round(time.time(), 6),
+        "pid": os.getpid(),
+        "traceId": trace_id,
+        "requestId": request_id,
+        "action": action,
+        "span": span,
+        "startMs": _ms(start) if start is not None else None,
+        "durationMs": _ms(duration),
+    }, separators=(',', ':')))
+
+
+def current():
+    """The trace of the request handled by this thread, or None."""
+    return getattr(_local, 'trace', None)
+
+
+def activate(trace):
+    """Make ``trace`` current for this thread (None to clear)."""
+    _local.trace = trace
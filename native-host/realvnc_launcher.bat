@@ -7,9 +7,25 @@ setlocal
 REM Get the directory where this batch file is located
 set "SCRIPT_DIR=%~dp0"
 
+REM Precompiled bundle built by build_zipapp.py, used instead of the sources when present
+set "BUNDLE=%SCRIPT_DIR%realvnc_host.pyz"
+
+REM The interpreter found by a previous launch is remembered in the host's state directory
+if defined REALVNC_HOST_STATE_DIR (
+    set "CACHE_DIR=%REALVNC_HOST_STATE_DIR%"
+) else (
+    set "CACHE_DIR=%LOCALAPPDATA%\realvnc_launcher"
+)
+set "INTERPRETER_CACHE=%CACHE_DIR%\interpreter.txt"
+
 REM Try to find Python executable
 set "PYTHON_EXE="
 
+REM Reuse the cached interpreter while it still exists
+if exist "%INTERPRETER_CACHE%" set /p PYTHON_EXE=<"%INTERPRETER_CACHE%"
+if defined PYTHON_EXE if exist "%PYTHON_EXE%" goto launch
+set "PYTHON_EXE="
+
 REM Check for Python in common locations
 if exist "%SCRIPT_DIR%../python-portable/python.exe" (
     set "PYTHON_EXE=%SCRIPT_DIR%../python-portable/python.exe"
@@ -19,23 +35,31 @@ if exist "%SCRIPT_DIR%../python-portable/python.exe" (
     set "PYTHON_EXE=C:\Python38\python.exe"
 ) else if exist "C:\Python37\python.exe" (
     set "PYTHON_EXE=C:\Python37\python.exe"
-) else (
-    REM Try to use python from PATH
-    where python >nul 2>&1
-    if %errorlevel% equ 0 (
-        set "PYTHON_EXE=python"
-    ) else (
-        where python3 >nul 2>&1
-        if %errorlevel% equ 0 (
-            set "PYTHON_EXE=python3"
-        ) else (
-            echo Python not found. Please install Python 3.7 or later.
-            exit /b 1
-        )
-    )
 )
 
-REM Launch the Python script
-"%PYTHON_EXE%" "%SCRIPT_DIR%realvnc_launcher.py"
+REM Try to use python from PATH, keeping its full path for the cache
+if not defined PYTHON_EXE (
+    for /f "delims=" %%i in ('where python 2^>nul') do if not defined PYTHON_EXE set "PYTHON_EXE=%%i"
+)
+if not defined PYTHON_EXE (
+    for /f "delims=" %%i in ('where python3 2^>nul') do if not defined PYTHON_EXE set "PYTHON_EXE=%%i"
+)
+if not defined PYTHON_EXE (
+    echo Python not found. Please install Python 3.7 or later.
+    exit /b 1
+)
+
+REM Remember it for the next launch; a cache that cannot be written is not an error
+if not exist "%CACHE_DIR%" mkdir "%CACHE_DIR%" >nul 2>&1
+(echo %PYTHON_EXE%)>"%INTERPRETER_CACHE%" 2>nul
+
+:launch
+REM Launch the bundle isolated and without site processing, or the Python script.
+REM The bundle itself runs the sources next to it when they are newer than it
+if exist "%BUNDLE%" (
+    "%PYTHON_EXE%" -I -S "%BUNDLE%"
+) else (
+    "%PYTHON_EXE%" "%SCRIPT_DIR%realvnc_launcher.py"
+)
 
-endlocal
\ No newline at end of file
+endlocal
@@ -5,14 +5,29 @@
 # Get the directory where this script is located
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
+# Precompiled bundle built by build_zipapp.py, used instead of the sources when present
+BUNDLE="$SCRIPT_DIR/realvnc_host.pyz"
+
+# The interpreter found by a previous launch is remembered in the host's state directory
+CACHE_DIR="${REALVNC_HOST_STATE_DIR:-${XDG_CACHE_HOME:-$HOME/.cache}/realvnc_launcher}"
+INTERPRETER_CACHE="$CACHE_DIR/interpreter"
+
 # Function to find Python executable
 find_python() {
     # Try different Python executables in order of preference
     for python_cmd in python3 python python3.9 python3.8 python3.7; do
         if command -v "$python_cmd" >/dev/null 2>&1; then
+            # python3* is Python 3 by name; realvnc_launcher.py checks the minor
+            # version itself, so skip spawning an extra interpreter just to probe it
+            case "$python_cmd" in
+                python3*)
+                    command -v "$python_cmd"
+                    return 0
+                    ;;
+            esac
             # Check if it's Python 3
             if "$python_cmd" -c "import sys; sys.exit(0 if sys.version_info >= (3, 7) else 1)" 2>/dev/null; then
-                echo "$python_cmd"
+                command -v "$python_cmd"
                 return 0
             fi
         fi
@@ -20,16 +35,33 @@ find_python() {
     return 1
 }
 
-# Find Python executable
-PYTHON_EXE=$(find_python)
+# Reuse the cached interpreter while it still exists
+PYTHON_EXE=""
+if [ -r "$INTERPRETER_CACHE" ]; then
+    read -r PYTHON_EXE < "$INTERPRETER_CACHE"
+    if [ ! -x "$PYTHON_EXE" ]; then
+        PYTHON_EXE=""
+    fi
+fi
 
 if [ -z "$PYTHON_EXE" ]; then
-    echo "Error: Python 3.7 or later not found. Please install Python 3." >&2
-    exit 1
-fi
+    # Find Python executable
+    PYTHON_EXE=$(find_python)
 
-# Make sure the Python script is executable
-chmod +x "$SCRIPT_DIR/realvnc_launcher.py"
+    if [ -z "$PYTHON_EXE" ]; then
+        echo "Error: Python 3.7 or later not found. Please install Python 3." >&2
+        exit 1
+    fi
 
-# Launch the Python script
-exec "$PYTHON_EXE" "$SCRIPT_DIR/realvnc_launcher.py"
\ No newline at end of file
+    # Remember it for the next launch; a cache that cannot be written is not an error
+    if mkdir -p "$CACHE_DIR" 2>/dev/null && printf '%s\n' "$PYTHON_EXE" > "$INTERPRETER_CACHE.$$" 2>/dev/null; then
+        mv -f "$INTERPRETER_CACHE.$$" "$INTERPRETER_CACHE" 2>/dev/null || rm -f "$INTERPRETER_CACHE.$$"
+    fi
+fi
+
+# Launch the bundle isolated and without site processing, or the Python script.
+# The bundle itself runs the sources next to it when they are newer than it
+if [ -f "$BUNDLE" ]; then
+    exec "$PYTHON_EXE" -I -S "$BUNDLE"
+fi
+exec "$PYTHON_EXE" "$SCRIPT_DIR/realvnc_launcher.py"
@@ -158,6 +158,23 @@ function buildExtension(browser) {
     });
 }
 
+/**
+ * Whether the zipapp bundle is older than any source it is built from
+ */
+function isBundleStale(sourceDir) {
+    const bundleTime = fs.statSync(path.join(sourceDir, 'realvnc_host.pyz')).mtimeMs;
+    const packageDir = path.join(sourceDir, 'realvnc_host');
+    const sources = [path.join(sourceDir, 'realvnc_launcher.py')];
+    if (fs.existsSync(packageDir)) {
+        for (const file of fs.readdirSync(packageDir)) {
+            if (file.endsWith('.py')) {
+                sources.push(path.join(packageDir, file));
+            }
+        }
+    }
+    return sources.some(source => fs.existsSync(source) && fs.statSync(source).mtimeMs > bundleTime);
+}
+
 /**
  * Copy native-host directory to dist directory
  */
@@ -192,6 +209,15 @@ function copyNativeHost() {
                 continue;
             }
             
+            // A stale bundle would run older code than the sources shipped next to it
+            if (file === 'realvnc_host.pyz' && isBundleStale(sourceDir)) {
+                console.log('[WARNING] realvnc_host.pyz is older than the native host sources, not packaging it (rebuild it with build_zipapp.py)');
+                if (fs.existsSync(destPath)) {
+                    fs.unlinkSync(destPath);
+                }
+                continue;
+            }
+            
             const stats = fs.statSync(sourcePath);
             
             if (stats.isDirectory()) {
@@ -199,8 +225,9 @@ function copyNativeHost() {
                 copyDirectory(sourcePath, destPath);
                 copiedCount++;
             } else {
-                // Copy file
+                // Copy file, keeping its mtime: the zipapp bundle compares itself with the sources by mtime
                 fs.copyFileSync(sourcePath, destPath);
+                fs.utimesSync(destPath, stats.atime, stats.mtime);
                 copiedCount++;
             }
         }
@@ -235,6 +262,7 @@ function copyDirectory(source, destination) {
             copyDirectory(sourcePath, destPath);
         } else {
             fs.copyFileSync(sourcePath, destPath);
+            fs.utimesSync(destPath, stats.atime, stats.mtime);
         }
     }
 }
@@ -1,5 +1,11 @@
 import browser from "webextension-polyfill";
-const NATIVE_HOST_NAME = 'com.realvnc.vncviewer';
+import { sendNativeRequest } from '/@/utils/nativeHost';
+
+// Native host actions content scripts may call through the 'nativeAction' message
+const NATIVE_QUERY_ACTIONS = ['sessions', 'kill', 'wait', 'spool_stats', 'stats', 'probe_hosts', 'recent'];
+
+// Seconds each keepalive from an open HSDES page holds the native host, twice the page's send interval
+const KEEPALIVE_TTL_SECONDS = 120;
 
 console.log("Hello from the background!");
 
@@ -68,42 +74,160 @@ browser.runtime.onMessage.addListener((request, sender, sendResponse) => {
     const svnFilePath = generateTempSVNFilePath();
     
     // Call RealVNC
-    launchRealVNC(svnFilePath, svnContent)
+    launchRealVNC(svnFilePath, svnContent, request.hostInfo || {}, request.clickTs, request.planId)
     // @ts-ignore
       .then(result => { sendResponse({ success: true, result }) } )
     // @ts-ignore
       .catch(error => sendResponse({ success: false, error: error.message }));
     return true; // Keep the message channel open for async response
+  }else if(request.type === 'vncConnectMany'){
+    // Open several hosts with one native request, the host spawns the viewers in parallel
+    const hostInfos: any[] = Array.isArray(request.hostInfos) ? request.hostInfos : [];
+
+    launchRealVNCMany(hostInfos)
+    // @ts-ignore
+      .then(result => sendResponse({ success: !!result.success, result }))
+    // @ts-ignore
+      .catch(error => sendResponse({ success: false, error: error.message }));
+    return true;
+  }else if(request.type === 'vncReconnect'){
+    // Relaunch a target from the host's session history ('recent' lists them), no profile is rebuilt or sent
+    reconnectRealVNC(request.target, request.clickTs)
+    // @ts-ignore
+      .then(result => sendResponse({ success: true, result }))
+    // @ts-ignore
+      .catch(error => sendResponse({ success: false, error: error.message }));
+    return true;
+  }else if(request.type === 'vncPrepare'){
+    // Precompute the launch of a selected host from the connection info fetched on selection, a later vncConnect with the planId only spawns
+    const hostInfos: any[] = Array.isArray(request.hostInfos) ? request.hostInfos : [];
+
+    prepareRealVNC(hostInfos)
+    // @ts-ignore
+      .then(result => sendResponse({ success: !!result.success, result }))
+    // @ts-ignore
+      .catch(error => sendResponse({ success: false, error: error.message }));
+    return true;
+  }else if(request.type === 'nativeKeepalive'){
+    // HSDES pages keep the native host warm while open, it exits on its idle timeout afterwards
+    keepNativeHostAlive(!!request.warm)
+    // @ts-ignore
+      .then(result => sendResponse({ success: !!result.success, result }))
+    // @ts-ignore
+      .catch(error => sendResponse({ success: false, error: error.message }));
+    return true;
+  }else if(request.type === 'nativeAction'){
+    // Query actions answered by the native host (session table, spool state, ...)
+    if (!NATIVE_QUERY_ACTIONS.includes(request.action)) {
+      // @ts-ignore
+      sendResponse({ success: false, error: `Unsupported native action: ${request.action}` });
+      return false;
+    }
+
+    sendNativeRequest({ ...(request.params || {}), action: request.action })
+    // @ts-ignore
+      .then(result => sendResponse({ success: !!result.success, result }))
+    // @ts-ignore
+      .catch(error => sendResponse({ success: false, error: error.message }));
+    return true;
   }
 });
 
 // Function to launch RealVNC through native messaging
-async function launchRealVNC(connectionFile = '', svnContent = '') {
-  return new Promise((resolve, reject) => {
-    const port = browser.runtime.connectNative(NATIVE_HOST_NAME);
-    
-    port.onMessage.addListener((response) => {
-      if (response.success) {
-        resolve(response);
-      } else {
-        reject(new Error(response.error || 'Failed to launch RealVNC'));
-      }
-      port.disconnect();
-    });
-    
-    port.onDisconnect.addListener(() => {
-      if (browser.runtime.lastError) {
-        reject(new Error(browser.runtime.lastError.message));
-      }
-    });
-    
-    console.log('Received vncConnect request:', connectionFile, svnContent);
-    // Send launch command to native host
-    port.postMessage({
-      action: 'launch',
-      connectionFile: connectionFile,
-      svnContent: svnContent
-    });
+// Requests share one persistent port, so back-to-back launches skip the host cold start
+// planId names a launch prepared earlier; the full request goes along in case the plan has expired
+async function launchRealVNC(connectionFile = '', svnContent = '', hostInfo: any = {}, clickTs = Date.now(), planId = '') {
+  console.log('Received vncConnect request:', connectionFile);
+  // Send launch command to native host, host/port label the session in its session table
+  // traceId/clientTs make the host trace the launch and echo its stage timings
+  const launch = () => sendNativeRequest({
+    action: 'launch',
+    connectionFile: connectionFile,
+    svnContent: svnContent,
+    host: hostInfo.host,
+    port: hostInfo.port,
+    planId: planId || undefined,
+    traceId: generateTraceId(),
+    clientTs: clickTs
+  });
+  let response = await launch();
+  // The host refuses launches beyond its queue; retry once after the delay it asks for
+  if (response.busy) {
+    await new Promise((resolve) => setTimeout(resolve, response.retryAfterMs || 500));
+    response = await launch();
+  }
+  logLaunchTimings(response, clickTs);
+
+  if (!response.success) {
+    throw new Error(response.error || 'Failed to launch RealVNC');
+  }
+  return response;
+}
+
+// Launch one viewer per host through the launch_many action
+// Per-host results are streamed back as they finish, the resolved value is the batch summary
+async function launchRealVNCMany(hostInfos: any[]) {
+  const hosts = hostInfos.map((hostInfo) => ({
+    connectionFile: generateTempSVNFilePath(),
+    svnContent: generateSVNFile(hostInfo || {}),
+    host: hostInfo?.host,
+    port: hostInfo?.port
+  }));
+
+  return sendNativeRequest({ action: 'launch_many', hosts }, undefined, (partial) => {
+    console.log(`Viewer ${partial.index + 1}/${hosts.length} (${partial.target}):`, partial.success ? partial.pid : partial.error);
+  });
+}
+
+// Reconnect to a host:port launched before; fails when the host no longer has its profile
+async function reconnectRealVNC(target: string, clickTs = Date.now()) {
+  const response = await sendNativeRequest({
+    action: 'reconnect',
+    target,
+    traceId: generateTraceId(),
+    clientTs: clickTs
+  });
+  logLaunchTimings(response, clickTs);
+
+  if (!response.success) {
+    throw new Error(response.error || 'Failed to reconnect');
+  }
+  return response;
+}
+
+// Prepare one launch plan per host; plans[i] holds planId/expiresIn for hostInfos[i]
+async function prepareRealVNC(hostInfos: any[]) {
+  const hosts = hostInfos.map((hostInfo) => ({
+    connectionFile: generateTempSVNFilePath(),
+    svnContent: generateSVNFile(hostInfo || {}),
+    host: hostInfo?.host,
+    port: hostInfo?.port
+  }));
+
+  return sendNativeRequest({ action: 'prepare', hosts });
+}
+
+// Hold the native host open; a warm call first resolves the viewer and creates the spool directory
+async function keepNativeHostAlive(warm = false) {
+  if (warm) {
+    await sendNativeRequest({ action: 'ping', warm: true });
+  }
+  return sendNativeRequest({ action: 'keepalive', ttl: KEEPALIVE_TTL_SECONDS });
+}
+
+// Short unique ID correlating a launch with the host's trace events
+function generateTraceId(): string {
+  return `${Date.now().toString(36)}-${Math.floor(Math.random() * 0x100000).toString(36)}`;
+}
+
+// Log click-to-spawn latency with the stage timings echoed by the native host
+function logLaunchTimings(response: Record<string, any>, clickTs: number): void {
+  const timings = response.timings;
+  if (!timings) return;
+  console.log(`Launch ${response.traceId}: click-to-response ${Date.now() - clickTs} ms`, {
+    clickToHostMs: timings.clientToHostMs,
+    hostAgeMs: timings.hostAgeMs,
+    ...timings.spans
   });
 }
 
@@ -1,7 +1,11 @@
 // content.ts
+import browser from "webextension-polyfill"
 import Main from './components/main.vue'
 import { createApp } from 'vue'
 
+// How often an open, visible HSDES page asks the background to keep the native host alive
+const KEEPALIVE_INTERVAL = 60 * 1000
+
 // Create a div element to mount the Vue application
 const appContainer = document.createElement('div')
 appContainer.id = 'cpu-test-extension-container'
@@ -35,3 +39,22 @@ if ('registerCallback' in appInstance) {
     })
 }
 
+// Keep the native host warm while this page is open; the first call also warms up the viewer path
+let lastKeepalive = 0
+const sendKeepalive = () => {
+    if (document.visibilityState !== 'visible' || Date.now() - lastKeepalive < KEEPALIVE_INTERVAL / 2) {
+        return
+    }
+    const warm = lastKeepalive === 0
+    lastKeepalive = Date.now()
+    browser.runtime.sendMessage({ type: 'nativeKeepalive', warm }).catch((error: Error) => {
+        console.warn('Native host keepalive failed', error)
+    })
+}
+
+// all_frames injects this script into every frame, one keepalive per page is enough
+if (window.top === window) {
+    sendKeepalive()
+    setInterval(sendKeepalive, KEEPALIVE_INTERVAL)
+    document.addEventListener('visibilitychange', sendKeepalive)
+}
@@ -0,0 +1,162 @@
+// Native messaging client module
+// Keeps one long-lived port to the native host and multiplexes requests over it
+
+import browser from "webextension-polyfill";
+
+const NATIVE_HOST_NAME = 'com.realvnc.vncviewer';
+
+// Default time to wait for a single response from the native host
+const DEFAULT_REQUEST_TIMEOUT = 30000;
+
+// Define pending request entry
+interface PendingRequest {
+  resolve: (response: Record<string, any>) => void;
+  reject: (error: Error) => void;
+  onPartial?: (response: Record<string, any>) => void;
+  action: string;
+  message: Record<string, any>;
+  port?: browser.Runtime.Port;
+  resent?: boolean;
+  timeout: number;
+  timeoutId: ReturnType<typeof setTimeout>;
+}
+
+let port: browser.Runtime.Port | null = null;
+let nextRequestId = 1;
+const pendingRequests = new Map<string, PendingRequest>();
+
+// Ports whose host announced it is closing (idle timeout); it never handles requests left on them
+const closingPorts = new WeakSet<browser.Runtime.Port>();
+
+// Reject in-flight requests (only those sent over fromPort when given), used when a port goes away
+function rejectAll(message: string, fromPort?: browser.Runtime.Port): void {
+  pendingRequests.forEach((pending, requestId) => {
+    if (fromPort && pending.port !== fromPort) return;
+    clearTimeout(pending.timeoutId);
+    pendingRequests.delete(requestId);
+    pending.reject(new Error(message));
+  });
+}
+
+// Send a pending request over the shared port
+function post(requestId: string, pending: PendingRequest): void {
+  const target = getPort();
+  pending.port = target;
+  target.postMessage({ ...pending.message, requestId });
+}
+
+// The host closed for idleness without handling these: send them once more to a fresh host
+function resendAll(fromPort: browser.Runtime.Port): void {
+  pendingRequests.forEach((pending, requestId) => {
+    if (pending.port !== fromPort) return;
+    if (pending.resent) {
+      clearTimeout(pending.timeoutId);
+      pendingRequests.delete(requestId);
+      pending.reject(new Error('Native host disconnected'));
+      return;
+    }
+    pending.resent = true;
+    try {
+      post(requestId, pending);
+    } catch (error) {
+      clearTimeout(pending.timeoutId);
+      pendingRequests.delete(requestId);
+      pending.reject(error as Error);
+    }
+  });
+}
+
+// Arm the timeout of a pending request
+function startTimeout(requestId: string, pending: PendingRequest): ReturnType<typeof setTimeout> {
+  return setTimeout(() => {
+    pendingRequests.delete(requestId);
+    pending.reject(new Error(`Native host request timed out: ${pending.action}`));
+  }, pending.timeout);
+}
+
+// Route a response back to the request that produced it
+function handleResponse(response: Record<string, any>, fromPort: browser.Runtime.Port): void {
+  // Unsolicited notice before an idle host exits: new requests go to a new host
+  if (response.event === 'closing') {
+    closingPorts.add(fromPort);
+    if (port === fromPort) {
+      port = null;
+    }
+    return;
+  }
+
+  const requestId = response.requestId;
+  const pending = requestId !== undefined ? pendingRequests.get(String(requestId)) : undefined;
+
+  if (!pending) {
+    console.warn('Native host response without matching request:', response);
+    return;
+  }
+
+  // Streamed interim frame (launch_many): report it and keep waiting for the final one
+  if (response.partial) {
+    clearTimeout(pending.timeoutId);
+    pending.timeoutId = startTimeout(String(requestId), pending);
+    pending.onPartial?.(response);
+    return;
+  }
+
+  pendingRequests.delete(String(requestId));
+  clearTimeout(pending.timeoutId);
+  pending.resolve(response);
+}
+
+// Open the shared port lazily, reconnecting after the host exits
+function getPort(): browser.Runtime.Port {
+  if (port) return port;
+
+  const newPort = browser.runtime.connectNative(NATIVE_HOST_NAME);
+
+  newPort.onMessage.addListener((response: any) => handleResponse(response, newPort));
+
+  newPort.onDisconnect.addListener(() => {
+    // @ts-ignore lastError is only set when the host failed
+    const lastError = browser.runtime.lastError || newPort.error;
+    if (port === newPort) {
+      port = null;
+    }
+    if (closingPorts.has(newPort)) {
+      resendAll(newPort);
+      return;
+    }
+    rejectAll(lastError?.message || 'Native host disconnected', newPort);
+  });
+
+  port = newPort;
+  return newPort;
+}
+
+/**
+ * Send a request to the native host over the shared port
+ * @param message - Request body, must contain an action
+ * @param timeout - Milliseconds to wait for the matching response, restarted by every partial frame
+ * @param onPartial - Called with each streamed interim frame (e.g. per-host launch_many results)
+ * @returns Raw final response from the native host
+ */
+export function sendNativeRequest(
+  message: Record<string, any>,
+  timeout = DEFAULT_REQUEST_TIMEOUT,
+  onPartial?: (response: Record<string, any>) => void
+): Promise<Record<string, any>> {
+  return new Promise((resolve, reject) => {
+    const requestId = String(nextRequestId++);
+
+    const pending = { resolve, reject, onPartial, action: message.action, message, timeout } as PendingRequest;
+    pending.timeoutId = startTimeout(requestId, pending);
+    pendingRequests.set(requestId, pending);
+
+    try {
+      post(requestId, pending);
+    } catch (error) {
+      pendingRequests.delete(requestId);
+      clearTimeout(pending.timeoutId);
+      port = null;
+      reject(error as Error);
+    }
+  });
+}